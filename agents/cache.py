@@ -0,0 +1,216 @@
+"""
+Cache de résultats à deux niveaux : LRU en mémoire avec TTL + SQLite optionnel sur disque
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class LRUCache:
+    """Cache mémoire thread-safe, éviction LRU au-delà de `max_entries`"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Renvoie (valeur, date_de_stockage) ou None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, stored_at: float = None):
+        with self._lock:
+            self._data[key] = (value, stored_at if stored_at is not None else time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def purge_older_than(self, cutoff: float):
+        """Supprime les entrées stockées avant `cutoff` (timestamp)"""
+        with self._lock:
+            for key in [k for k, (_, ts) in self._data.items() if ts < cutoff]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """Niveau disque : survit aux redémarrages, valeurs sérialisées en JSON"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, stored_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, stored_at: float = None):
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, payload, stored_at if stored_at is not None else time.time()),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_older_than(self, cutoff: float):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE stored_at < ?", (cutoff,))
+            self._conn.commit()
+
+
+class TieredCache:
+    """
+    Cache LRU + TTL avec niveau disque optionnel et stale-while-revalidate
+
+    Args:
+        ttl: Durée (secondes) pendant laquelle une entrée est fraîche
+        stale_ttl: Délai supplémentaire pendant lequel une entrée périmée est
+            renvoyée immédiatement pendant qu'un rafraîchissement tourne en fond
+        max_entries: Taille du niveau mémoire
+        db_path: Chemin SQLite du niveau disque (None = mémoire seule)
+        purge_every: Nombre d'écritures entre deux purges des entrées expirées
+    """
+
+    def __init__(self, ttl: float = 3600, stale_ttl: float = 0, max_entries: int = 1024, db_path: str = None,
+                 purge_every: int = 1000):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.memory = LRUCache(max_entries)
+        self.disk = SQLiteCache(db_path) if db_path else None
+        self.purge_every = purge_every
+        self._writes = 0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale_hits": 0, "refreshes": 0}
+        # Le fichier disque survit aux redémarrages : on le purge dès l'ouverture
+        if self.disk is not None:
+            self.purge_expired()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _lookup(self, key: str) -> Optional[Tuple[Any, float]]:
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.memory.set(key, entry[0], entry[1])
+        return entry
+
+    def get(self, key: str) -> Optional[Any]:
+        """Renvoie la valeur fraîche associée à `key`, sinon None"""
+        entry = self._lookup(key)
+        if entry is not None and time.time() - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Renvoie la valeur même périmée (revalidation conditionnelle), sinon None"""
+        entry = self._lookup(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        self.memory.set(key, value, now)
+        if self.disk is not None:
+            self.disk.set(key, value, now)
+        with self._lock:
+            self._writes += 1
+            purge = self.purge_every > 0 and self._writes % self.purge_every == 0
+        if purge:
+            self.purge_expired()
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any],
+                       should_cache: Callable[[Any], bool] = None) -> Any:
+        """
+        Renvoie la valeur en cache, ou appelle `compute()` et mémorise le résultat
+
+        `should_cache(value)` permet d'écarter les résultats à ne pas garder (erreurs).
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            age = time.time() - entry[1]
+            if age < self.ttl:
+                self._count("hits")
+                return entry[0]
+            if age < self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                self._refresh_in_background(key, compute, should_cache)
+                return entry[0]
+
+        self._count("misses")
+        value = compute()
+        if should_cache is None or should_cache(value):
+            self.set(key, value)
+        return value
+
+    def _refresh_in_background(self, key, compute, should_cache):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                value = compute()
+                if should_cache is None or should_cache(value):
+                    self.set(key, value)
+                self._count("refreshes")
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def purge_expired(self):
+        """Supprime les entrées au-delà de ttl + stale_ttl"""
+        cutoff = time.time() - self.ttl - self.stale_ttl
+        self.memory.purge_older_than(cutoff)
+        if self.disk is not None:
+            self.disk.purge_older_than(cutoff)
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs de hits/misses pour dimensionner le cache"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 3) if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        return stats
@@ -0,0 +1,165 @@
+"""
+Recherche sur l'entreprise pour les lettres de motivation
+
+Actualités (`search_news`) et pages de présentation (`search_web`) sont interrogées
+en parallèle, pendant que le CV est lu, puis condensées en une courte fiche
+(actualités datées, valeurs, projets). La fiche est mise en cache par entreprise :
+un employeur demandé par beaucoup de candidats n'est recherché qu'une fois par TTL,
+et les recherches simultanées d'une même entreprise sont fusionnées.
+"""
+
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Any, Dict, List, Optional, Union
+
+from agents.cache import TieredCache
+from agents.job_index import normalize_query_key
+from agents.metrics import span
+from agents.prompt_builder import summarize_extractive
+from agents.result_filter import canonicalize_url
+from agents.single_flight import get_single_flight
+
+_COMPANY_LINE_RE = re.compile(
+    r"^\s*(?:entreprise|soci[ée]t[ée]|employeur|company|client)\s*:\s*(?P<name>[^\n,;|]{2,60})",
+    re.IGNORECASE | re.MULTILINE
+)
+FOCUS_TERMS = "valeurs mission culture projets innovation engagement croissance lancement partenariat"
+
+
+def company_name_from_text(*texts: str) -> str:
+    """Nom d'entreprise annoncé dans une offre ("Entreprise : Acme"), sinon chaîne vide"""
+    for text in texts:
+        match = _COMPANY_LINE_RE.search(text or "")
+        if match:
+            return match.group("name").strip()
+    return ""
+
+
+def _clean_results(results: List[Dict[str, Any]], seen: set) -> List[Dict[str, Any]]:
+    kept = []
+    for result in results:
+        if "error" in result or not result.get("snippet"):
+            continue
+        url = canonicalize_url(result.get("url", ""))
+        if url in seen:
+            continue
+        seen.add(url)
+        kept.append(result)
+    return kept
+
+
+class CompanyResearcher:
+    """
+    Fiche entreprise (actualités, valeurs, projets) à partir de recherches DuckDuckGo
+
+    Args:
+        search_tools: CustomDuckDuckGoTools (search_news / search_web)
+        cache: Cache des fiches par entreprise (TTL = fraîcheur des actualités)
+        max_results: Résultats demandés par recherche
+        budget: Taille maximale de la fiche (tokens)
+        max_workers: Recherches d'entreprise simultanées
+    """
+
+    def __init__(self, search_tools, cache: TieredCache, max_results: int = 5, budget: int = 350,
+                 max_workers: int = 4):
+        self.search_tools = search_tools
+        self.cache = cache
+        self.max_results = max_results
+        self.budget = budget
+        self.single_flight = get_single_flight()
+        # Pools séparés : une recherche en attente de ses deux requêtes ne bloque jamais celles-ci
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="company-research")
+        self._search_executor = ThreadPoolExecutor(max_workers=max_workers * 2, thread_name_prefix="company-search")
+
+    def start(self, company: str) -> Optional[Future]:
+        """Lance la recherche en arrière-plan ; None si aucune entreprise n'est indiquée"""
+        if not normalize_query_key(company):
+            return None
+        return self._executor.submit(self.fact_sheet, company)
+
+    def fact_sheet(self, company: str) -> str:
+        """Fiche de l'entreprise, depuis le cache ou par une recherche partagée entre les demandeurs"""
+        key = normalize_query_key(company)
+        return self.single_flight.do(
+            "company_research", key, self.cache.get_or_compute,
+            key, lambda: self._research(company), should_cache=bool
+        )
+
+    def _research(self, company: str) -> str:
+        with span("company_research", "duckduckgo"):
+            news = self._search_executor.submit(self.search_tools.search_news, f'"{company}"', self.max_results)
+            web = self._search_executor.submit(
+                self.search_tools.search_web, f"{company} entreprise valeurs mission projets", self.max_results
+            )
+            return self.compress(company, news.result(), web.result())
+
+    def compress(self, company: str, news: List[Dict[str, Any]], web: List[Dict[str, Any]]) -> str:
+        """Fiche courte : actualités datées puis phrases des pages les plus liées aux valeurs et projets"""
+        seen = set()
+        lines = []
+        news = _clean_results(news, seen)
+        if news:
+            lines.append("Actualités récentes :")
+            for item in news:
+                date = (item.get("date") or "")[:10]
+                source = item.get("source") or ""
+                prefix = f"{date} · " if date else ""
+                suffix = f" ({source})" if source and source != "DuckDuckGo" else ""
+                lines.append(f"- {prefix}{item.get('title', '')}{suffix} : {item['snippet']}")
+        web = _clean_results(web, seen)
+        if web:
+            lines.append("Présentation, valeurs et projets :")
+            lines.extend(f"- {item['snippet']}" for item in web)
+        if not lines:
+            return ""
+        return summarize_extractive("\n".join(lines), self.budget, focus=f"{company} {FOCUS_TERMS}")
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+def resolve_company_research(research: Union[Future, str, None], timeout: float = None) -> str:
+    """
+    Fiche d'une recherche lancée avec `start()` : attend au plus `timeout` secondes,
+    puis continue sans (la lettre n'attend jamais une recherche lente ou en échec)
+    """
+    if research is None or isinstance(research, str):
+        return research or ""
+    if timeout is None:
+        timeout = float(os.getenv('COMPANY_RESEARCH_TIMEOUT', '8'))
+    try:
+        return research.result(timeout=timeout)
+    except TimeoutError:
+        print("⚠️ Recherche entreprise trop lente, lettre générée sans")
+    except Exception as e:
+        print(f"⚠️ Recherche entreprise en échec: {str(e)}")
+    return ""
+
+
+_default_researcher = None
+_default_researcher_lock = threading.Lock()
+
+
+def get_company_researcher() -> CompanyResearcher:
+    """
+    Chercheur partagé ; COMPANY_RESEARCH_TTL (secondes, 1 jour par défaut),
+    COMPANY_RESEARCH_DB (niveau disque du cache, optionnel)
+    """
+    global _default_researcher
+    with _default_researcher_lock:
+        if _default_researcher is None:
+            from agents.job_search_agent import CustomDuckDuckGoTools
+
+            _default_researcher = CompanyResearcher(
+                CustomDuckDuckGoTools(),
+                TieredCache(
+                    ttl=float(os.getenv('COMPANY_RESEARCH_TTL', '86400')),
+                    stale_ttl=float(os.getenv('COMPANY_RESEARCH_STALE_TTL', '604800')),
+                    max_entries=int(os.getenv('COMPANY_RESEARCH_MAX_ENTRIES', '1024')),
+                    db_path=os.getenv('COMPANY_RESEARCH_DB') or None,
+                ),
+                max_workers=int(os.getenv('COMPANY_RESEARCH_WORKERS', '4')),
+            )
+        return _default_researcher
@@ -1,14 +1,19 @@
 from textwrap import dedent
-from agno.agent import Agent
-from agno.models.google import Gemini
+from agents.llm_backend import LLMBackendError, agent_messages, get_llm_router
+from agents.company_research import get_company_researcher, resolve_company_research
+from agents.llm_cache import resolve_llm_cache
+from agents.prompt_builder import PromptBuilder
+from agents.single_flight import flight_key, get_single_flight
 
 class CoverLetterAgent:
-    def __init__(self, api_key):
-        self.agent = Agent(
-            name="Cover Letter Agent",
-            model=Gemini(id="meta-llama/llama-4-scout-17b-16e-instructh", api_key=api_key),
-            show_tool_calls=True,
-            instructions=dedent("""\
+    def __init__(self, api_key, use_cache=True, llm_backend=None):
+        # Route "cover_letter" : Llama 4 Scout (Groq) ou Gemini, selon la latence observée
+        self.llm = llm_backend or get_llm_router(groq_api_key=api_key)
+        self.route = "cover_letter"
+        # True = cache de réponses partagé, False = désactivé pour cet agent
+        self.response_cache = resolve_llm_cache(use_cache)
+        self.single_flight = get_single_flight()
+        self.instructions = dedent("""\
                 ✉️ Vous êtes un expert en rédaction de lettres de motivation professionnelles !
                 
                 Votre expertise :
@@ -49,25 +54,77 @@ class CoverLetterAgent:
                 - Version courte (email)
                 - Points clés à retenir
                 - Conseils de personnalisation
-            """),
-            add_datetime_to_instructions=True,
-            markdown=True,
-        )
+            """)
     
-    def generate_cover_letter(self, cv_content, job_description, company_info=""):
-        query = f"""
+    def _build_query(self, cv_content, job_description, company_info="", company_facts=""):
+        # Sections ajustées au budget de tokens (le CV est résumé autour des mots de l'offre)
+        sections = PromptBuilder("generate_cover_letter", max_tokens=4800) \
+            .add("cv", cv_content, budget=2500, priority=1, focus=job_description) \
+            .add("job", job_description, budget=1500, priority=2) \
+            .add("company", company_info or "", budget=600, priority=3, focus=job_description) \
+            .add("research", company_facts or "", budget=400, priority=4, focus=job_description) \
+            .build()
+        
+        research = f"""
+        RECHERCHE SUR L'ENTREPRISE (actualités, valeurs, projets) :
+        {sections['research']}
+        """ if sections['research'] else ""
+        
+        return f"""
         Rédigez une lettre de motivation professionnelle basée sur :
         
         PROFIL CANDIDAT (CV) :
-        {cv_content}
+        {sections['cv']}
         
         OFFRE D'EMPLOI :
-        {job_description}
+        {sections['job']}
         
         INFORMATIONS ENTREPRISE :
-        {company_info}
-        
+        {sections['company']}
+        {research}
         Créez une lettre personnalisée, percutante et professionnelle.
         """
-        
-        return self.agent.run(query)
+    
+    @staticmethod
+    def _company_facts(company_research, company_name):
+        """
+        Fiche entreprise : `company_research` (fiche, ou recherche lancée par CompanyResearcher.start()
+        pendant la lecture du CV), sinon recherche de `company_name` (cache partagé),
+        attendue au plus COMPANY_RESEARCH_TIMEOUT secondes
+        """
+        if company_research is None and company_name:
+            company_research = get_company_researcher().start(company_name)
+        return resolve_company_research(company_research)
+    
+    def generate_cover_letter(self, cv_content, job_description, company_info="", company_research=None,
+                              company_name=""):
+        company_facts = self._company_facts(company_research, company_name)
+        # Une génération identique déjà en cours est partagée au lieu d'être relancée
+        key = flight_key(cv_content, job_description, company_info, company_facts)
+        return self.single_flight.do("generate_cover_letter", key, self._generate_cover_letter,
+                                     cv_content, job_description, company_info, company_facts)
+    
+    def _generate_cover_letter(self, cv_content, job_description, company_info, company_facts):
+        return self._run(self._build_query(cv_content, job_description, company_info, company_facts))
+    
+    def generate_cover_letter_stream(self, cv_content, job_description, company_info="", company_research=None,
+                                     company_name=""):
+        """Variante streaming : génère la lettre fragment par fragment"""
+        company_facts = self._company_facts(company_research, company_name)
+        yield from self._run_stream(self._build_query(cv_content, job_description, company_info, company_facts))
+    
+    def _run(self, query):
+        """Appelle le LLM en passant par le cache de réponses si activé"""
+        try:
+            return self.llm.complete(self.route, agent_messages(self.instructions, query),
+                                     cache=self.response_cache)
+        except LLMBackendError as e:
+            raise Exception(f"Erreur API LLM: {str(e)}")
+    
+    def _run_stream(self, query):
+        """Appelle le LLM en streaming, en passant par le cache de réponses si activé"""
+        try:
+            yield from self.llm.stream(self.route, agent_messages(self.instructions, query),
+                                       cache=self.response_cache)
+        except LLMBackendError as e:
+            raise Exception(f"Erreur API LLM: {str(e)}")
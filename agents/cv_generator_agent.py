@@ -1,15 +1,63 @@
-import requests
+import contextvars
+import hashlib
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from agents.cache import TieredCache
+from agents.http_client import LLMHttpError
+from agents.latex_sections import clean_latex_fragment, join_latex_document, split_latex_document
+from agents.llm_backend import LLMBackendError, build_llm_router, get_llm_router
+from agents.llm_cache import resolve_llm_cache
+from agents.prompt_builder import PromptBuilder
+from agents.single_flight import flight_key, get_single_flight
+from agents.skill_extractor import get_skill_extractor
+from agents.text_utils import SECTION_HEADINGS, strip_accents
+
+# Consignes de sortie communes à toutes les générations de CV
+LATEX_OUTPUT_INSTRUCTIONS = """Générez un code LaTeX complet pour Overleaf, optimisé pour les systèmes ATS.
+
+INSTRUCTIONS IMPORTANTES :
+1. Commencez directement par le code LaTeX complet
+2. Incluez tous les packages nécessaires
+3. Utilisez une structure moderne et professionnelle
+4. Optimisez pour les mots-clés de l'offre d'emploi
+5. Assurez-vous que le CV soit lisible par les systèmes ATS
+6. Utilisez des sections claires : Contact, Profil, Expérience, Formation, Compétences
+7. Quantifiez les réalisations quand possible
+8. Adaptez le vocabulaire au secteur ciblé
+
+Après le code LaTeX, ajoutez :
+- Un score d'optimisation ATS estimé (/100)
+- 3-5 conseils de personnalisation
+- Les mots-clés importants identifiés"""
+
+# Consigne ajoutée quand optimize_cv_section reçoit une section LaTeX
+LATEX_SECTION_FORMAT = """Réponds uniquement avec le corps LaTeX réécrit de la section, sans la commande
+\\section, sans préambule ni commentaire, en gardant les mêmes commandes et environnements."""
+
+# Sections recopiées telles quelles en régénération incrémentale (rien à adapter à l'offre)
+STATIC_SECTIONS = {"contact", "langues", "interets"}
+
 
 class CVGeneratorAgent:
-    def __init__(self, api_key):
+    def __init__(self, api_key, use_cache=True, base_url=None, http_client=None, llm_backend=None):
         self.api_key = api_key
-        self.base_url = "https://api.groq.com/openai/v1/chat/completions"
-        self.headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
+        # True = cache de réponses partagé, False = désactivé pour cet agent
+        self.response_cache = resolve_llm_cache(use_cache)
+        self.single_flight = get_single_flight()
+        # Routeur LLM partagé ; base_url/http_client surchargeables pour un serveur local de test
+        if llm_backend is None and (base_url or http_client):
+            llm_backend = build_llm_router(groq_api_key=api_key, groq_base_url=base_url, http_client=http_client)
+        self.llm = llm_backend or get_llm_router(groq_api_key=api_key)
+        # Extraction de mots-clés locale (le LLM ne sert que de repli)
+        self.keyword_extractor = get_skill_extractor()
+        # Corps de sections déjà optimisés, par (empreinte de la section, mots-clés de l'offre)
+        self.section_cache = TieredCache(
+            ttl=float(os.getenv('SECTION_CACHE_TTL', '604800')),
+            max_entries=int(os.getenv('SECTION_CACHE_MAX_ENTRIES', '2048')),
+            db_path=os.getenv('SECTION_CACHE_DB') or None
+        )
         
         self.instructions = """
 📄 Vous êtes un expert en création de CV optimisés pour les systèmes ATS !
@@ -54,90 +102,90 @@ Format de sortie :
 - Recommandations d'amélioration
 """
 
-    def _call_groq_api(self, messages, model="mixtral-8x7b-32768", max_tokens=40096, temperature=0.7):
+    def _call_llm(self, messages, max_tokens=4096, temperature=0.7, route="cv"):
         """
-        Appel à l'API Groq
+        Appel LLM via le routeur (fournisseur le plus rapide, requête couverte,
+        repli) et le cache de réponses si activé
         """
-        payload = {
-            "model": model,
-            "messages": messages,
-            "max_tokens": max_tokens,
-            "temperature": temperature
-        }
-        
         try:
-            response = requests.post(
-                self.base_url,
-                headers=self.headers,
-                json=payload,
-                timeout=60
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            return result['choices'][0]['message']['content']
+            return self.llm.complete(route, messages, temperature=temperature, max_tokens=max_tokens,
+                                     cache=self.response_cache)
+        except LLMBackendError as e:
+            raise Exception(f"Erreur API LLM: {str(e)}")
+
+    def _stream_llm(self, messages, max_tokens=4096, temperature=0.7, route="cv"):
+        """
+        Appel LLM en streaming : génère les fragments de texte au fil de l'eau
+        """
+        try:
+            yield from self.llm.stream(route, messages, temperature=temperature, max_tokens=max_tokens,
+                                       cache=self.response_cache)
+        except LLMBackendError as e:
+            raise Exception(f"Erreur API LLM: {str(e)}")
+        except LLMHttpError as e:
+            raise Exception(f"Erreur API LLM (réponse interrompue): {str(e)}")
+
+    def _build_cv_messages(self, original_cv, job_description, personal_info=None):
+        """
+        Construit les messages (système + utilisateur) de génération de CV
+        """
+        # Ajouter la date actuelle aux instructions (au jour près pour que le cache reste efficace)
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        instructions_with_date = f"{self.instructions}\n\nDate actuelle: {current_date}"
         
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Erreur API Groq: {str(e)}")
-        except KeyError as e:
-            raise Exception(f"Format de réponse inattendu: {str(e)}")
+        # Sections ajustées au budget de tokens (le CV est résumé autour des mots de l'offre)
+        sections = PromptBuilder("generate_cv", max_tokens=5000) \
+            .add("cv", original_cv, budget=3000, priority=1, focus=job_description) \
+            .add("job", job_description, budget=1500, priority=2) \
+            .add("personal", personal_info or "", budget=400, priority=3, focus=job_description) \
+            .build()
+        
+        # Construire le prompt
+        query = f"""
+        Créez un CV personnalisé optimisé ATS basé sur :
+       
+        CV ORIGINAL :
+        {sections['cv']}
+       
+        OFFRE D'EMPLOI :
+        {sections['job']}
+       
+        INFORMATIONS PERSONNELLES :
+        {sections['personal'] or "Utiliser les informations du CV original"}
+       
+        {LATEX_OUTPUT_INSTRUCTIONS}
+        """
+        
+        # Préparer les messages pour l'API
+        messages = [
+            {
+                "role": "system",
+                "content": instructions_with_date
+            },
+            {
+                "role": "user",
+                "content": query
+            }
+        ]
+        return messages
 
     def generate_cv(self, original_cv, job_description, personal_info=None):
         """
         Génère un CV personnalisé optimisé ATS
+        
+        Une génération identique déjà en cours est partagée au lieu d'être relancée.
         """
+        key = flight_key(original_cv, job_description, personal_info)
+        return self.single_flight.do("generate_cv", key, self._generate_cv,
+                                     original_cv, job_description, personal_info)
+
+    def _generate_cv(self, original_cv, job_description, personal_info):
         try:
-            # Ajouter la date actuelle aux instructions
-            current_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            instructions_with_date = f"{self.instructions}\n\nDate et heure actuelles: {current_datetime}"
+            messages = self._build_cv_messages(original_cv, job_description, personal_info)
             
-            # Construire le prompt
-            query = f"""
-            Créez un CV personnalisé optimisé ATS basé sur :
-           
-            CV ORIGINAL :
-            {original_cv}
-           
-            OFFRE D'EMPLOI :
-            {job_description}
-           
-            INFORMATIONS PERSONNELLES :
-            {personal_info if personal_info else "Utiliser les informations du CV original"}
-           
-            Générez un code LaTeX complet pour Overleaf, optimisé pour les systèmes ATS.
-            
-            INSTRUCTIONS IMPORTANTES :
-            1. Commencez directement par le code LaTeX complet
-            2. Incluez tous les packages nécessaires
-            3. Utilisez une structure moderne et professionnelle
-            4. Optimisez pour les mots-clés de l'offre d'emploi
-            5. Assurez-vous que le CV soit lisible par les systèmes ATS
-            6. Utilisez des sections claires : Contact, Profil, Expérience, Formation, Compétences
-            7. Quantifiez les réalisations quand possible
-            8. Adaptez le vocabulaire au secteur ciblé
-            
-            Après le code LaTeX, ajoutez :
-            - Un score d'optimisation ATS estimé (/100)
-            - 3-5 conseils de personnalisation
-            - Les mots-clés importants identifiés
-            """
-            
-            # Préparer les messages pour l'API
-            messages = [
-                {
-                    "role": "system",
-                    "content": instructions_with_date
-                },
-                {
-                    "role": "user",
-                    "content": query
-                }
-            ]
-            
-            # Appel à l'API Groq
-            response = self._call_groq_api(
+            # Appel LLM (route "cv" : Mixtral en priorité)
+            response = self._call_llm(
                 messages=messages,
-                model="mixtral-8x7b-32768",  # Modèle recommandé pour la génération de texte
                 max_tokens=4096,
                 temperature=0.7
             )
@@ -147,11 +195,198 @@ Format de sortie :
         except Exception as e:
             raise Exception(f"Erreur lors de la génération du CV: {str(e)}")
 
-    def analyze_job_keywords(self, job_description):
+    def generate_cv_stream(self, original_cv, job_description, personal_info=None):
+        """
+        Variante streaming de generate_cv : génère le LaTeX fragment par fragment
+        """
+        messages = self._build_cv_messages(original_cv, job_description, personal_info)
+        try:
+            yield from self._stream_llm(
+                messages=messages,
+                max_tokens=4096,
+                temperature=0.7
+            )
+        except Exception as e:
+            raise Exception(f"Erreur lors de la génération du CV: {str(e)}")
+
+    def regenerate_cv_sections(self, base_latex, job_description, max_concurrency=None):
+        """
+        Régénération incrémentale d'un CV LaTeX déjà généré pour une nouvelle version de l'offre
+        
+        Chaque section est optimisée via optimize_cv_section et mise en cache par
+        (empreinte de la section d'origine, mots-clés de l'offre) : seules les
+        sections dont l'une de ces entrées a changé repartent au LLM, en parallèle.
+        `base_latex` doit rester le document de référence d'une itération à l'autre.
+        
+        Returns:
+            {"latex": document, "sections": n, "regenerated": [...], "reused": [...], "unchanged": [...]}
+        """
+        try:
+            parts = split_latex_document(base_latex)
+            if not parts["sections"]:
+                raise ValueError("aucune section \\section{...} trouvée dans le LaTeX")
+            
+            keywords = self._job_keyword_set(job_description)
+            keywords_text = ", ".join(keywords)
+            keywords_hash = hashlib.sha256(json.dumps(keywords, ensure_ascii=False).encode("utf-8")).hexdigest()
+            report = {"sections": len(parts["sections"]), "regenerated": [], "reused": [], "unchanged": []}
+            
+            pending = []
+            for section in parts["sections"]:
+                if self._section_type(section["title"]) in STATIC_SECTIONS:
+                    report["unchanged"].append(section["title"])
+                    continue
+                content_hash = hashlib.sha256((section["header"] + section["body"]).encode("utf-8")).hexdigest()
+                key = f"{content_hash}:{keywords_hash}"
+                cached = self.section_cache.get(key)
+                if cached is not None:
+                    section["body"] = cached
+                    report["reused"].append(section["title"])
+                else:
+                    pending.append((section, key))
+            
+            if pending:
+                workers = min(max_concurrency or int(os.getenv('GROQ_MAX_CONCURRENCY', '4')), len(pending))
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cv-section") as executor:
+                    outputs = list(executor.map(
+                        lambda item: self.optimize_cv_section(item[0]["body"], keywords_text, item[0]["title"], latex=True),
+                        pending
+                    ))
+                for (section, key), output in zip(pending, outputs):
+                    section["body"] = clean_latex_fragment(output, section["body"])
+                    self.section_cache.set(key, section["body"])
+                    report["regenerated"].append(section["title"])
+            
+            print(f"♻️ CV incrémental: {len(report['regenerated'])} section(s) régénérée(s), "
+                  f"{len(report['reused'])} réutilisée(s), {len(report['unchanged'])} inchangée(s)")
+            return dict(report, latex=join_latex_document(parts))
+            
+        except Exception as e:
+            raise Exception(f"Erreur lors de la régénération incrémentale du CV: {str(e)}")
+
+    def _job_keyword_set(self, job_description):
+        """
+        Mots-clés (techniques + soft skills) triés de l'offre, base de la clé de cache des sections
+        """
+        analysis = self.analyze_job_keywords(job_description)
+        try:
+            analysis = json.loads(analysis)
+            keywords = analysis.get("mots_cles_techniques", []) + analysis.get("soft_skills", [])
+        except (ValueError, AttributeError):
+            keywords = [analysis.strip()]
+        return sorted({str(keyword) for keyword in keywords}, key=str.lower)
+
+    @staticmethod
+    def _section_type(title):
+        candidate = strip_accents(title).lower().strip()
+        for name, aliases in SECTION_HEADINGS.items():
+            if candidate in aliases:
+                return name
+        return candidate
+
+    def _build_batch_prefix(self, original_cv, job_descriptions, personal_info=None):
+        """
+        Message système commun à toutes les offres d'un lot
+
+        Le CV n'est analysé et résumé qu'une fois (autour du vocabulaire de toutes
+        les offres) ; ce préfixe identique d'un appel à l'autre profite du cache de
+        préfixe des fournisseurs, seule l'offre change dans le message utilisateur.
+        """
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        all_jobs = "\n".join(job_descriptions)
+        sections = PromptBuilder("generate_cv_batch", max_tokens=3500) \
+            .add("cv", original_cv, budget=3000, priority=1, focus=all_jobs) \
+            .add("personal", personal_info or "", budget=400, priority=2, focus=all_jobs) \
+            .build()
+        
+        return f"""{self.instructions}
+
+Date actuelle: {current_date}
+
+CV ORIGINAL :
+{sections['cv']}
+
+INFORMATIONS PERSONNELLES :
+{sections['personal'] or "Utiliser les informations du CV original"}
+
+Pour chaque offre reçue, créez un CV personnalisé optimisé ATS basé sur ce CV.
+{LATEX_OUTPUT_INSTRUCTIONS}"""
+
+    def _build_batch_job_message(self, job_description):
+        """
+        Message propre à une offre du lot (offre + mots-clés extraits localement)
+        """
+        sections = PromptBuilder("generate_cv_batch_job", max_tokens=1700) \
+            .add("job", job_description, budget=1500) \
+            .build()
+        keywords = self.keyword_extractor.extract(job_description)["mots_cles_techniques"]
+        
+        return f"""OFFRE D'EMPLOI :
+{sections['job']}
+
+MOTS-CLÉS DE L'OFFRE : {", ".join(keywords) or "à identifier dans l'offre"}"""
+
+    def generate_cv_batch(self, original_cv, job_descriptions, personal_info=None, max_concurrency=None):
+        """
+        Génère un CV adapté à chacune des offres, en parallèle
+        
+        Args:
+            max_concurrency: Générations simultanées (GROQ_MAX_CONCURRENCY par défaut ; le routeur
+                LLM plafonne en plus chaque fournisseur pour toute l'application)
+        
+        Yields:
+            {"index": ..., "success": True, "data": latex} ou {"index": ..., "success": False, "error": ...}
+            dans l'ordre de fin des générations
+        """
+        if not job_descriptions:
+            return
+        
+        system_prompt = self._build_batch_prefix(original_cv, job_descriptions, personal_info)
+        workers = min(max_concurrency or int(os.getenv('GROQ_MAX_CONCURRENCY', '4')), len(job_descriptions))
+        
+        def generate(job_description):
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": self._build_batch_job_message(job_description)}
+            ]
+            return self._call_llm(
+                messages=messages,
+                max_tokens=4096,
+                temperature=0.7
+            )
+        
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cv-batch")
+        try:
+            # Contexte copié : les fournisseurs utilisés restent attribués à l'appelant (record_providers)
+            futures = {executor.submit(contextvars.copy_context().run, generate, job): index
+                       for index, job in enumerate(job_descriptions)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    yield {"index": index, "success": True, "data": future.result()}
+                except Exception as e:
+                    yield {"index": index, "success": False,
+                           "error": f"Erreur lors de la génération du CV: {str(e)}"}
+        finally:
+            # Client déconnecté : les générations pas encore démarrées sont abandonnées
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def analyze_job_keywords(self, job_description, use_llm_fallback=True):
         """
         Analyse les mots-clés importants d'une offre d'emploi
+
+        L'extraction est locale (taxonomie compilée) ; le LLM n'est appelé que si
+        la taxonomie couvre mal l'offre. Renvoie la structure JSON sérialisée.
         """
         try:
+            analysis = self.keyword_extractor.extract(job_description)
+            if analysis["couverture"]["suffisante"] or not use_llm_fallback:
+                return json.dumps(analysis, ensure_ascii=False, indent=2)
+            
+            sections = PromptBuilder("analyze_job_keywords", max_tokens=2000) \
+                .add("job", job_description, budget=2000) \
+                .build()
+            
             messages = [
                 {
                     "role": "system",
@@ -168,24 +403,61 @@ Format de sortie :
                     5. Les responsabilités clés
                     
                     OFFRE D'EMPLOI :
-                    {job_description}
+                    {sections['job']}
                     
-                    Format de réponse : JSON structuré
+                    Format de réponse : uniquement un objet JSON avec les clés
+                    "mots_cles_techniques", "soft_skills", "formation_certifications" (listes),
+                    "niveau_experience" (texte) et "responsabilites_cles" (liste)
                     """
                 }
             ]
             
-            response = self._call_groq_api(messages, temperature=0.3)
-            return response
+            response = self._call_llm(messages, temperature=0.3)
+            return self._merge_keyword_analysis(analysis, response)
             
         except Exception as e:
             raise Exception(f"Erreur lors de l'analyse des mots-clés: {str(e)}")
 
-    def optimize_cv_section(self, section_content, job_keywords, section_type):
+    @staticmethod
+    def _merge_keyword_analysis(analysis, response):
+        """
+        Complète l'analyse locale avec la réponse JSON du LLM (réponse brute si illisible)
+        """
+        start, end = response.find("{"), response.rfind("}")
+        try:
+            llm_analysis = json.loads(response[start:end + 1])
+        except ValueError:
+            return response
+        if not isinstance(llm_analysis, dict):
+            return response
+        
+        merged = dict(analysis)
+        for key, value in llm_analysis.items():
+            if key in merged and isinstance(merged[key], list) and isinstance(value, list):
+                merged[key] = merged[key] + [item for item in value if item not in merged[key]]
+            elif key in merged and value and merged[key] in ("", "Non spécifié"):
+                merged[key] = value
+        merged["couverture"] = dict(analysis["couverture"], source="local+llm")
+        return json.dumps(merged, ensure_ascii=False, indent=2)
+
+    def analyze_job_keywords_batch(self, job_descriptions):
+        """
+        Analyse locale d'un lot d'offres (aucun appel LLM), résultats dans l'ordre
+        """
+        return self.keyword_extractor.extract_batch(job_descriptions)
+
+    def optimize_cv_section(self, section_content, job_keywords, section_type, latex=False):
         """
         Optimise une section spécifique du CV
+        
+        Avec `latex=True`, la section est du LaTeX et seul son corps réécrit est attendu en retour.
         """
         try:
+            sections = PromptBuilder("optimize_cv_section", max_tokens=2000) \
+                .add("section", section_content, budget=1500, priority=1) \
+                .add("keywords", job_keywords, budget=500, priority=2) \
+                .build()
+            
             messages = [
                 {
                     "role": "system",
@@ -197,10 +469,10 @@ Format de sortie :
                     Optimise cette section de CV :
                     
                     SECTION ACTUELLE ({section_type}) :
-                    {section_content}
+                    {sections['section']}
                     
                     MOTS-CLÉS À INTÉGRER :
-                    {job_keywords}
+                    {sections['keywords']}
                     
                     Réécrire la section pour :
                     1. Intégrer naturellement les mots-clés
@@ -208,11 +480,12 @@ Format de sortie :
                     3. Utiliser des verbes d'action
                     4. Maintenir la vérité des informations
                     5. Optimiser pour les systèmes ATS
+                    {LATEX_SECTION_FORMAT if latex else ""}
                     """
                 }
             ]
             
-            response = self._call_groq_api(messages, temperature=0.5)
+            response = self._call_llm(messages, temperature=0.5)
             return response
             
         except Exception as e:
@@ -223,6 +496,11 @@ Format de sortie :
         Fournit un feedback détaillé sur le CV généré
         """
         try:
+            sections = PromptBuilder("get_cv_feedback", max_tokens=5000) \
+                .add("cv", cv_latex, budget=3500, priority=1, focus=job_description) \
+                .add("job", job_description, budget=1500, priority=2) \
+                .build()
+            
             messages = [
                 {
                     "role": "system",
@@ -234,10 +512,10 @@ Format de sortie :
                     Évalue ce CV LaTeX par rapport à cette offre d'emploi :
                     
                     CV LATEX :
-                    {cv_latex}
+                    {sections['cv']}
                     
                     OFFRE D'EMPLOI :
-                    {job_description}
+                    {sections['job']}
                     
                     Fournis :
                     1. Score ATS estimé (/100) avec justification
@@ -250,7 +528,7 @@ Format de sortie :
                 }
             ]
             
-            response = self._call_groq_api(messages, temperature=0.3)
+            response = self._call_llm(messages, temperature=0.3)
             return response
             
         except Exception as e:
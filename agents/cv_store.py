@@ -0,0 +1,112 @@
+"""
+Stockage des CV adressé par contenu : un CV est uploadé et analysé une seule fois
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from agents.cache import TieredCache
+from agents.document_ingestion import extract_spooled, spooled_upload
+from agents.metrics import span
+from agents.text_utils import detect_sections, estimate_tokens, normalize_text
+
+
+class CVNotFoundError(LookupError):
+    """cv_id inconnu ou expiré"""
+
+
+class CVStore:
+    """
+    CV indexés par SHA-256 des octets du fichier, avec artefacts précalculés
+
+    Args:
+        ttl: Durée de conservation d'un CV depuis son dernier upload (secondes)
+        max_entries: Nombre de CV gardés en mémoire (éviction LRU)
+        db_path: Fichier SQLite du niveau disque (None = mémoire seule)
+    """
+
+    def __init__(self, ttl: float = 86400, max_entries: int = 512, db_path: str = None):
+        self.cache = TieredCache(ttl=ttl, max_entries=max_entries, db_path=db_path)
+        self._stats = {"uploads": 0, "reused": 0, "lookups": 0, "lookup_misses": 0}
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def build_record(cv_id: str, filename: str, text: str) -> Dict[str, Any]:
+        normalized = normalize_text(text)
+        return {
+            "cv_id": cv_id,
+            "filename": filename,
+            "text": text,
+            "normalized_text": normalized,
+            "sections": detect_sections(normalized),
+            "token_count": estimate_tokens(normalized),
+            "created_at": time.time(),
+        }
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def put(self, file) -> Dict[str, Any]:
+        """
+        Analyse un upload (FileStorage) et l'enregistre ; un CV déjà connu n'est pas réanalysé
+        mais réenregistré, pour que sa conservation reparte de ce nouvel upload
+        """
+        self._count("uploads")
+        with span("extract_document"):
+            with spooled_upload(file) as (path, cv_id):
+                # L'empreinte suffit à reconnaître un CV déjà stocké : il n'est pas relu
+                record = self.cache.get(cv_id)
+                if record is None:
+                    record = self.build_record(cv_id, file.filename, extract_spooled(path, cv_id))
+                else:
+                    self._count("reused")
+        self.cache.set(cv_id, record)
+        return record
+
+    def get(self, cv_id: str) -> Optional[Dict[str, Any]]:
+        self._count("lookups")
+        record = self.cache.get(cv_id)
+        if record is None:
+            self._count("lookup_misses")
+        return record
+
+    def require(self, cv_id: str) -> Dict[str, Any]:
+        record = self.get(cv_id)
+        if record is None:
+            raise CVNotFoundError(f"CV introuvable ou expiré: {cv_id}")
+        return record
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["memory_entries"] = len(self.cache.memory)
+        return stats
+
+
+def summarize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Vue renvoyée au client (sans le texte complet)"""
+    return {
+        "cv_id": record["cv_id"],
+        "filename": record["filename"],
+        "token_count": record["token_count"],
+        "sections": sorted(record["sections"].keys()),
+    }
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_cv_store() -> CVStore:
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = CVStore(
+                ttl=float(os.getenv('CV_STORE_TTL', '86400')),
+                max_entries=int(os.getenv('CV_STORE_MAX_ENTRIES', '512')),
+                db_path=os.getenv('CV_STORE_DB') or None,
+            )
+        return _default_store
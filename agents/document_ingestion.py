@@ -0,0 +1,229 @@
+"""
+Ingestion des CV uploadés : copie sur disque, extraction parallèle par page, cache par empreinte
+
+Les PDF et DOCX sont toujours analysés dans un pool de processus, sous un délai unique
+par document : un fichier malformé n'immobilise jamais un thread du serveur.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Iterator, List, Optional, Tuple
+
+from agents.cache import TieredCache
+from agents.metrics import PAYLOAD_BYTES, span
+
+MAX_PAGES = int(os.getenv('INGESTION_MAX_PAGES', '50'))
+DOCUMENT_TIMEOUT = float(os.getenv('INGESTION_TIMEOUT', '30'))
+# En dessous de ce nombre de pages, le PDF est extrait d'un bloc par un seul processus
+PARALLEL_MIN_PAGES = int(os.getenv('INGESTION_PARALLEL_MIN_PAGES', '8'))
+PAGES_PER_TASK = 4
+COPY_CHUNK_SIZE = 64 * 1024
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+_text_cache = TieredCache(
+    ttl=float(os.getenv('INGESTION_CACHE_TTL', '3600')),
+    max_entries=int(os.getenv('INGESTION_CACHE_MAX_ENTRIES', '256')),
+)
+
+
+class DocumentExtractionError(ValueError):
+    """Document illisible, trop lent à traiter ou de format non supporté"""
+
+
+def _register_worker(workers):
+    """Initialiseur des processus du pool : annonce leur PID pour pouvoir les arrêter"""
+    workers.put(os.getpid())
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            workers = int(os.getenv('INGESTION_WORKERS', str(max(2, (os.cpu_count() or 2) // 2))))
+            # "spawn" : un fork depuis le serveur Flask multi-thread hériterait de verrous détenus par d'autres threads
+            context = multiprocessing.get_context("spawn")
+            _pool_workers = context.SimpleQueue()
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                        initializer=_register_worker, initargs=(_pool_workers,))
+        return _pool
+
+
+def _recycle_pool(pool: ProcessPoolExecutor):
+    """
+    Abandonne un pool dont des tâches ont dépassé le délai : ses processus sont arrêtés
+    (cancel() n'interrompt pas une tâche déjà lancée), le prochain appel en crée un neuf
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not pool:
+            return
+        workers = _pool_workers
+        _pool = _pool_workers = None
+    pids = []
+    while not workers.empty():
+        pids.append(workers.get())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+def _run_with_deadline(deadline: float, function, *args):
+    """
+    Exécute `function(*args)` dans le pool ; au-delà de `deadline` (time.monotonic()),
+    le pool est recyclé et l'extraction abandonnée
+    """
+    pool = _get_pool()
+    future = pool.submit(function, *args)
+    return _wait_result(pool, future, deadline)
+
+
+def _wait_result(pool: ProcessPoolExecutor, future, deadline: float):
+    try:
+        return future.result(timeout=max(0, deadline - time.monotonic()))
+    except FutureTimeoutError:
+        _recycle_pool(pool)
+        raise DocumentExtractionError(f"Extraction du document trop longue (> {DOCUMENT_TIMEOUT:.0f} s)")
+
+
+def _extract_pdf_pages(path: str, start: int, stop: int) -> List[str]:
+    """Exécuté dans un processus du pool : extrait les pages [start, stop)"""
+    import PyPDF2
+
+    with open(path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _probe_pdf(path: str) -> Tuple[int, Optional[str]]:
+    """
+    Exécuté dans un processus du pool : nombre de pages, et texte complet si le
+    document est trop court pour être découpé
+    """
+    import PyPDF2
+
+    with open(path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        page_count = min(len(reader.pages), MAX_PAGES)
+        if page_count >= PARALLEL_MIN_PAGES:
+            return page_count, None
+        return page_count, "".join(reader.pages[i].extract_text() or "" for i in range(page_count))
+
+
+def _extract_pdf(path: str) -> str:
+    # Un seul délai pour tout le document : lecture de la structure comprise
+    deadline = time.monotonic() + DOCUMENT_TIMEOUT
+    page_count, text = _run_with_deadline(deadline, _probe_pdf, path)
+    if text is not None:
+        return text
+
+    pool = _get_pool()
+    futures = [pool.submit(_extract_pdf_pages, path, start, min(start + PAGES_PER_TASK, page_count))
+               for start in range(0, page_count, PAGES_PER_TASK)]
+    # Les fragments sont rassemblés dans l'ordre des pages
+    parts = []
+    for future in futures:
+        parts.extend(_wait_result(pool, future, deadline))
+    return "".join(parts)
+
+
+def _extract_docx_paragraphs(path: str) -> str:
+    import docx
+
+    document = docx.Document(path)
+    return "".join(paragraph.text + "\n" for paragraph in document.paragraphs)
+
+
+def _extract_docx(path: str) -> str:
+    return _run_with_deadline(time.monotonic() + DOCUMENT_TIMEOUT, _extract_docx_paragraphs, path)
+
+
+def _extract_txt(path: str) -> str:
+    with open(path, 'rb') as f:
+        return f.read().decode('utf-8')
+
+
+_EXTRACTORS = {
+    '.pdf': _extract_pdf,
+    '.docx': _extract_docx,
+    '.txt': _extract_txt,
+}
+
+
+def spool_upload(file) -> Tuple[str, str]:
+    """
+    Copie l'upload sur disque par blocs en calculant son SHA-256
+
+    Returns:
+        (chemin du fichier temporaire, empreinte hexadécimale)
+    """
+    extension = os.path.splitext(file.filename.lower())[1]
+    digest = hashlib.sha256()
+    stream = getattr(file, 'stream', file)
+    with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as spooled:
+        while True:
+            chunk = stream.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            spooled.write(chunk)
+    return spooled.name, digest.hexdigest()
+
+
+@contextmanager
+def spooled_upload(file) -> Iterator[Tuple[str, str]]:
+    """
+    Upload PDF, DOCX ou TXT copié sur disque le temps du bloc `with`
+
+    Yields:
+        (chemin du fichier temporaire, SHA-256 des octets du fichier)
+    """
+    extension = os.path.splitext(file.filename.lower())[1]
+    if extension not in _EXTRACTORS:
+        raise DocumentExtractionError("Format de fichier non supporté. Utilisez PDF, DOCX ou TXT.")
+    path, content_hash = spool_upload(file)
+    try:
+        PAYLOAD_BYTES.observe(os.path.getsize(path), stage="extract_document", direction="request")
+        yield path, content_hash
+    finally:
+        os.unlink(path)
+
+
+def extract_spooled(path: str, content_hash: str) -> str:
+    """Texte d'un fichier copié par `spooled_upload` ; le même contenu n'est analysé qu'une fois"""
+    extension = os.path.splitext(path)[1]
+    extractor = _EXTRACTORS[extension]
+    return _text_cache.get_or_compute(f"{extension}:{content_hash}", lambda: extractor(path))
+
+
+def extract_document(file) -> Tuple[str, str]:
+    """
+    Extrait le texte d'un upload PDF, DOCX ou TXT (objet FileStorage de Flask)
+
+    Le même fichier envoyé sur plusieurs endpoints n'est analysé qu'une fois.
+
+    Returns:
+        (texte extrait, SHA-256 des octets du fichier)
+    """
+    with span("extract_document"):
+        with spooled_upload(file) as (path, content_hash):
+            return extract_spooled(path, content_hash), content_hash
+
+
+def extract_document_text(file) -> str:
+    return extract_document(file)[0]
+
+
+def extraction_cache_stats():
+    return _text_cache.stats()
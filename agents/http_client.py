@@ -0,0 +1,188 @@
+"""
+Client HTTP partagé pour les appels LLM : pool de connexions, keep-alive, retries
+
+httpx et requests ne sont importés qu'à la création du premier client : importer
+ce module (et la couche LLM) ne coûte rien au démarrage des workers.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _import_httpx():
+    """Module httpx si httpx et h2 sont installés (HTTP/2 possible), sinon None"""
+    try:
+        import httpx
+        import h2  # noqa: F401  (requis par httpx pour HTTP/2)
+    except ImportError:
+        return None
+    return httpx
+
+
+class LLMHttpError(Exception):
+    """Erreur HTTP définitive après épuisement des tentatives"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMHttpClient:
+    """
+    Client HTTP thread-safe réutilisé par les agents et les threads Flask
+
+    Utilise httpx en HTTP/2 si `httpx` et `h2` sont installés, sinon une
+    `requests.Session` avec un pool de connexions keep-alive.
+
+    Args:
+        pool_size: Nombre de connexions conservées par hôte
+        connect_timeout: Timeout d'établissement de connexion (secondes)
+        read_timeout: Timeout de lecture de la réponse (secondes)
+        max_retries: Nombre de nouvelles tentatives sur 429/5xx et erreurs réseau
+        backoff_base: Délai de base du backoff exponentiel (secondes)
+        backoff_max: Délai maximal entre deux tentatives (secondes)
+        http2: Forcer (True) ou désactiver (False) HTTP/2 ; None = si disponible
+    """
+
+    def __init__(self, pool_size: int = 20, connect_timeout: float = 5.0, read_timeout: float = 60.0,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 http2: Optional[bool] = None):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._httpx = _import_httpx() if http2 is not False else None
+        self.http2 = self._httpx is not None
+
+        if self.http2:
+            httpx = self._httpx
+            self._client = httpx.Client(
+                http2=True,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+            self._network_errors = (httpx.TransportError,)
+        else:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self._client = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            self._client.mount("https://", adapter)
+            self._client.mount("http://", adapter)
+            self._network_errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Backoff exponentiel avec jitter complet ; respecte Retry-After s'il est fourni"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _send(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout=None, stream: bool = False):
+        if self.http2:
+            request = self._client.build_request(
+                "POST", url, headers=headers, json=payload,
+                timeout=timeout if timeout is not None else self._httpx.USE_CLIENT_DEFAULT
+            )
+            return self._client.send(request, stream=stream)
+        return self._client.post(
+            url, headers=headers, json=payload, stream=stream,
+            timeout=timeout if timeout is not None else (self.connect_timeout, self.read_timeout)
+        )
+
+    def post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout=None, stream: bool = False):
+        """
+        POST avec retries sur 429/5xx et erreurs de connexion
+
+        Returns:
+            L'objet réponse (requests.Response ou httpx.Response) en statut 2xx
+        """
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._send(url, headers, payload, timeout=timeout, stream=stream)
+            except self._network_errors as e:
+                last_error = LLMHttpError(f"Erreur réseau: {str(e)}")
+                retry_after = None
+            else:
+                if response.status_code < 400:
+                    return response
+                retry_after = response.headers.get("Retry-After")
+                if stream and self.http2:
+                    response.read()
+                last_error = LLMHttpError(
+                    f"HTTP {response.status_code}: {response.text[:500]}",
+                    status_code=response.status_code
+                )
+                response.close()
+                if response.status_code not in RETRY_STATUS_CODES:
+                    raise last_error
+
+            if attempt < self.max_retries:
+                time.sleep(self._backoff_delay(attempt, retry_after))
+
+        raise last_error
+
+    def post_json(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout=None) -> Dict[str, Any]:
+        """POST puis décodage JSON de la réponse"""
+        response = self.post(url, headers, payload, timeout=timeout)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise LLMHttpError(f"Réponse JSON invalide: {str(e)}", status_code=response.status_code)
+
+    def iter_sse_data(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout=None):
+        """
+        POST en streaming et itération sur les champs `data:` d'un flux SSE
+
+        S'arrête sur le marqueur `[DONE]` utilisé par les API compatibles OpenAI.
+        """
+        response = self.post(url, headers, payload, timeout=timeout, stream=True)
+        try:
+            if self.http2:
+                lines = response.iter_lines()
+            else:
+                response.encoding = response.encoding or "utf-8"
+                lines = response.iter_lines(decode_unicode=True)
+            for line in lines:
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                yield data
+        finally:
+            response.close()
+
+    def close(self):
+        self._client.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_http_client() -> LLMHttpClient:
+    """Client partagé par tout le processus, configuré par variables d'environnement"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            http2_env = os.getenv('LLM_HTTP2')
+            _default_client = LLMHttpClient(
+                pool_size=int(os.getenv('LLM_HTTP_POOL_SIZE', '20')),
+                connect_timeout=float(os.getenv('LLM_HTTP_CONNECT_TIMEOUT', '5')),
+                read_timeout=float(os.getenv('LLM_HTTP_READ_TIMEOUT', '60')),
+                max_retries=int(os.getenv('LLM_HTTP_MAX_RETRIES', '3')),
+                http2=None if http2_env is None else http2_env == '1',
+            )
+        return _default_client
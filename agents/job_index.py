@@ -0,0 +1,257 @@
+"""
+Index local et persistant des offres d'emploi (SQLite FTS5)
+
+Chaque résultat de recherche y est inséré ou mis à jour (dédoublonnage par URL
+canonique) ; les recherches suivantes interrogent d'abord l'index et ne repartent
+sur le web que si les données sont absentes ou trop anciennes.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from agents.result_filter import canonicalize_url
+from agents.text_utils import strip_accents
+
+OFFER_FIELDS = ("title", "snippet", "nom_poste", "entreprise", "localisation", "type_contrat", "salaire",
+                "date_publication", "description", "source")
+_FTS_TERM_RE = re.compile(r"[\w+#]+")
+
+
+def normalize_query_key(*parts: str) -> str:
+    """Clé d'une recherche, insensible à la casse, aux accents et aux espaces"""
+    return "|".join(" ".join(strip_accents((part or "").lower()).split()) for part in parts)
+
+
+def _fts_group(text: str, operator: str = "OR") -> Optional[str]:
+    terms = [f'"{term}"' for term in _FTS_TERM_RE.findall(strip_accents(text.lower())) if len(term) > 1]
+    if not terms:
+        return None
+    return "(" + f" {operator} ".join(terms) + ")"
+
+
+class JobIndex:
+    """
+    Index d'offres avec recherche plein texte filtrée
+
+    Args:
+        db_path: Fichier SQLite (":memory:" pour un index éphémère)
+    """
+
+    def __init__(self, db_path: str = ":memory:"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[List[Dict[str, Any]], Optional[str]], None]] = []
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS offers (
+                id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE NOT NULL,
+                title TEXT, snippet TEXT, nom_poste TEXT, entreprise TEXT, localisation TEXT,
+                type_contrat TEXT, salaire TEXT, date_publication TEXT, description TEXT, source TEXT, competences TEXT,
+                ingested_at REAL NOT NULL, updated_at REAL NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS offers_fts USING fts5(
+                text, competences, localisation, type_contrat, tokenize = 'unicode61 remove_diacritics 2'
+            );
+            CREATE TABLE IF NOT EXISTS refreshed_queries (
+                query_key TEXT PRIMARY KEY,
+                refreshed_at REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def offer_from_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Convertit un résultat de recherche (ou une offre déjà structurée) en offre indexable"""
+        offer = {field: result.get(field) or "" for field in OFFER_FIELDS}
+        offer["url"] = result.get("url", "")
+        offer["nom_poste"] = offer["nom_poste"] or offer["title"]
+        competences = result.get("competences") or []
+        offer["competences"] = competences if isinstance(competences, list) else [competences]
+        return offer
+
+    def subscribe(self, listener: Callable[[List[Dict[str, Any]], Optional[str]], None]) -> int:
+        """
+        Appelle `listener(offres, query_key)` avec les offres nouvellement indexées (pas les mises à jour)
+
+        Returns:
+            Identifiant de la dernière offre déjà indexée : les offres d'identifiant supérieur
+            seront notifiées, les autres se relisent avec `iter_offers(max_id=...)`
+        """
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM offers").fetchone()[0]
+
+    def upsert(self, results: Iterable[Dict[str, Any]], query_key: str = None) -> int:
+        """Insère ou met à jour des offres ; renvoie le nombre d'offres écrites"""
+        now = time.time()
+        written = 0
+        inserted = []
+        with self._lock:
+            for result in results:
+                if "error" in result or not result.get("url"):
+                    continue
+                offer = self.offer_from_result(result)
+                url = canonicalize_url(offer["url"])
+                competences = json.dumps(offer["competences"], ensure_ascii=False)
+                row = self._conn.execute("SELECT id, ingested_at FROM offers WHERE url = ?", (url,)).fetchone()
+                values = [offer[field] for field in OFFER_FIELDS] + [competences]
+                if row is None:
+                    cursor = self._conn.execute(
+                        f"INSERT INTO offers (url, {', '.join(OFFER_FIELDS)}, competences, ingested_at, updated_at) "
+                        f"VALUES (?, {', '.join('?' for _ in OFFER_FIELDS)}, ?, ?, ?)",
+                        [url] + values + [now, now]
+                    )
+                    offer_id = cursor.lastrowid
+                    inserted.append(dict(offer, url=url, ingested_at=now))
+                else:
+                    offer_id = row["id"]
+                    self._conn.execute(
+                        f"UPDATE offers SET {', '.join(f'{field} = ?' for field in OFFER_FIELDS)}, "
+                        "competences = ?, updated_at = ? WHERE id = ?",
+                        values + [now, offer_id]
+                    )
+                    self._conn.execute("DELETE FROM offers_fts WHERE rowid = ?", (offer_id,))
+                self._conn.execute(
+                    "INSERT INTO offers_fts (rowid, text, competences, localisation, type_contrat) VALUES (?, ?, ?, ?, ?)",
+                    (offer_id,
+                     f"{offer['title']} {offer['nom_poste']} {offer['entreprise']} {offer['snippet']} {offer['description']}",
+                     " ".join(offer["competences"]), offer["localisation"], offer["type_contrat"])
+                )
+                written += 1
+            if query_key is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO refreshed_queries (query_key, refreshed_at) VALUES (?, ?)",
+                    (query_key, now)
+                )
+            self._conn.commit()
+            listeners = list(self._listeners)
+        if inserted:
+            for listener in listeners:
+                try:
+                    listener(inserted, query_key)
+                except Exception as e:
+                    print(f"⚠️ Abonné de l'index en échec: {str(e)}")
+        return written
+
+    def is_fresh(self, query_key: str, max_age: float) -> bool:
+        """La recherche `query_key` a-t-elle été rafraîchie depuis moins de `max_age` secondes ?"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT refreshed_at FROM refreshed_queries WHERE query_key = ?", (query_key,)
+            ).fetchone()
+        return row is not None and time.time() - row["refreshed_at"] < max_age
+
+    # Filtres structurés : (colonne, opérateur entre les termes du filtre)
+    FILTER_COLUMNS = {
+        "location": ("localisation", "OR"),
+        "contract_type": ("type_contrat", "AND"),
+        "skills": ("competences", "OR"),
+    }
+
+    def search(self, text: str, location: str = "", contract_type: str = "", skills: str = "",
+               limit: int = 20, max_age: float = None) -> List[Dict[str, Any]]:
+        """
+        Recherche plein texte classée par BM25
+
+        `text` est cherché dans le texte de l'offre ; chaque filtre renseigné porte sur
+        sa seule colonne : un des termes de `location` dans la localisation, tous les
+        termes de `contract_type` dans le type de contrat, une des `skills` dans les
+        compétences. Une offre dont le champ est inconnu (vide) n'est pas écartée,
+        comme dans `matches_filters`.
+        """
+        text_group = _fts_group(text)
+        if not text_group:
+            return []
+
+        sql = ("SELECT offers.* FROM offers_fts JOIN offers ON offers.id = offers_fts.rowid "
+               "WHERE offers_fts MATCH ?")
+        params: List[Any] = [f"text : {text_group}"]
+        filters = {"location": location, "contract_type": contract_type, "skills": skills}
+        for name, value in filters.items():
+            column, operator = self.FILTER_COLUMNS[name]
+            group = _fts_group(value, operator)
+            if group:
+                # Champ vide : chaîne vide, ou liste JSON vide pour les compétences
+                sql += (f" AND (offers.{column} IN ('', '[]') OR offers.id IN "
+                        f"(SELECT rowid FROM offers_fts WHERE offers_fts MATCH ?))")
+                params.append(f"{column} : {group}")
+        if max_age is not None:
+            sql += " AND offers.updated_at >= ?"
+            params.append(time.time() - max_age)
+        sql += " ORDER BY bm25(offers_fts) LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row_to_offer(row) for row in rows]
+
+    @classmethod
+    def matches_filters(cls, offer: Dict[str, Any], location: str = "", contract_type: str = "",
+                        skills: str = "") -> bool:
+        """Mêmes filtres que `search`, appliqués à une offre qui n'est pas encore indexée"""
+        filters = {"location": location, "contract_type": contract_type, "skills": skills}
+        for name, value in filters.items():
+            column, operator = cls.FILTER_COLUMNS[name]
+            wanted = {term for term in _FTS_TERM_RE.findall(strip_accents(value.lower())) if len(term) > 1}
+            field = offer.get(column) or ""
+            if isinstance(field, list):
+                field = " ".join(field)
+            if not wanted or not field:
+                continue
+            present = set(_FTS_TERM_RE.findall(strip_accents(field.lower())))
+            if (operator == "AND" and not wanted <= present) or (operator == "OR" and not wanted & present):
+                return False
+        return True
+
+    @staticmethod
+    def _row_to_offer(row: sqlite3.Row) -> Dict[str, Any]:
+        offer = {field: row[field] for field in OFFER_FIELDS}
+        offer["url"] = row["url"]
+        offer["competences"] = json.loads(row["competences"] or "[]")
+        offer["ingested_at"] = row["ingested_at"]
+        return offer
+
+    def iter_offers(self, since: float = 0, max_id: int = None,
+                    batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Offres indexées depuis `since` (timestamp) et jusqu'à `max_id`, par lots pour ne pas bloquer les écritures"""
+        last_id = 0
+        upper = max_id if max_id is not None else -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT * FROM offers WHERE id > ? AND ingested_at >= ? AND (? < 0 OR id <= ?) "
+                    "ORDER BY id LIMIT ?",
+                    (last_id, since, upper, upper, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._row_to_offer(row)
+            last_id = rows[-1]["id"]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM offers").fetchone()[0]
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_job_index() -> JobIndex:
+    """Index partagé, stocké dans JOB_INDEX_DB (job_index.db par défaut)"""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = JobIndex(os.getenv('JOB_INDEX_DB', 'job_index.db'))
+        return _default_index
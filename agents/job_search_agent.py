@@ -2,28 +2,75 @@
 Version personnalisée de DuckDuckGoTools sans les warnings
 """
 
-import json
+import os
+import re
 from typing import List, Dict, Any, Optional
 import warnings
 
 # Supprimer les warnings de duckduckgo_search
 warnings.filterwarnings("ignore", message="This package.*has been renamed.*ddgs")
 
-try:
-    from ddgs import DDGS
-except ImportError:
-    try:
-        from duckduckgo_search import DDGS
-    except ImportError:
-        print("❌ Impossible d'importer DDGS. Installez ddgs: pip install ddgs")
-        DDGS = None
+_DDGS = None
+
+
+def load_ddgs():
+    """Classe DDGS importée à la première recherche (ddgs, sinon duckduckgo_search), None si absente"""
+    global _DDGS
+    if _DDGS is None:
+        try:
+            from ddgs import DDGS
+        except ImportError:
+            try:
+                from duckduckgo_search import DDGS
+            except ImportError:
+                print("❌ Impossible d'importer DDGS. Installez ddgs: pip install ddgs")
+                return None
+        _DDGS = DDGS
+    return _DDGS
+
+from agents.cache import TieredCache
+from agents.metrics import record_error, span
+from agents.rate_limiter import get_rate_limiter
+
+_default_search_cache = None
+
+
+def get_default_search_cache() -> TieredCache:
+    """Cache partagé des résultats DuckDuckGo, configuré par variables d'environnement"""
+    global _default_search_cache
+    if _default_search_cache is None:
+        _default_search_cache = TieredCache(
+            ttl=float(os.getenv('SEARCH_CACHE_TTL', '3600')),
+            stale_ttl=float(os.getenv('SEARCH_CACHE_STALE_TTL', '86400')),
+            max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '2048')),
+            db_path=os.getenv('SEARCH_CACHE_DB') or None,
+        )
+    return _default_search_cache
+
+
+def _is_cacheable(results: List[Dict[str, Any]]) -> bool:
+    """On ne met pas en cache les réponses d'erreur"""
+    return not any("error" in result for result in results)
+
 
 class CustomDuckDuckGoTools:
     """Version personnalisée de DuckDuckGoTools sans warnings"""
     
-    def __init__(self):
+    def __init__(self, cache=None):
         self.name = "duckduckgo_search"
         self.description = "Search the web using DuckDuckGo"
+        # Seau partagé par tous les threads qui interrogent DuckDuckGo
+        self.rate_limiter = get_rate_limiter("duckduckgo")
+        # Tout objet exposant get_or_compute()/stats() peut remplacer le cache par défaut
+        self.cache = cache if cache is not None else get_default_search_cache()
+    
+    @staticmethod
+    def _cache_key(kind: str, query: str, region: str, max_results: int) -> str:
+        normalized = re.sub(r"\s+", " ", query.strip().lower())
+        return f"{kind}|{region}|{max_results}|{normalized}"
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
         
     def search_web(self, query: str, max_results: int = 5, region: str = "wt-wt") -> List[Dict[str, Any]]:
         """
@@ -37,9 +84,28 @@ class CustomDuckDuckGoTools:
         Returns:
             Liste des résultats de recherche
         """
+        return self.cache.get_or_compute(
+            self._cache_key("web", query, region, max_results),
+            lambda: self._search_web_live(query, max_results, region),
+            should_cache=_is_cacheable
+        )
+    
+    def _search_web_live(self, query: str, max_results: int, region: str) -> List[Dict[str, Any]]:
+        with span("search_web", "duckduckgo"):
+            results = self._search_web_ddgs(query, max_results, region)
+        # Les erreurs sont renvoyées comme résultats : comptées ici une seule fois
+        if results and "error" in results[0]:
+            record_error("search_web", "duckduckgo")
+        return results
+    
+    def _search_web_ddgs(self, query: str, max_results: int, region: str) -> List[Dict[str, Any]]:
+        DDGS = load_ddgs()
         if DDGS is None:
             return [{"error": "DDGS not available. Install with: pip install ddgs"}]
         
+        if not self.rate_limiter.acquire(timeout=30):
+            return [{"error": "Rate limit DuckDuckGo: délai d'attente dépassé"}]
+        
         try:
             with DDGS() as ddgs:
                 results = []
@@ -67,9 +133,28 @@ class CustomDuckDuckGoTools:
         """
         Recherche d'actualités avec DuckDuckGo
         """
+        return self.cache.get_or_compute(
+            self._cache_key("news", query, region, max_results),
+            lambda: self._search_news_live(query, max_results, region),
+            should_cache=_is_cacheable
+        )
+    
+    def _search_news_live(self, query: str, max_results: int, region: str) -> List[Dict[str, Any]]:
+        with span("search_news", "duckduckgo"):
+            results = self._search_news_ddgs(query, max_results, region)
+        # Les erreurs sont renvoyées comme résultats : comptées ici une seule fois
+        if results and "error" in results[0]:
+            record_error("search_news", "duckduckgo")
+        return results
+    
+    def _search_news_ddgs(self, query: str, max_results: int, region: str) -> List[Dict[str, Any]]:
+        DDGS = load_ddgs()
         if DDGS is None:
             return [{"error": "DDGS not available. Install with: pip install ddgs"}]
         
+        if not self.rate_limiter.acquire(timeout=30):
+            return [{"error": "Rate limit DuckDuckGo: délai d'attente dépassé"}]
+        
         try:
             with DDGS() as ddgs:
                 results = []
@@ -96,24 +181,28 @@ class CustomDuckDuckGoTools:
 
 # Votre code modifié pour utiliser CustomDuckDuckGoTools
 from textwrap import dedent
-from agno.agent import Agent
-from agno.models.google import Gemini
-import requests
-from bs4 import BeautifulSoup
-import json
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from agents.llm_backend import LLMBackendError, agent_messages, get_llm_router
+from agents.llm_cache import resolve_llm_cache
+from agents.result_filter import filter_search_results
+from agents.prompt_builder import PromptBuilder
+from agents.job_index import get_job_index, normalize_query_key
+from agents.market_analytics import get_market_analytics
+from agents.offer_extractor import OfferExtractor
+from agents.single_flight import flight_key, get_single_flight
 
 class JobSearchAgent:
-    def __init__(self, api_key):
+    def __init__(self, api_key, use_cache=True, job_index=None, llm_backend=None):
         # Utiliser notre version personnalisée au lieu de DuckDuckGoTools()
         custom_tools = CustomDuckDuckGoTools()
+        # Route "job_search" : Gemini Flash ou Llama 3.3 (Groq), selon la latence observée
+        self.llm = llm_backend or get_llm_router(groq_api_key=api_key)
+        self.route = "job_search"
+        # True = cache de réponses partagé, False = désactivé pour cet agent
+        self.response_cache = resolve_llm_cache(use_cache)
         
-        self.agent = Agent(
-            name="Job Search Agent",
-            model=Gemini(id="gemini-2.0-flash", api_key=api_key),
-            tools=[],  # On va gérer la recherche manuellement
-            show_tool_calls=True,
-            instructions=dedent("""\
+        # La recherche est faite manuellement (pas d'outils exposés au LLM)
+        self.instructions = dedent("""\
                 🔍 Vous êtes un expert en recherche d'emploi spécialisé dans la collecte d'offres d'emploi !
                 
                 Votre mission :
@@ -159,15 +248,31 @@ class JobSearchAgent:
                 - Mise à jour en temps réel
                 - Analyse comparative
                 - Alertes sur nouvelles offres
-            """),
-            add_datetime_to_instructions=True,
-            markdown=True,
-        )
+            """)
         
         self.search_tools = custom_tools
+        self.max_results_in_prompt = 15
+        # Index local des offres : interrogé avant le web tant que la recherche est fraîche
+        self.job_index = job_index if job_index is not None else get_job_index()
+        self.index_max_age = float(os.getenv('JOB_INDEX_MAX_AGE', '21600'))
+        self.min_indexed_results = 5
+        # Agrégats de marché mis à jour à chaque offre indexée (voir /api/market-analysis)
+        get_market_analytics().attach(self.job_index)
+        # Classement local CV/offres : le LLM ne rédige que la synthèse des meilleures
+        self.match_scorer = None  # créé au premier classement (numpy/scipy importés à ce moment)
+        self.max_scored_offers = 500
+        # Pages des meilleures offres téléchargées pour en extraire les champs structurés
+        self.offer_extractor = OfferExtractor() if os.getenv('OFFER_ENRICHMENT', '1') == '1' else None
+        # Recherches identiques simultanées (même promotion, même requête) fusionnées
+        self.single_flight = get_single_flight()
     
-    def search_jobs_manual(self, job_title, location="", experience_level="", skills=""):
-        """Recherche manuelle d'emplois"""
+    def search_jobs_manual(self, job_title, location="", experience_level="", skills="", min_unique_results=30):
+        """
+        Recherche manuelle d'emplois : les variantes de requête partent en parallèle
+        
+        Le débit est régulé par le token bucket de CustomDuckDuckGoTools, et la
+        collecte s'arrête dès que `min_unique_results` URLs distinctes sont reçues.
+        """
         search_queries = [
             f"{job_title} jobs {location}",
             f"{job_title} emploi {location}",
@@ -177,18 +282,106 @@ class JobSearchAgent:
         ]
         
         all_results = []
+        seen_urls = set()
         
-        for query in search_queries:
-            print(f"🔍 Recherche: {query}")
-            results = self.search_tools.search_web(query, max_results=10)
-            all_results.extend(results)
-            time.sleep(1)  # Éviter le rate limiting
+        executor = ThreadPoolExecutor(max_workers=len(search_queries))
+        try:
+            futures = {}
+            for query in search_queries:
+                print(f"🔍 Recherche: {query}")
+                futures[executor.submit(self.search_tools.search_web, query, 10)] = query
+            
+            for future in as_completed(futures):
+                for result in future.result():
+                    url = result.get("url")
+                    if url:
+                        if url in seen_urls:
+                            continue
+                        seen_urls.add(url)
+                    all_results.append(result)
+                
+                if len(seen_urls) >= min_unique_results:
+                    break
+        finally:
+            # Les requêtes encore en file sont annulées, celles en cours finissent seules
+            executor.shutdown(wait=False, cancel_futures=True)
         
         return all_results
     
-    def search_jobs(self, job_title, location="", experience_level="", skills=""):
-        # D'abord faire une recherche manuelle
+    def collect_offers(self, job_title, location="", experience_level="", skills="", contract_type="", limit=None,
+                       max_age=None):
+        """
+        Offres pour une recherche : index local si frais, sinon recherche web puis indexation
+        
+        `max_age` (secondes) remplace la fraîcheur par défaut de l'index (JOB_INDEX_MAX_AGE).
+        """
+        limit = limit or self.max_results_in_prompt
+        max_age = max_age or self.index_max_age
+        query_key = normalize_query_key(job_title, location)
+        
+        if self.job_index.is_fresh(query_key, max_age):
+            offers = self.job_index.search(
+                job_title, location=location, contract_type=contract_type, skills=skills,
+                limit=limit, max_age=max_age
+            )
+            # Un filtre de contrat ou de compétences réduit légitimement la liste :
+            # la recherche web, filtrée de la même façon, n'en trouverait pas davantage
+            if len(offers) >= self.min_indexed_results or contract_type or skills:
+                print(f"⚡ {len(offers)} offres servies depuis l'index local")
+                return offers
+        
+        # Recherche web, puis on ne garde que des offres distinctes et pertinentes
         search_results = self.search_jobs_manual(job_title, location, experience_level, skills)
+        offers = filter_search_results(search_results, job_title, location, skills, top_k=None)
+        if self.offer_extractor is not None:
+            top = self.max_results_in_prompt
+            offers = self.offer_extractor.enrich(offers[:top]) + offers[top:]
+        # Tout est indexé, mais seules les offres qui passent les filtres de l'index sont renvoyées
+        self.job_index.upsert(offers, query_key=query_key)
+        offers = [offer for offer in offers if self.job_index.matches_filters(offer, location, contract_type, skills)]
+        return offers[:limit]
+    
+    @staticmethod
+    def _prompt_view(offer):
+        """Champs utiles au LLM uniquement (les champs vides sont omis)"""
+        return {key: value for key, value in offer.items() if value and key != "ingested_at"}
+    
+    def rank_offers(self, cv_text, offers, top_n=None):
+        """Classe les offres par score de compatibilité avec le CV (calcul local, déterministe)"""
+        if self.match_scorer is None:
+            from agents.match_scoring import MatchScorer
+            self.match_scorer = MatchScorer()
+        ranked = self.match_scorer.rank(cv_text, offers, top_n=top_n or self.max_results_in_prompt)
+        return [
+            dict(self._prompt_view(item["offer"]),
+                 score_compatibilite=item["score"],
+                 competences_correspondantes=item["matched_skills"])
+            for item in ranked
+        ]
+    
+    def search_jobs(self, job_title, location="", experience_level="", skills="", contract_type="", cv_text=""):
+        """Recherche et synthèse ; une recherche identique déjà en cours est partagée au lieu d'être relancée"""
+        key = flight_key(normalize_query_key(job_title, location, experience_level, skills, contract_type), cv_text)
+        return self.single_flight.do("search_jobs", key, self._search_jobs,
+                                     job_title, location, experience_level, skills, contract_type, cv_text)
+    
+    def _search_jobs(self, job_title, location, experience_level, skills, contract_type, cv_text):
+        if cv_text:
+            offers = self.collect_offers(job_title, location, experience_level, skills, contract_type,
+                                         limit=self.max_scored_offers)
+            search_results = self.rank_offers(cv_text, offers)
+            ranking_note = ("Les offres sont déjà classées par score de compatibilité avec le CV du candidat "
+                            "(calcul local) : conservez cet ordre et rédigez la synthèse de ces offres.")
+        else:
+            search_results = [self._prompt_view(offer) for offer in
+                              self.collect_offers(job_title, location, experience_level, skills, contract_type)]
+            ranking_note = ""
+        
+        # Résultats en JSON compact, les moins bien classés sont retirés si le budget est dépassé
+        sections = PromptBuilder("search_jobs", max_tokens=4000) \
+            .add("skills", skills, budget=200, priority=1) \
+            .add("results", search_results, budget=3800, priority=2) \
+            .build()
         
         # Ensuite analyser avec l'agent
         query = f"""
@@ -196,15 +389,46 @@ class JobSearchAgent:
         - Poste : {job_title}
         - Localisation : {location}
         - Niveau d'expérience : {experience_level}
-        - Compétences : {skills}
+        - Compétences : {sections['skills']}
         
         Résultats de recherche :
-        {json.dumps(search_results, indent=2, ensure_ascii=False)}
+        {sections['results']}
+        {ranking_note}
         
         Fournissez un rapport détaillé et structuré.
         """
         
-        return self.agent.run(query)
+        return self._run(query)
+    
+    def summarize_new_offers(self, params, offers):
+        """Résumé court des nouvelles offres d'une recherche sauvegardée (alerte)"""
+        sections = PromptBuilder("summarize_new_offers", max_tokens=2000) \
+            .add("offers", [self._prompt_view(offer) for offer in offers], budget=2000, priority=1) \
+            .build()
+        
+        query = f"""
+        Nouvelles offres publiées depuis la dernière alerte pour :
+        - Poste : {params.get('job_title', '')}
+        - Localisation : {params.get('location', '')}
+        - Niveau d'expérience : {params.get('experience_level', '')}
+        - Compétences : {params.get('skills', '')}
+        
+        Nouvelles offres :
+        {sections['offers']}
+        
+        Rédigez un résumé de 5 lignes maximum : offres les plus intéressantes (poste, entreprise, lien)
+        et points communs notables (salaires, contrats, compétences).
+        """
+        
+        return self._run(query)
+    
+    def _run(self, query):
+        """Appelle le LLM en passant par le cache de réponses si activé"""
+        try:
+            return self.llm.complete(self.route, agent_messages(self.instructions, query),
+                                     cache=self.response_cache)
+        except LLMBackendError as e:
+            raise Exception(f"Erreur API LLM: {str(e)}")
 
 # Test de l'outil personnalisé
 def test_custom_tools():
@@ -225,7 +449,7 @@ if __name__ == "__main__":
     test_custom_tools()
     
     # Utilisation de l'agent
-    api_key = "VOTRE_API_KEY_GEMINI"
+    api_key = os.getenv('GROQ_API_KEY', "VOTRE_API_KEY_GROQ")
     agent = JobSearchAgent(api_key)
     
     result = agent.search_jobs(
@@ -0,0 +1,298 @@
+"""
+Compilation locale des CV LaTeX en PDF (pdflatex ou tectonic) et aperçu PNG
+
+Chaque compilation tourne dans un répertoire temporaire supprimé à la fin, sans
+shell-escape, avec accès fichiers restreint, limites CPU/mémoire et timeout,
+dans un pool de workers borné. Les PDF (et aperçus) sont mis en cache sur disque
+par empreinte du source : un second téléchargement du même CV est immédiat.
+"""
+
+import hashlib
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from agents.metrics import STAGE_SECONDS, span
+
+try:
+    import resource
+except ImportError:  # Windows : pas de limites de ressources
+    resource = None
+
+
+class LatexCompileError(Exception):
+    """Échec de compilation (le journal du moteur est joint au message)"""
+
+    def __init__(self, message: str, log: str = ""):
+        super().__init__(message)
+        self.log = log
+
+
+def detect_engine() -> Optional[str]:
+    """LATEX_ENGINE si défini, sinon tectonic puis pdflatex s'ils sont installés"""
+    configured = os.getenv('LATEX_ENGINE')
+    if configured:
+        return configured
+    for engine in ("tectonic", "pdflatex"):
+        if shutil.which(engine):
+            return engine
+    return None
+
+
+class LatexCompiler:
+    """
+    Service de compilation LaTeX avec cache de PDF
+
+    Args:
+        engine: "pdflatex" ou "tectonic" (détecté si None)
+        max_workers: Compilations simultanées
+        timeout: Durée maximum d'une compilation (secondes)
+        cache_dir: Répertoire du cache de PDF
+        max_cache_entries: Nombre de PDF gardés (les plus anciens sont supprimés)
+        memory_limit_mb: Plafond de mémoire du moteur
+    """
+
+    def __init__(self, engine: str = None, max_workers: int = 2, timeout: float = 30,
+                 cache_dir: str = None, max_cache_entries: int = 256, memory_limit_mb: int = 1024):
+        self.engine = engine or detect_engine()
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_cache_entries = max_cache_entries
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "cv_pdf_cache")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="latex")
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._durations = deque(maxlen=200)
+        self._stats = {"compiled": 0, "cache_hits": 0, "coalesced": 0, "failed": 0, "timeouts": 0,
+                       "queued": 0, "running": 0, "previews": 0}
+
+    def source_hash(self, latex: str) -> str:
+        return hashlib.sha256(f"{self.engine}\0{latex}".encode("utf-8")).hexdigest()
+
+    def _cache_path(self, digest: str, extension: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.{extension}")
+
+    def compile(self, latex: str) -> bytes:
+        """PDF du document (cache, compilation identique en cours, ou nouvelle compilation)"""
+        digest = self.source_hash(latex)
+        path = self._cache_path(digest, "pdf")
+        if os.path.exists(path):
+            with self._lock:
+                self._stats["cache_hits"] += 1
+            os.utime(path)
+            with open(path, "rb") as handle:
+                return handle.read()
+
+        with self._lock:
+            future = self._in_flight.get(digest)
+            if future is not None:
+                self._stats["coalesced"] += 1
+            else:
+                future = self._executor.submit(self._compile_job, latex, digest, time.perf_counter())
+                self._in_flight[digest] = future
+                self._stats["queued"] += 1
+        return future.result()
+
+    def _compile_job(self, latex: str, digest: str, enqueued: float) -> bytes:
+        with self._lock:
+            self._stats["queued"] -= 1
+            self._stats["running"] += 1
+        started = time.perf_counter()
+        engine = os.path.basename(self.engine or "")
+        STAGE_SECONDS.observe(started - enqueued, stage="latex_queue", provider=engine)
+        try:
+            with span("latex_compile", engine):
+                pdf = self._run_engine(latex)
+            self._store(self._cache_path(digest, "pdf"), pdf)
+            with self._lock:
+                self._stats["compiled"] += 1
+            return pdf
+        except LatexCompileError:
+            with self._lock:
+                self._stats["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._stats["running"] -= 1
+                self._durations.append(time.perf_counter() - started)
+                self._in_flight.pop(digest, None)
+
+    def _limits(self):
+        """(secondes CPU, octets de mémoire) autorisés au moteur"""
+        return int(self.timeout) + 1, self.memory_limit_mb * 1024 * 1024
+
+    def _limit_command(self) -> List[str]:
+        """
+        Préfixe `prlimit` appliquant les limites avant que le moteur ne démarre
+
+        Pas de preexec_fn : il n'est pas sûr dans un serveur multi-thread. Sans
+        l'outil prlimit, les limites sont posées juste après le lancement (`_limit_process`).
+        """
+        prlimit = shutil.which("prlimit")
+        if not prlimit:
+            return []
+        cpu, memory = self._limits()
+        return [prlimit, f"--cpu={cpu}", f"--as={memory}", "--"]
+
+    def _limit_process(self, pid: int):
+        if resource is None or not hasattr(resource, "prlimit"):
+            return
+        cpu, memory = self._limits()
+        try:
+            resource.prlimit(pid, resource.RLIMIT_CPU, (cpu, cpu))
+            resource.prlimit(pid, resource.RLIMIT_AS, (memory, memory))
+        except (OSError, ValueError):
+            pass  # processus déjà terminé
+
+    def _command(self, workdir: str):
+        if os.path.basename(self.engine).startswith("tectonic"):
+            return [self.engine, "--untrusted", "--chatter", "minimal", "--outdir", workdir, "cv.tex"]
+        return [self.engine, "-interaction=nonstopmode", "-halt-on-error", "-no-shell-escape",
+                "-output-directory", workdir, "cv.tex"]
+
+    def _run_engine(self, latex: str) -> bytes:
+        if not self.engine:
+            raise LatexCompileError("Aucun moteur LaTeX installé (pdflatex ou tectonic, voir LATEX_ENGINE)")
+
+        with tempfile.TemporaryDirectory(prefix="cv_latex_") as workdir:
+            with open(os.path.join(workdir, "cv.tex"), "w", encoding="utf-8") as handle:
+                handle.write(latex)
+
+            # Lecture/écriture limitées au répertoire de travail, pas de shell-escape
+            env = dict(os.environ, openout_any="p", openin_any="p", shell_escape="f", HOME=workdir)
+            limit_command = self._limit_command()
+            try:
+                process = subprocess.Popen(
+                    limit_command + self._command(workdir), cwd=workdir, env=env, stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=True,
+                )
+            except OSError as e:
+                raise LatexCompileError(f"Moteur LaTeX inutilisable: {str(e)}")
+            if not limit_command:
+                self._limit_process(process.pid)
+
+            with process:
+                try:
+                    output, _ = process.communicate(timeout=self.timeout)
+                except subprocess.TimeoutExpired:
+                    # Le moteur et ses éventuels sous-processus sont tués ensemble
+                    self._kill(process)
+                    with self._lock:
+                        self._stats["timeouts"] += 1
+                    raise LatexCompileError(f"Compilation interrompue après {self.timeout:g} s")
+
+            log = output.decode("utf-8", errors="replace")
+            pdf_path = os.path.join(workdir, "cv.pdf")
+            if process.returncode != 0 or not os.path.exists(pdf_path):
+                raise LatexCompileError("Erreur de compilation LaTeX", log[-4000:])
+            with open(pdf_path, "rb") as handle:
+                return handle.read()
+
+    @staticmethod
+    def _kill(process: subprocess.Popen):
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+        process.communicate()
+
+    def preview_png(self, latex: str, resolution: int = 80) -> bytes:
+        """Première page du PDF en PNG (pdftoppm, ou PyMuPDF s'il est installé)"""
+        digest = self.source_hash(latex)
+        path = self._cache_path(f"{digest}-{resolution}", "png")
+        if os.path.exists(path):
+            with open(path, "rb") as handle:
+                return handle.read()
+
+        pdf = self.compile(latex)
+        png = self._render_first_page(pdf, resolution)
+        self._store(path, png)
+        with self._lock:
+            self._stats["previews"] += 1
+        return png
+
+    def _render_first_page(self, pdf: bytes, resolution: int) -> bytes:
+        with tempfile.TemporaryDirectory(prefix="cv_preview_") as workdir:
+            pdf_path = os.path.join(workdir, "cv.pdf")
+            with open(pdf_path, "wb") as handle:
+                handle.write(pdf)
+
+            if shutil.which("pdftoppm"):
+                try:
+                    subprocess.run(
+                        ["pdftoppm", "-png", "-r", str(resolution), "-f", "1", "-l", "1", "-singlefile",
+                         pdf_path, os.path.join(workdir, "page")],
+                        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=self.timeout,
+                    )
+                except (subprocess.SubprocessError, OSError) as e:
+                    raise LatexCompileError(f"Erreur lors du rendu de l'aperçu: {str(e)}")
+                with open(os.path.join(workdir, "page.png"), "rb") as handle:
+                    return handle.read()
+
+        try:
+            import fitz
+        except ImportError:
+            raise LatexCompileError("Aperçu indisponible : installer poppler-utils (pdftoppm) ou PyMuPDF")
+        with fitz.open(stream=pdf, filetype="pdf") as document:
+            return document[0].get_pixmap(dpi=resolution).tobytes("png")
+
+    def _store(self, path: str, data: bytes):
+        """Écriture atomique puis éviction des fichiers les moins récemment utilisés"""
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.replace(temp_path, path)
+
+        entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                   if not name.endswith(".tmp")]
+        if len(entries) > self.max_cache_entries:
+            entries.sort(key=lambda entry: os.stat(entry).st_mtime)
+            for entry in entries[:len(entries) - self.max_cache_entries]:
+                try:
+                    os.remove(entry)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Profondeur de file, compilations en cours et durées de compilation"""
+        with self._lock:
+            stats = dict(self._stats)
+            durations = sorted(self._durations)
+        stats["engine"] = self.engine
+        if durations:
+            stats["compile_seconds"] = {
+                "p50": round(durations[len(durations) // 2], 3),
+                "p95": round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 3),
+                "max": round(durations[-1], 3),
+                "samples": len(durations),
+            }
+        return stats
+
+
+_default_compiler = None
+_default_compiler_lock = threading.Lock()
+
+
+def get_latex_compiler() -> LatexCompiler:
+    global _default_compiler
+    with _default_compiler_lock:
+        if _default_compiler is None:
+            _default_compiler = LatexCompiler(
+                max_workers=int(os.getenv('LATEX_MAX_WORKERS', '2')),
+                timeout=float(os.getenv('LATEX_TIMEOUT', '30')),
+                cache_dir=os.getenv('LATEX_CACHE_DIR') or None,
+                max_cache_entries=int(os.getenv('LATEX_CACHE_MAX_ENTRIES', '256')),
+                memory_limit_mb=int(os.getenv('LATEX_MEMORY_LIMIT_MB', '1024')),
+            )
+        return _default_compiler
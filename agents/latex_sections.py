@@ -0,0 +1,62 @@
+"""
+Découpage d'un CV LaTeX en sections et réassemblage
+
+Le document est coupé sur les commandes `\\section{...}` / `\\section*{...}` (ou
+`\\cvsection{...}`) : le préambule et la fin (`\\end{document}`) sont conservés
+tels quels, chaque section garde sa ligne de titre et son corps.
+"""
+
+import re
+from typing import Any, Dict, List
+
+_SECTION_RE = re.compile(r"^[ \t]*\\(?:section|cvsection)\*?\{(?P<title>[^}]*)\}[^\n]*\n?", re.MULTILINE)
+_END_RE = re.compile(r"\\end\{document\}")
+_FENCE_RE = re.compile(r"```(?:latex|tex)?\s*\n(.*?)```", re.DOTALL)
+
+
+def split_latex_document(latex: str) -> Dict[str, Any]:
+    """
+    Returns:
+        {"preamble": ..., "sections": [{"title", "header", "body"}, ...], "end": ...}
+
+    Le texte après `\\end{document}` (conseils, score ATS) est écarté.
+    """
+    end_match = _END_RE.search(latex)
+    document = latex[:end_match.start()] if end_match else latex
+    end = "\\end{document}\n" if end_match else ""
+
+    matches = list(_SECTION_RE.finditer(document))
+    if not matches:
+        return {"preamble": document, "sections": [], "end": end}
+
+    sections: List[Dict[str, str]] = []
+    for i, match in enumerate(matches):
+        body_end = matches[i + 1].start() if i + 1 < len(matches) else len(document)
+        sections.append({
+            "title": match.group("title").strip(),
+            "header": match.group(),
+            "body": document[match.end():body_end],
+        })
+    return {"preamble": document[:matches[0].start()], "sections": sections, "end": end}
+
+
+def join_latex_document(parts: Dict[str, Any]) -> str:
+    body = "".join(section["header"] + section["body"] for section in parts["sections"])
+    return parts["preamble"] + body + parts["end"]
+
+
+def clean_latex_fragment(text: str, original: str) -> str:
+    """
+    Corps de section renvoyé par le LLM, débarrassé des balises de code et des
+    titres de section ; le corps d'origine est gardé si la réponse est vide
+    """
+    fence = _FENCE_RE.search(text)
+    if fence:
+        text = fence.group(1)
+    text = _SECTION_RE.sub("", text)
+    text = _END_RE.sub("", text).strip("\n")
+    if not text.strip():
+        return original
+    # Conserver l'espacement avant la section suivante
+    trailing = original[len(original.rstrip("\n")):]
+    return text + (trailing or "\n")
@@ -0,0 +1,661 @@
+"""
+Couche LLM commune à tous les agents : fournisseurs interchangeables et routage
+
+Chaque agent appelle une *route* ("cv", "cover_letter", "job_search") plutôt
+qu'un fournisseur. Le routeur choisit parmi les fournisseurs de la route :
+
+- les plus rapides d'abord (latence moyenne observée) ;
+- requête couverte (hedging) : si le premier n'a pas répondu à son p95, un
+  second fournisseur est sollicité et la première réponse gagne ;
+- disjoncteur par fournisseur : après plusieurs échecs il est écarté un temps ;
+- repli sur un modèle plus petit et plus rapide en cas de charge ou d'échec.
+
+`FakeProvider` simule un fournisseur (latence, erreurs) pour les tests et benchmarks.
+"""
+
+import json
+import os
+import random
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from agents.http_client import LLMHttpClient, LLMHttpError, get_http_client
+from agents.metrics import LLM_TOKENS, PAYLOAD_BYTES, span
+from agents.text_utils import estimate_tokens
+
+GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+
+# Routes par défaut : "fournisseur:modèle", fournisseurs principaux puis modèles de repli
+DEFAULT_ROUTES = {
+    "cv": {
+        "primary": ["groq:mixtral-8x7b-32768", "gemini:gemini-2.0-flash"],
+        "fallback": ["groq:llama-3.1-8b-instant", "gemini:gemini-2.0-flash-lite"],
+    },
+    "cover_letter": {
+        "primary": ["groq:meta-llama/llama-4-scout-17b-16e-instruct", "gemini:gemini-2.0-flash"],
+        "fallback": ["groq:llama-3.1-8b-instant", "gemini:gemini-2.0-flash-lite"],
+    },
+    "job_search": {
+        "primary": ["gemini:gemini-2.0-flash", "groq:llama-3.3-70b-versatile"],
+        "fallback": ["gemini:gemini-2.0-flash-lite", "groq:llama-3.1-8b-instant"],
+    },
+}
+
+
+class LLMBackendError(Exception):
+    """Aucun fournisseur de la route n'a pu répondre"""
+
+
+# Fournisseurs ayant répondu dans le contexte courant (voir record_providers)
+_used_providers: ContextVar[Optional[Set[str]]] = ContextVar("llm_used_providers", default=None)
+
+
+@contextmanager
+def record_providers() -> Iterator[Set[str]]:
+    """
+    Collecte les fournisseurs ("groq:modèle", ...) qui ont produit les réponses du bloc
+
+    Les threads lancés dans le bloc n'y contribuent que s'ils copient le contexte
+    (`contextvars.copy_context().run`).
+    """
+    used: Set[str] = set()
+    token = _used_providers.set(used)
+    try:
+        yield used
+    finally:
+        _used_providers.reset(token)
+
+
+def _mark_used(provider: str):
+    used = _used_providers.get()
+    if used is not None:
+        used.add(provider)
+
+
+class LLMProvider(ABC):
+    """Interface commune : `complete` renvoie le texte, `stream` le génère par fragments"""
+
+    provider = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+        self.name = f"{self.provider}:{model}"
+
+    @abstractmethod
+    def complete(self, messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 4096) -> str:
+        """Réponse complète du modèle"""
+
+    def stream(self, messages: List[Dict[str, str]], temperature: float = 0.7,
+               max_tokens: int = 4096) -> Iterator[str]:
+        yield self.complete(messages, temperature, max_tokens)
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """API chat/completions compatible OpenAI (Groq par défaut)"""
+
+    def __init__(self, model: str, api_key: str, base_url: str = GROQ_API_URL, provider: str = "groq",
+                 http_client: LLMHttpClient = None):
+        self.provider = provider
+        super().__init__(model)
+        self.base_url = base_url
+        self.http_client = http_client or get_http_client()
+        self.headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+
+    def _payload(self, messages, temperature, max_tokens, stream=False):
+        payload = {"model": self.model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def complete(self, messages, temperature=0.7, max_tokens=4096):
+        result = self.http_client.post_json(self.base_url, self.headers, self._payload(messages, temperature, max_tokens))
+        try:
+            return result['choices'][0]['message']['content']
+        except (KeyError, IndexError) as e:
+            raise LLMHttpError(f"Format de réponse inattendu: {str(e)}")
+
+    def stream(self, messages, temperature=0.7, max_tokens=4096):
+        payload = self._payload(messages, temperature, max_tokens, stream=True)
+        for data in self.http_client.iter_sse_data(self.base_url, self.headers, payload):
+            try:
+                delta = json.loads(data)['choices'][0].get('delta', {}).get('content')
+            except (KeyError, IndexError, ValueError) as e:
+                raise LLMHttpError(f"Format de réponse inattendu: {str(e)}")
+            if delta:
+                yield delta
+
+
+class GeminiProvider(LLMProvider):
+    """API REST Gemini (generateContent / streamGenerateContent)"""
+
+    provider = "gemini"
+
+    def __init__(self, model: str, api_key: str, base_url: str = GEMINI_API_URL, http_client: LLMHttpClient = None):
+        super().__init__(model)
+        self.base_url = base_url.rstrip("/")
+        self.http_client = http_client or get_http_client()
+        self.headers = {"x-goog-api-key": api_key, "Content-Type": "application/json"}
+
+    @staticmethod
+    def _payload(messages, temperature, max_tokens):
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        contents = [
+            {"role": "model" if m["role"] == "assistant" else "user", "parts": [{"text": m["content"]}]}
+            for m in messages if m["role"] != "system"
+        ]
+        payload = {"contents": contents, "generationConfig": {"temperature": temperature, "maxOutputTokens": max_tokens}}
+        if system:
+            payload["systemInstruction"] = {"parts": [{"text": system}]}
+        return payload
+
+    @staticmethod
+    def _text(result):
+        try:
+            parts = result["candidates"][0]["content"].get("parts", [])
+        except (KeyError, IndexError) as e:
+            raise LLMHttpError(f"Format de réponse inattendu: {str(e)}")
+        return "".join(part.get("text", "") for part in parts)
+
+    def complete(self, messages, temperature=0.7, max_tokens=4096):
+        url = f"{self.base_url}/{self.model}:generateContent"
+        return self._text(self.http_client.post_json(url, self.headers, self._payload(messages, temperature, max_tokens)))
+
+    def stream(self, messages, temperature=0.7, max_tokens=4096):
+        url = f"{self.base_url}/{self.model}:streamGenerateContent?alt=sse"
+        for data in self.http_client.iter_sse_data(url, self.headers, self._payload(messages, temperature, max_tokens)):
+            try:
+                text = self._text(json.loads(data))
+            except ValueError as e:
+                raise LLMHttpError(f"Format de réponse inattendu: {str(e)}")
+            if text:
+                yield text
+
+
+class FakeProvider(LLMProvider):
+    """
+    Fournisseur simulé, sans réseau
+
+    Args:
+        latency: Délai de base d'une réponse (secondes)
+        jitter: Délai aléatoire ajouté, entre 0 et `jitter`
+        error_rate: Probabilité d'échec d'un appel
+        responder: Fonction messages -> texte (écho du message utilisateur par défaut)
+    """
+
+    provider = "fake"
+
+    def __init__(self, model: str = "fake-model", latency: float = 0.05, jitter: float = 0.0,
+                 error_rate: float = 0.0, responder: Callable[[List[Dict[str, str]]], str] = None, seed: int = None):
+        super().__init__(model)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.responder = responder
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _delay(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+        time.sleep(delay)
+        if failed:
+            raise LLMHttpError(f"Erreur simulée par {self.name}", status_code=503)
+
+    def _answer(self, messages):
+        if self.responder is not None:
+            return self.responder(messages)
+        user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        return f"[{self.model}] Réponse simulée : {' '.join(user.split())[:200]}"
+
+    def complete(self, messages, temperature=0.7, max_tokens=4096):
+        self._delay()
+        return self._answer(messages)
+
+    def stream(self, messages, temperature=0.7, max_tokens=4096):
+        self._delay()
+        words = self._answer(messages).split(" ")
+        for i, word in enumerate(words):
+            yield word if i == len(words) - 1 else word + " "
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur : ouvert après `failure_threshold` échecs consécutifs, un appel
+    d'essai est autorisé après `reset_timeout` secondes (demi-ouvert)
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release(self):
+        """Appel abandonné (client déconnecté) : ni succès ni échec, un autre appel pourra servir d'essai"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+            self._probing = False
+
+
+class ProviderStats:
+    """Latences récentes, appels en cours et compteurs d'un fournisseur"""
+
+    def __init__(self, window: int = 200):
+        self.latencies = deque(maxlen=window)
+        self.ewma: Optional[float] = None
+        self.in_flight = 0
+        self.counters = {"calls": 0, "failures": 0, "hedges": 0, "hedge_wins": 0, "fallbacks": 0}
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.in_flight += 1
+            self.counters["calls"] += 1
+
+    def finish(self, latency: float, success: Optional[bool]):
+        """`success=None` : appel abandonné, seul le compteur d'appels en cours est mis à jour"""
+        with self._lock:
+            self.in_flight -= 1
+            if success is None:
+                return
+            if success:
+                self.latencies.append(latency)
+                self.ewma = latency if self.ewma is None else 0.8 * self.ewma + 0.2 * latency
+            else:
+                self.counters["failures"] += 1
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            values = sorted(self.latencies)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def _record_usage(route: str, provider: str, messages: List[Dict[str, str]], text: str):
+    """Tokens (estimés localement, identiques pour tous les fournisseurs) et tailles du prompt et de la réponse"""
+    prompt = "".join(message["content"] for message in messages)
+    LLM_TOKENS.inc(estimate_tokens(prompt), route=route, provider=provider, kind="prompt")
+    LLM_TOKENS.inc(estimate_tokens(text), route=route, provider=provider, kind="completion")
+    PAYLOAD_BYTES.observe(len(prompt.encode("utf-8")), stage="llm", direction="request")
+    PAYLOAD_BYTES.observe(len(text.encode("utf-8")), stage="llm", direction="response")
+
+
+class LLMResult:
+    """Réponse d'une route, avec le fournisseur qui l'a produite"""
+
+    def __init__(self, text: str, provider: str, latency: float, hedged: bool = False, fallback: bool = False):
+        self.text = text
+        self.provider = provider
+        self.latency = latency
+        self.hedged = hedged
+        self.fallback = fallback
+
+
+class LLMRouter:
+    """
+    Routage des appels LLM entre fournisseurs
+
+    Args:
+        routes: {route: {"primary": [LLMProvider], "fallback": [LLMProvider]}}
+        hedge: Active les requêtes couvertes
+        hedge_min_delay: Délai minimum avant de solliciter un second fournisseur (secondes)
+        hedge_default_delay: Délai utilisé tant que le p95 n'est pas connu (secondes)
+        min_samples: Nombre de latences observées avant de se fier au p95
+        overload_in_flight: Appels en cours au-delà desquels le modèle de repli passe en premier
+        latency_aware: Ordonner les fournisseurs principaux par latence observée
+        provider_limits: Appels simultanés maximum par fournisseur ({"groq": 4, ...}), toutes routes confondues
+    """
+
+    def __init__(self, routes: Dict[str, Dict[str, List[LLMProvider]]], hedge: bool = True,
+                 hedge_min_delay: float = 0.5, hedge_default_delay: float = 10.0, min_samples: int = 20,
+                 overload_in_flight: int = 8, latency_aware: bool = True,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0, max_workers: int = 32,
+                 provider_limits: Dict[str, int] = None):
+        self.routes = routes
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.min_samples = min_samples
+        self.overload_in_flight = overload_in_flight
+        self.latency_aware = latency_aware
+        providers = {p.name: p for route in routes.values() for tier in route.values() for p in tier}
+        self.providers = providers
+        self.breakers = {name: CircuitBreaker(failure_threshold, reset_timeout) for name in providers}
+        self.provider_stats = {name: ProviderStats() for name in providers}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._slots = {kind: threading.BoundedSemaphore(limit) for kind, limit in (provider_limits or {}).items()}
+
+    def _slot(self, provider: LLMProvider):
+        """Plafond de concurrence du fournisseur ("groq:modèle" -> "groq"), s'il y en a un"""
+        return self._slots.get(provider.name.partition(":")[0]) or nullcontext()
+
+    def cache_model(self, route: str) -> str:
+        """Nom stable pour les clés de cache de la route (premier fournisseur déclaré)"""
+        tiers = self.routes.get(route, {})
+        first = (tiers.get("primary") or tiers.get("fallback") or [None])[0]
+        return first.name if first is not None else f"route:{route}"
+
+    def _expected_latency(self, provider: LLMProvider) -> float:
+        ewma = self.provider_stats[provider.name].ewma
+        return ewma if ewma is not None else 0.0  # fournisseur jamais mesuré : essayé en priorité
+
+    def _candidates(self, route: str) -> List[tuple]:
+        """[(fournisseur, est_un_repli), ...] dans l'ordre d'essai"""
+        if route not in self.routes:
+            raise LLMBackendError(f"Route LLM inconnue: {route}")
+        primary = self.routes[route].get("primary", [])
+        fallback = self.routes[route].get("fallback", [])
+        if self.latency_aware:
+            primary = sorted(primary, key=self._expected_latency)
+
+        available_primary = [p for p in primary if self.breakers[p.name].state != "open"]
+        ordered = [(p, False) for p in available_primary] + [(p, True) for p in fallback]
+        # Sous charge, le modèle plus petit et plus rapide répond en premier
+        if available_primary and fallback and \
+                self.provider_stats[available_primary[0].name].in_flight >= self.overload_in_flight:
+            ordered = [(p, True) for p in fallback] + [(p, False) for p in available_primary]
+        ordered = [(p, is_fallback) for p, is_fallback in ordered if self.breakers[p.name].state != "open"]
+        if not ordered:
+            raise LLMBackendError(f"Aucun fournisseur disponible pour la route '{route}'")
+        return ordered
+
+    def _hedge_delay(self, provider: LLMProvider) -> float:
+        stats = self.provider_stats[provider.name]
+        if len(stats.latencies) < self.min_samples:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, stats.percentile(0.95))
+
+    def _call(self, route: str, provider: LLMProvider, messages, temperature, max_tokens) -> str:
+        stats = self.provider_stats[provider.name]
+        breaker = self.breakers[provider.name]
+        with self._slot(provider):
+            stats.start()
+            started = time.perf_counter()
+            try:
+                with span("llm", provider.name):
+                    text = provider.complete(messages, temperature, max_tokens)
+            except Exception:
+                stats.finish(time.perf_counter() - started, success=False)
+                breaker.record_failure()
+                raise
+            stats.finish(time.perf_counter() - started, success=True)
+        breaker.record_success()
+        _record_usage(route, provider.name, messages, text)
+        return text
+
+    def complete_result(self, route: str, messages: List[Dict[str, str]], temperature: float = 0.7,
+                        max_tokens: int = 4096) -> LLMResult:
+        """Appel couvert sur la route : première réponse valide parmi les fournisseurs sollicités"""
+        candidates = self._candidates(route)
+        started = time.perf_counter()
+        pending: Dict[Any, tuple] = {}
+        errors: List[str] = []
+        next_index = 0
+        hedged = False
+        first_provider: Optional[LLMProvider] = None
+
+        def launch():
+            nonlocal next_index, first_provider
+            while next_index < len(candidates):
+                provider, is_fallback = candidates[next_index]
+                next_index += 1
+                if not self.breakers[provider.name].allow():
+                    continue
+                if is_fallback:
+                    self.provider_stats[provider.name].count("fallbacks")
+                future = self._executor.submit(self._call, route, provider, messages, temperature, max_tokens)
+                pending[future] = (provider, is_fallback)
+                # Référence du hedging : le premier fournisseur réellement sollicité
+                if first_provider is None:
+                    first_provider = provider
+                return True
+            return False
+
+        if not launch():
+            raise LLMBackendError(f"Aucun fournisseur disponible pour la route '{route}'")
+
+        while pending:
+            can_hedge = self.hedge and not hedged and next_index < len(candidates)
+            timeout = self._hedge_delay(first_provider) if can_hedge else None
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Le premier fournisseur dépasse son p95 : un second est sollicité en parallèle
+                if launch():
+                    hedged = True
+                    self.provider_stats[first_provider.name].count("hedges")
+                else:
+                    hedged = True
+                continue
+            for future in done:
+                provider, is_fallback = pending.pop(future)
+                try:
+                    text = future.result()
+                except Exception as e:
+                    errors.append(f"{provider.name}: {str(e)}")
+                    if not pending:
+                        launch()
+                    continue
+                if hedged and provider is not first_provider:
+                    self.provider_stats[provider.name].count("hedge_wins")
+                _mark_used(provider.name)
+                return LLMResult(text, provider.name, time.perf_counter() - started, hedged, is_fallback)
+
+        raise LLMBackendError(f"Tous les fournisseurs de la route '{route}' ont échoué: " + " | ".join(errors))
+
+    def complete(self, route: str, messages: List[Dict[str, str]], temperature: float = 0.7,
+                 max_tokens: int = 4096, cache=None) -> str:
+        """
+        Texte de la réponse ; avec `cache` (LLMResponseCache), les réponses des
+        fournisseurs principaux sont mémorisées (pas celles des modèles de repli)
+        """
+        model = self.cache_model(route)
+        if cache is not None:
+            cached = cache.lookup(model, messages, temperature)
+            if cached is not None:
+                return cached
+        result = self.complete_result(route, messages, temperature, max_tokens)
+        if cache is not None and result.text and not result.fallback:
+            cache.store_response(model, messages, temperature, result.text)
+        return result.text
+
+    def stream(self, route: str, messages: List[Dict[str, str]], temperature: float = 0.7,
+               max_tokens: int = 4096, cache=None) -> Iterator[str]:
+        """
+        Réponse en fragments, sans requête couverte : en cas d'échec avant le
+        premier fragment, le fournisseur suivant prend le relais
+        """
+        model = self.cache_model(route)
+        if cache is not None:
+            cached = cache.lookup(model, messages, temperature)
+            if cached is not None:
+                yield cached
+                return
+
+        errors: List[str] = []
+        for provider, is_fallback in self._candidates(route):
+            breaker = self.breakers[provider.name]
+            if not breaker.allow():
+                continue
+            stats = self.provider_stats[provider.name]
+            if is_fallback:
+                stats.count("fallbacks")
+            chunks: List[str] = []
+            try:
+                # Le plafond du fournisseur est tenu jusqu'au dernier fragment
+                with self._slot(provider), span("llm_stream", provider.name):
+                    stats.start()
+                    started = time.perf_counter()
+                    for chunk in provider.stream(messages, temperature, max_tokens):
+                        chunks.append(chunk)
+                        yield chunk
+            except Exception as e:
+                stats.finish(time.perf_counter() - started, success=False)
+                breaker.record_failure()
+                if chunks:
+                    raise
+                errors.append(f"{provider.name}: {str(e)}")
+                continue
+            except GeneratorExit:
+                # Client déconnecté : l'appel n'est compté ni comme succès ni comme échec
+                # (sa durée reste visible dans la métrique de l'étape "llm_stream")
+                stats.finish(time.perf_counter() - started, success=None)
+                breaker.release()
+                raise
+            stats.finish(time.perf_counter() - started, success=True)
+            breaker.record_success()
+            _mark_used(provider.name)
+            text = "".join(chunks)
+            _record_usage(route, provider.name, messages, text)
+            if cache is not None and text and not is_fallback:
+                cache.store_response(model, messages, temperature, text)
+            return
+
+        raise LLMBackendError(f"Tous les fournisseurs de la route '{route}' ont échoué: " + " | ".join(errors))
+
+    def in_flight(self) -> int:
+        """Appels LLM en cours, tous fournisseurs confondus"""
+        return sum(stats.in_flight for stats in self.provider_stats.values())
+
+    def stats(self) -> Dict[str, Any]:
+        data = {}
+        for name, stats in self.provider_stats.items():
+            p50, p95 = stats.percentile(0.5), stats.percentile(0.95)
+            data[name] = dict(
+                stats.counters,
+                in_flight=stats.in_flight,
+                breaker=self.breakers[name].state,
+                p50_seconds=round(p50, 3) if p50 is not None else None,
+                p95_seconds=round(p95, 3) if p95 is not None else None,
+            )
+        return data
+
+
+def agent_messages(instructions: str, query: str) -> List[Dict[str, str]]:
+    """Messages d'un agent : consignes (avec la date du jour) en message système, puis la requête"""
+    system = f"{instructions.strip()}\n\nDate du jour : {datetime.now().strftime('%Y-%m-%d')}"
+    return [{"role": "system", "content": system}, {"role": "user", "content": query}]
+
+
+def _load_routes() -> Dict[str, Dict[str, List[str]]]:
+    """Routes par défaut, remplacées route par route par le JSON de LLM_ROUTES"""
+    routes = {name: dict(tiers) for name, tiers in DEFAULT_ROUTES.items()}
+    override = os.getenv('LLM_ROUTES')
+    if override:
+        routes.update(json.loads(override))
+    return routes
+
+
+def build_llm_router(groq_api_key: str = None, gemini_api_key: str = None, groq_base_url: str = None,
+                     http_client: LLMHttpClient = None) -> LLMRouter:
+    """
+    Routeur configuré par l'environnement
+
+    GROQ_API_KEY / GEMINI_API_KEY (ou GOOGLE_API_KEY) activent les fournisseurs ;
+    LLM_PROVIDER=fake remplace tous les fournisseurs par FakeProvider
+    (latence LLM_FAKE_LATENCY, erreurs LLM_FAKE_ERROR_RATE).
+    """
+    groq_api_key = groq_api_key or os.getenv('GROQ_API_KEY')
+    gemini_api_key = gemini_api_key or os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
+    groq_base_url = groq_base_url or os.getenv('GROQ_API_URL', GROQ_API_URL)
+    fake = os.getenv('LLM_PROVIDER') == 'fake'
+    providers: Dict[str, LLMProvider] = {}
+
+    def provider_for(spec: str) -> Optional[LLMProvider]:
+        if spec in providers:
+            return providers[spec]
+        kind, _, model = spec.partition(":")
+        if fake:
+            provider = FakeProvider(model, latency=float(os.getenv('LLM_FAKE_LATENCY', '0.05')),
+                                    error_rate=float(os.getenv('LLM_FAKE_ERROR_RATE', '0')))
+            provider.name = spec
+        elif kind == "groq" and groq_api_key:
+            provider = OpenAICompatibleProvider(model, groq_api_key, groq_base_url, http_client=http_client)
+        elif kind == "gemini" and gemini_api_key:
+            provider = GeminiProvider(model, gemini_api_key, os.getenv('GEMINI_API_URL', GEMINI_API_URL),
+                                      http_client=http_client)
+        else:
+            return None
+        providers[spec] = provider
+        return provider
+
+    routes = {}
+    for name, tiers in _load_routes().items():
+        routes[name] = {
+            tier: [p for p in (provider_for(spec) for spec in specs) if p is not None]
+            for tier, specs in tiers.items()
+        }
+
+    return LLMRouter(
+        routes,
+        hedge=os.getenv('LLM_HEDGE', '1') == '1',
+        hedge_default_delay=float(os.getenv('LLM_HEDGE_DEFAULT_DELAY', '10')),
+        overload_in_flight=int(os.getenv('LLM_OVERLOAD_IN_FLIGHT', '8')),
+        latency_aware=os.getenv('LLM_LATENCY_ROUTING', '1') == '1',
+        failure_threshold=int(os.getenv('LLM_BREAKER_FAILURES', '5')),
+        reset_timeout=float(os.getenv('LLM_BREAKER_RESET', '30')),
+        provider_limits={
+            'groq': int(os.getenv('GROQ_MAX_CONCURRENCY', '4')),
+            'gemini': int(os.getenv('GEMINI_MAX_CONCURRENCY', '4')),
+        },
+    )
+
+
+_routers: Dict[tuple, LLMRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def get_llm_router(groq_api_key: str = None, groq_base_url: str = None) -> LLMRouter:
+    """Routeur partagé par les agents (un par clé/URL Groq, pour partager latences et disjoncteurs)"""
+    key = (groq_api_key, groq_base_url)
+    with _routers_lock:
+        if key not in _routers:
+            _routers[key] = build_llm_router(groq_api_key=groq_api_key, groq_base_url=groq_base_url)
+        return _routers[key]
@@ -0,0 +1,239 @@
+"""
+Cache des réponses LLM partagé par les agents
+
+Recherche exacte par empreinte (modèle, messages, température) et, en option,
+recherche de quasi-doublons via un index MinHash/LSH local.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from agents.cache import TieredCache
+
+_MASK = (1 << 64) - 1
+_PRIME = (1 << 61) - 1
+
+
+def make_cache_key(model: str, messages: List[Dict[str, str]], temperature: Optional[float]) -> str:
+    """Empreinte SHA-256 du contenu exact de la requête"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MinHashIndex:
+    """
+    Index LSH de signatures MinHash sur des 3-grammes de mots
+
+    Permet de retrouver une requête quasi identique (espaces, ponctuation,
+    une phrase modifiée...) sans dépendance externe.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, max_entries: int = 4096):
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        # Coefficients de hachage universel, déterministes d'un processus à l'autre
+        seed = hashlib.sha256(b"minhash").digest()
+        self._coeffs = [
+            (int.from_bytes(hashlib.sha256(seed + bytes([i, 0])).digest()[:8], "big") | 1,
+             int.from_bytes(hashlib.sha256(seed + bytes([i, 1])).digest()[:8], "big"))
+            for i in range(num_perm)
+        ]
+        self._signatures: Dict[str, tuple] = {}
+        self._buckets: Dict[tuple, set] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _shingles(text: str) -> set:
+        words = re.findall(r"\w+", text.lower())
+        if len(words) < 3:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+    def signature(self, text: str) -> tuple:
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+                  for s in self._shingles(text)]
+        return tuple(
+            min(((a * h + b) % _PRIME) & _MASK for h in hashes)
+            for a, b in self._coeffs
+        )
+
+    def _band_keys(self, namespace: str, signature: tuple):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield (namespace, band, signature[start:start + self.rows])
+
+    def add(self, key: str, namespace: str, text: str):
+        signature = self.signature(text)
+        with self._lock:
+            if len(self._signatures) >= self.max_entries:
+                self._remove(next(iter(self._signatures)))
+            self._signatures[key] = (namespace, signature)
+            for band_key in self._band_keys(namespace, signature):
+                self._buckets.setdefault(band_key, set()).add(key)
+
+    def _remove(self, key: str):
+        namespace, signature = self._signatures.pop(key)
+        for band_key in self._band_keys(namespace, signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def remove(self, key: str):
+        with self._lock:
+            if key in self._signatures:
+                self._remove(key)
+
+    def query(self, namespace: str, text: str, threshold: float) -> List[str]:
+        """Clés dont la similarité de Jaccard estimée dépasse `threshold`, les plus proches d'abord"""
+        signature = self.signature(text)
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(namespace, signature):
+                candidates |= self._buckets.get(band_key, set())
+            scored = []
+            for key in candidates:
+                other = self._signatures[key][1]
+                similarity = sum(1 for x, y in zip(signature, other) if x == y) / self.num_perm
+                if similarity >= threshold:
+                    scored.append((similarity, key))
+        return [key for _, key in sorted(scored, reverse=True)]
+
+
+class LLMResponseCache:
+    """
+    Couche de cache commune devant les appels LLM
+
+    Args:
+        ttl: Durée de vie d'une réponse (secondes)
+        max_entries: Nombre maximal de réponses en mémoire
+        db_path: Fichier SQLite optionnel pour conserver les réponses entre redémarrages
+        near_duplicate: Active la recherche de quasi-doublons MinHash
+        similarity_threshold: Similarité minimale pour réutiliser une réponse proche
+    """
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 512, db_path: str = None,
+                 near_duplicate: bool = False, similarity_threshold: float = 0.9):
+        self.store = TieredCache(ttl=ttl, max_entries=max_entries, db_path=db_path)
+        self.near_duplicate = near_duplicate
+        self.similarity_threshold = similarity_threshold
+        self.index = MinHashIndex(max_entries=max_entries) if near_duplicate else None
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "near_hits": 0, "misses": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    @staticmethod
+    def _namespace(model: str, messages: List[Dict[str, str]], temperature: Optional[float]) -> str:
+        system = [m["content"] for m in messages if m.get("role") == "system"]
+        return make_cache_key(model, [{"role": "system", "content": c} for c in system], temperature)
+
+    @staticmethod
+    def _user_text(messages: List[Dict[str, str]]) -> str:
+        return "\n".join(m["content"] for m in messages if m.get("role") != "system")
+
+    def lookup(self, model: str, messages: List[Dict[str, str]], temperature: Optional[float] = None) -> Optional[Any]:
+        key = make_cache_key(model, messages, temperature)
+        value = self.store.get(key)
+        if value is not None:
+            self._count("exact_hits")
+            return value
+
+        if self.index is not None:
+            namespace = self._namespace(model, messages, temperature)
+            for candidate in self.index.query(namespace, self._user_text(messages), self.similarity_threshold):
+                value = self.store.get(candidate)
+                if value is not None:
+                    self._count("near_hits")
+                    return value
+                self.index.remove(candidate)
+
+        self._count("misses")
+        return None
+
+    def store_response(self, model: str, messages: List[Dict[str, str]], temperature: Optional[float], value: Any):
+        key = make_cache_key(model, messages, temperature)
+        self.store.set(key, value)
+        if self.index is not None:
+            self.index.add(key, self._namespace(model, messages, temperature), self._user_text(messages))
+
+    def get_or_call(self, model: str, messages: List[Dict[str, str]], temperature: Optional[float],
+                    call: Callable[[], Any]) -> Any:
+        """Renvoie la réponse en cache ou exécute `call()` et mémorise son résultat"""
+        value = self.lookup(model, messages, temperature)
+        if value is not None:
+            return value
+        value = call()
+        if value:
+            self.store_response(model, messages, temperature, value)
+        return value
+
+    def stream_through(self, model: str, messages: List[Dict[str, str]], temperature: Optional[float],
+                       stream: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """
+        Version streaming de get_or_call
+
+        Un hit est renvoyé en un seul fragment ; sinon les fragments de `stream()`
+        sont relayés au fil de l'eau et la réponse complète est mémorisée à la fin.
+        """
+        value = self.lookup(model, messages, temperature)
+        if value is not None:
+            yield value
+            return
+        chunks = []
+        for chunk in stream():
+            chunks.append(chunk)
+            yield chunk
+        value = "".join(chunks)
+        if value:
+            self.store_response(model, messages, temperature, value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["entries"] = len(self.store.memory)
+        return stats
+
+
+_default_llm_cache = None
+_default_llm_cache_lock = threading.Lock()
+
+
+def get_default_llm_cache() -> LLMResponseCache:
+    """Cache partagé par tous les agents, configuré par variables d'environnement"""
+    global _default_llm_cache
+    with _default_llm_cache_lock:
+        if _default_llm_cache is None:
+            _default_llm_cache = LLMResponseCache(
+                ttl=float(os.getenv('LLM_CACHE_TTL', '3600')),
+                max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '512')),
+                db_path=os.getenv('LLM_CACHE_DB') or None,
+                near_duplicate=os.getenv('LLM_CACHE_NEAR_DUPLICATE', '0') == '1',
+                similarity_threshold=float(os.getenv('LLM_CACHE_SIMILARITY', '0.9')),
+            )
+        return _default_llm_cache
+
+
+def resolve_llm_cache(use_cache) -> Optional[LLMResponseCache]:
+    """
+    Traduit l'option `use_cache` d'un agent en instance de cache
+
+    True -> cache partagé, False/None -> pas de cache, instance -> utilisée telle quelle
+    """
+    if use_cache is True:
+        return get_default_llm_cache()
+    if not use_cache:
+        return None
+    return use_cache
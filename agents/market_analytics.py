@@ -0,0 +1,349 @@
+"""
+Analyse de marché incrémentale
+
+Les agrégats du bloc `market_analysis` (types de contrat, salaires, entreprises,
+localisations, compétences demandées) sont tenus à jour à chaque offre indexée
+au lieu d'être recalculés sur la dizaine d'offres d'une recherche :
+
+- compteurs exacts pour les dimensions bornées (contrats, compétences de la taxonomie) ;
+- Space-Saving (top-k approché, mémoire fixe) pour les entreprises et les localisations ;
+- sketch de quantiles à erreur relative bornée (seaux logarithmiques) pour les salaires.
+
+Les agrégats sont rangés par (poste recherché, localisation recherchée, jour) ;
+une requête sur une fenêtre fusionne au plus `retention_days` agrégats de taille
+fixe, quel que soit le nombre d'offres ingérées.
+"""
+
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from agents.job_index import JobIndex, normalize_query_key
+from agents.skill_extractor import SkillExtractor, get_skill_extractor
+from agents.text_utils import strip_accents
+
+ANY = "*"
+DAY = 86400
+
+_CONTRACT_RE = re.compile(r"\b(cdi|cdd|stage|alternance|freelance|interim|apprentissage)\b")
+_CONTRACT_LABELS = {"cdi": "CDI", "cdd": "CDD", "stage": "Stage", "alternance": "Alternance",
+                    "freelance": "Freelance", "interim": "Intérim", "apprentissage": "Alternance"}
+_SALARY_TEXT_RE = re.compile(
+    r"(?:\d[\d\s.,]*\s?k?\s?(?:€|eur)?\s?(?:-|a)\s?)?\d[\d\s.,]*\s?k?\s?(?:€|eur)"
+    r"(?:\s?(?:/|par)\s?(?:an|annee|year|mois|month|jour|day|h|heure|hour))?"
+    r"|(?:salaire|remuneration)\s?:?\s?\d[\d\s.,]*\s?k\b"
+)
+_AMOUNT_RE = re.compile(r"(\d{1,3}(?:[\s.]\d{3})+|\d+(?:,\d+)?)\s?(k)?")
+# Multiplicateurs vers un salaire annuel brut
+_PERIODS = (
+    (re.compile(r"mois|month|mensuel"), 12),
+    (re.compile(r"jour|day|tjm"), 218),
+    (re.compile(r"/\s?h\b|heure|hour|horaire"), 1607),
+    (re.compile(r"\ban\b|annee|year|annuel"), 1),
+)
+MIN_ANNUAL_SALARY = 8000
+MAX_ANNUAL_SALARY = 1000000
+
+
+def parse_salary(text: str, require_currency: bool = False) -> Optional[float]:
+    """
+    Salaire annuel en euros (milieu de fourchette) à partir d'un libellé libre
+
+    "45k€", "40 000 - 50 000 € / an", "3 000 € par mois", "450 €/jour" ; sans période,
+    un montant < 1 000 est lu comme un taux journalier et < 10 000 comme un salaire mensuel.
+    Avec `require_currency`, seul un montant explicitement en euros (ou annoncé comme salaire) est lu.
+    """
+    normalized = strip_accents((text or "").lower())
+    if require_currency:
+        match = _SALARY_TEXT_RE.search(normalized)
+        if match is None:
+            return None
+        normalized = match.group()
+    amounts = []
+    for digits, thousands in _AMOUNT_RE.findall(normalized)[:2]:
+        value = float(re.sub(r"[\s.]", "", digits).replace(",", "."))
+        amounts.append((value * 1000 if thousands else value, bool(thousands)))
+    if not amounts:
+        return None
+    # "40-50k€" : le "k" de la borne haute vaut pour la borne basse
+    if len(amounts) == 2 and amounts[1][1] and not amounts[0][1] and amounts[0][0] < 1000:
+        amounts[0] = (amounts[0][0] * 1000, True)
+    value = sum(amount for amount, _ in amounts) / len(amounts)
+
+    for pattern, multiplier in _PERIODS:
+        if pattern.search(normalized):
+            value *= multiplier
+            break
+    else:
+        if value < 1000:
+            value *= 218
+        elif value < 10000:
+            value *= 12
+    return value if MIN_ANNUAL_SALARY <= value <= MAX_ANNUAL_SALARY else None
+
+
+class SpaceSaving:
+    """
+    Éléments les plus fréquents d'un flux en mémoire fixe (algorithme Space-Saving)
+
+    Un élément absent remplace le moins compté, dont il hérite du compte : les
+    comptes sont surestimés d'au plus `errors[élément]`, les vrais gros éléments ne
+    sont jamais perdus.
+    """
+
+    def __init__(self, capacity: int = 50):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, item: str, count: int = 1):
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            evicted = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(evicted)
+            self.errors.pop(evicted)
+            self.counts[item] = floor + count
+            self.errors[item] = floor
+
+    def merge(self, other: "SpaceSaving"):
+        for item, count in other.counts.items():
+            self.add(item, count)
+
+    def top(self, n: int) -> List[Tuple[str, int]]:
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+
+class QuantileSketch:
+    """
+    Quantiles à erreur relative bornée (seaux logarithmiques, fusionnables)
+
+    Une valeur v tombe dans le seau ceil(log_gamma(v)) ; tout quantile est rendu
+    à `relative_accuracy` près, avec quelques centaines de seaux au plus pour des salaires.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Counter = Counter()
+        self.count = 0
+
+    def add(self, value: float):
+        self.buckets[math.ceil(math.log(value) / self._log_gamma)] += 1
+        self.count += 1
+
+    def merge(self, other: "QuantileSketch"):
+        self.buckets.update(other.buckets)
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return None
+
+
+class MarketAggregate:
+    """Agrégats d'un ensemble d'offres (un jour, une recherche)"""
+
+    def __init__(self, top_k: int = 50, relative_accuracy: float = 0.01):
+        self.top_k = top_k
+        self.total = 0
+        self.contract_types: Counter = Counter()
+        self.skills: Counter = Counter()
+        self.companies = SpaceSaving(top_k)
+        self.locations = SpaceSaving(top_k)
+        self.salaries = QuantileSketch(relative_accuracy)
+
+    def add(self, facts: Dict[str, Any]):
+        self.total += 1
+        self.contract_types.update(facts["contracts"] or ["Non spécifié"])
+        self.skills.update(facts["skills"])
+        if facts["company"]:
+            self.companies.add(facts["company"])
+        if facts["location"]:
+            self.locations.add(facts["location"])
+        if facts["salary"] is not None:
+            self.salaries.add(facts["salary"])
+
+    def merge(self, other: "MarketAggregate"):
+        self.total += other.total
+        self.contract_types.update(other.contract_types)
+        self.skills.update(other.skills)
+        self.companies.merge(other.companies)
+        self.locations.merge(other.locations)
+        self.salaries.merge(other.salaries)
+
+    def to_dict(self, top_n: int = 10) -> Dict[str, Any]:
+        """Même clés que le bloc `market_analysis` des rapports de recherche"""
+        salary = {"count": self.salaries.count, "unit": "EUR brut / an"}
+        for name, q in (("p10", 0.1), ("p25", 0.25), ("median", 0.5), ("p75", 0.75), ("p90", 0.9)):
+            value = self.salaries.quantile(q)
+            salary[name] = round(value, -2) if value is not None else None
+        return {
+            "total_offers": self.total,
+            "contract_types": dict(self.contract_types.most_common()),
+            "salary_ranges": salary,
+            "top_companies": dict(self.companies.top(top_n)),
+            "locations": dict(self.locations.top(top_n)),
+            "skills_demand": dict(self.skills.most_common(top_n)),
+        }
+
+
+class MarketAnalytics:
+    """
+    Agrégats de marché par (poste, localisation, jour), alimentés par l'index des offres
+
+    Chaque offre compte pour sa recherche (poste, localisation), pour le poste toutes
+    localisations, pour la localisation tous postes et pour le marché entier.
+
+    Args:
+        skill_extractor: Taxonomie utilisée pour les compétences des offres sans champ `competences`
+        retention_days: Jours d'historique gardés (taille maximale d'une fenêtre)
+        top_k: Capacité des sketches Space-Saving (entreprises, localisations)
+        relative_accuracy: Erreur relative des quantiles de salaire
+    """
+
+    def __init__(self, skill_extractor: SkillExtractor = None, retention_days: int = 90, top_k: int = 50,
+                 relative_accuracy: float = 0.01):
+        self.skill_extractor = skill_extractor or get_skill_extractor()
+        self.retention_days = retention_days
+        self.top_k = top_k
+        self.relative_accuracy = relative_accuracy
+        # (poste, localisation) -> {jour: MarketAggregate}
+        self._aggregates: Dict[Tuple[str, str], Dict[int, MarketAggregate]] = {}
+        self._attached: List[JobIndex] = []
+        self._lock = threading.Lock()
+        self._ingested = 0
+        self._replays = 0
+
+    @staticmethod
+    def dimension(value: str) -> str:
+        return normalize_query_key(value) or ANY
+
+    def offer_facts(self, offer: Dict[str, Any]) -> Dict[str, Any]:
+        """Contrats, compétences, entreprise, localisation et salaire annuel d'une offre"""
+        title = offer.get("nom_poste") or offer.get("title") or ""
+        text = f"{title} {offer.get('snippet') or ''} {offer.get('description') or ''}"
+        normalized = strip_accents(f"{offer.get('type_contrat') or ''} {title}".lower())
+        contracts = sorted({_CONTRACT_LABELS[match] for match in _CONTRACT_RE.findall(normalized)})
+        skills = offer.get("competences") or list(self.skill_extractor.match_terms(text).get("technique", {}))
+        salary = parse_salary(offer["salaire"]) if offer.get("salaire") else None
+        if salary is None:
+            salary = parse_salary(text, require_currency=True)
+        return {
+            "contracts": contracts,
+            "skills": list(dict.fromkeys(skills)),
+            "company": " ".join((offer.get("entreprise") or "").split()),
+            "location": " ".join((offer.get("localisation") or "").split()),
+            "salary": salary,
+        }
+
+    def ingest(self, offers: Iterable[Dict[str, Any]], query_key: str = None):
+        """Ajoute des offres (abonné de JobIndex : `query_key` vaut "poste|localisation")"""
+        parts = (query_key or "").split("|")
+        title = parts[0] or ANY
+        location = parts[1] if len(parts) > 1 and parts[1] else ANY
+        keys = {(title, location), (title, ANY), (ANY, location), (ANY, ANY)}
+        facts = [(self.offer_facts(offer), int((offer.get("ingested_at") or time.time()) // DAY))
+                 for offer in offers if "error" not in offer]
+        oldest = int(time.time() // DAY) - self.retention_days
+        with self._lock:
+            for offer_facts, day in facts:
+                if day <= oldest:
+                    continue
+                for key in keys:
+                    days = self._aggregates.setdefault(key, {})
+                    aggregate = days.get(day)
+                    if aggregate is None:
+                        aggregate = days[day] = MarketAggregate(self.top_k, self.relative_accuracy)
+                        for expired in [old for old in days if old <= oldest]:
+                            del days[expired]
+                    aggregate.add(offer_facts)
+                self._ingested += 1
+
+    def attach(self, job_index: JobIndex):
+        """
+        S'abonne aux nouvelles offres de l'index et, la première fois, relit en arrière-plan
+        celles de la période de rétention (comptées sur le marché entier : leur recherche
+        d'origine n'est pas conservée)
+
+        La relecture s'arrête à la dernière offre indexée au moment de l'abonnement :
+        les suivantes arrivent par l'abonnement, aucune n'est comptée deux fois.
+        """
+        with self._lock:
+            if any(index is job_index for index in self._attached):
+                return
+            self._attached.append(job_index)
+            self._replays += 1
+        watermark = job_index.subscribe(self.ingest)
+
+        def replay():
+            try:
+                since = time.time() - self.retention_days * DAY
+                batch = []
+                for offer in job_index.iter_offers(since, max_id=watermark):
+                    batch.append(offer)
+                    if len(batch) >= 500:
+                        self.ingest(batch)
+                        batch = []
+                self.ingest(batch)
+            finally:
+                with self._lock:
+                    self._replays -= 1
+
+        threading.Thread(target=replay, name="market-analytics-replay", daemon=True).start()
+
+    @property
+    def warming_up(self) -> bool:
+        """Relecture de l'index en cours : les agrégats sont encore partiels"""
+        with self._lock:
+            return self._replays > 0
+
+    def query(self, job_title: str = "", location: str = "", days: int = 30, top_n: int = 10) -> Dict[str, Any]:
+        """Agrégats d'une recherche sur les `days` derniers jours (poste et localisation facultatifs)"""
+        key = (self.dimension(job_title), self.dimension(location))
+        days = max(1, min(days, self.retention_days))
+        first_day = int(time.time() // DAY) - days + 1
+        merged = MarketAggregate(self.top_k, self.relative_accuracy)
+        with self._lock:
+            for day, aggregate in self._aggregates.get(key, {}).items():
+                if day >= first_day:
+                    merged.merge(aggregate)
+        return dict(merged.to_dict(top_n), job_title=job_title, location=location, days=days,
+                    warming_up=self.warming_up)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "ingested_offers": self._ingested,
+                "series": len(self._aggregates),
+                "aggregates": sum(len(days) for days in self._aggregates.values()),
+                "warming_up": self._replays > 0,
+            }
+
+
+_default_analytics = None
+_default_analytics_lock = threading.Lock()
+
+
+def get_market_analytics() -> MarketAnalytics:
+    """Analyse de marché partagée ; MARKET_RETENTION_DAYS fixe l'historique gardé (90 jours par défaut)"""
+    global _default_analytics
+    with _default_analytics_lock:
+        if _default_analytics is None:
+            _default_analytics = MarketAnalytics(retention_days=int(os.getenv('MARKET_RETENTION_DAYS', '90')))
+        return _default_analytics
@@ -0,0 +1,122 @@
+"""
+Score de compatibilité CV / offres calculé localement
+
+CV et offres sont projetés dans un espace TF-IDF (mots + bigrammes, TF
+logarithmique x IDF, normalisation L2) dont le vocabulaire est construit pour le
+lot ; toutes les offres sont scorées contre le CV en un seul produit matrice
+creuse x vecteur.
+"""
+
+import re
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from agents.text_utils import strip_accents
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+# Mots vides FR/EN ignorés dans les features
+STOP_WORDS = frozenset("""
+a au aux avec ce ces dans de des du elle en et il ils je la le les leur lui ma mais me mon ne nos notre
+nous on ou par pas pour qu que qui sa se ses son sur ta te tes ton tu un une vos votre vous
+an and are as at be by for from has have in is it of on or that the this to was were will with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    words = [w for w in _WORD_RE.findall(strip_accents(text.lower())) if w not in STOP_WORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def offer_text(offer: Dict[str, Any]) -> str:
+    competences = offer.get("competences") or []
+    if not isinstance(competences, list):
+        competences = [competences]
+    return " ".join([
+        offer.get("title", ""), offer.get("nom_poste", ""), offer.get("snippet", ""),
+        offer.get("description", ""), " ".join(competences),
+    ])
+
+
+class MatchScorer:
+    """Classement d'offres par similarité cosinus TF-IDF avec le CV"""
+
+    @staticmethod
+    def _term_matrix(token_lists: Sequence[List[str]]):
+        """Matrice creuse des comptes de termes et vocabulaire terme -> colonne"""
+        vocabulary: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        for tokens in token_lists:
+            indices.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.float32)
+        matrix = sparse.csr_matrix(
+            (data, np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(token_lists), max(len(vocabulary), 1))
+        )
+        matrix.sum_duplicates()
+        return matrix, vocabulary
+
+    @staticmethod
+    def _tfidf(counts: sparse.csr_matrix, idf: np.ndarray) -> sparse.csr_matrix:
+        weighted = counts.copy()
+        weighted.data = (1.0 + np.log(weighted.data)) * idf[weighted.indices]
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms) @ weighted
+
+    def rank(self, cv_text: str, offers: List[Dict[str, Any]], top_n: int = None) -> List[Dict[str, Any]]:
+        """
+        Classe les offres par score décroissant
+
+        Returns:
+            [{"offer": ..., "score": 0-100, "matched_skills": [...]}, ...]
+        """
+        if not offers:
+            return []
+
+        cv_tokens = tokenize(cv_text)
+        offer_tokens = [tokenize(offer_text(offer)) for offer in offers]
+        counts, vocabulary = self._term_matrix(offer_tokens + [cv_tokens])
+
+        # IDF lissée calculée sur le lot (offres + CV)
+        document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+        n_documents = counts.shape[0]
+        idf = (np.log((1 + n_documents) / (1 + document_frequency)) + 1.0).astype(np.float32)
+
+        vectors = self._tfidf(counts, idf)
+        offer_vectors, cv_vector = vectors[:-1], vectors[-1]
+        scores = np.asarray((offer_vectors @ cv_vector.T).todense()).ravel()
+
+        order = np.argsort(-scores, kind="stable")
+        if top_n is not None:
+            order = order[:top_n]
+
+        cv_terms = set(cv_tokens)
+        ranked = []
+        for i in order:
+            ranked.append({
+                "offer": offers[i],
+                "score": round(float(scores[i]) * 100, 1),
+                "matched_skills": self._matched_skills(offers[i], offer_tokens[i], cv_terms, idf, vocabulary),
+            })
+        return ranked
+
+    @staticmethod
+    def _matched_skills(offer, tokens, cv_terms, idf, vocabulary, limit: int = 8) -> List[str]:
+        """Compétences déclarées de l'offre présentes dans le CV, sinon termes communs les plus rares"""
+        competences = offer.get("competences") or []
+        if isinstance(competences, list) and competences:
+            matched = []
+            for skill in competences:
+                words = [token for token in tokenize(skill) if " " not in token]
+                if words and all(word in cv_terms for word in words):
+                    matched.append(skill)
+            if matched:
+                return matched[:limit]
+        shared = {token for token in tokens if token in cv_terms and " " not in token and len(token) > 2}
+        # Ex æquo départagés par le terme : même résultat d'un processus à l'autre
+        return sorted(shared, key=lambda token: (-idf[vocabulary[token]], token))[:limit]
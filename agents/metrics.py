@@ -0,0 +1,198 @@
+"""
+Mesures de latence par étape et export au format Prometheus
+
+Histogrammes et compteurs en mémoire, sans dépendance : une observation coûte
+un `perf_counter()`, une recherche de seau et un verrou par métrique. Les étapes
+(recherche web, extraction de fichier, construction de prompt, appel LLM) sont
+chronométrées avec `span()`, les requêtes Flask par les hooks de app.py, et le
+tout est exposé sur `/metrics`.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Compteur cumulatif par jeu de labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}"
+                for key, value in values]
+
+
+class Histogram:
+    """Histogramme à seaux fixes par jeu de labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Par labels : [comptes par seau (+Inf en dernier), somme, nombre]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels) -> int:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            entry = self._values.get(key)
+            return entry[2] if entry else 0
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """(nombre, somme) par jeu de labels, pour calculer des écarts entre deux instants"""
+        with self._lock:
+            return {key: (entry[2], entry[1]) for key, entry in self._values.items()}
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_number(bound)
+                labels = _format_labels(self.label_names, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ensemble des métriques de l'application (une instance par nom)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, label_names)
+
+    def histogram(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, label_names, buckets)
+
+    def render(self) -> str:
+        """Exposition texte Prometheus (version 0.0.4)"""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "cv_assistant_stage_duration_seconds", "Durée des étapes (recherche web, extraction, prompt, LLM)",
+    ("stage", "provider"))
+STAGE_ERRORS = registry.counter(
+    "cv_assistant_stage_errors_total", "Étapes terminées en erreur", ("stage", "provider"))
+LLM_TOKENS = registry.counter(
+    "cv_assistant_llm_tokens_total", "Tokens estimés envoyés (prompt) et reçus (completion) par route et fournisseur",
+    ("route", "provider", "kind"))
+PROMPT_TOKENS_SAVED = registry.counter(
+    "cv_assistant_prompt_tokens_saved_total", "Tokens retirés des prompts pour tenir leur budget, par prompt",
+    ("prompt",))
+PAYLOAD_BYTES = registry.histogram(
+    "cv_assistant_payload_bytes", "Taille des fichiers envoyés et des prompts/réponses LLM",
+    ("stage", "direction"), SIZE_BUCKETS)
+HTTP_SECONDS = registry.histogram(
+    "cv_assistant_http_request_duration_seconds",
+    "Durée des requêtes Flask (jusqu'au premier octet pour les réponses en streaming)",
+    ("endpoint", "method", "status"))
+HTTP_ERRORS = registry.counter(
+    "cv_assistant_http_request_errors_total", "Requêtes Flask terminées en erreur (statut >= 500)",
+    ("endpoint", "status"))
+HTTP_BYTES = registry.histogram(
+    "cv_assistant_http_payload_bytes", "Taille des corps de requête et de réponse Flask",
+    ("endpoint", "direction"), SIZE_BUCKETS)
+
+
+@contextmanager
+def span(stage: str, provider: str = "") -> Iterator[None]:
+    """Chronomètre une étape ; une exception est comptée comme erreur puis propagée"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage, provider=provider)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage, provider=provider)
+
+
+def record_error(stage: str, provider: str = ""):
+    """Erreur d'une étape qui ne lève pas d'exception (résultat d'erreur renvoyé à l'appelant)"""
+    STAGE_ERRORS.inc(stage=stage, provider=provider)
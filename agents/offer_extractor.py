@@ -0,0 +1,314 @@
+"""
+Extraction structurée des offres d'emploi à partir des pages elles-mêmes
+
+Les pages sont téléchargées en parallèle via une session HTTP poolée (limite de
+connexions simultanées par hôte, GET conditionnel ETag/Last-Modified, cache de
+pages), puis analysées avec lxml : JSON-LD schema.org `JobPosting` d'abord,
+extracteurs spécifiques par site ensuite, heuristiques génériques en dernier.
+"""
+
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import lxml.html
+import requests
+from requests.adapters import HTTPAdapter
+
+from agents.cache import TieredCache
+from agents.result_filter import matches_domain
+
+USER_AGENT = "Mozilla/5.0 (compatible; AIJobSearchAssistant/1.0)"
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+DESCRIPTION_MAX_CHARS = 600
+
+_BLOCK_TAGS = ("p", "div", "br", "li", "ul", "ol", "tr", "h1", "h2", "h3", "h4", "h5", "h6")
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_PHONE_RE = re.compile(r"(?:\+33\s?|0)[1-9](?:[\s.-]?\d{2}){4}")
+_CONTRACT_RE = re.compile(r"\b(CDI|CDD|Stage|Alternance|Freelance|Int[ée]rim|Apprentissage)\b", re.IGNORECASE)
+_SALARY_RE = re.compile(r"\d[\d\s.,]*\s?(?:k€|K€|€|EUR)(?:\s?(?:-|à)\s?\d[\d\s.,]*\s?(?:k€|K€|€|EUR))?(?:\s?/\s?(?:an|mois|h|jour))?")
+
+# Correspondance employmentType schema.org -> libellés utilisés dans l'application
+EMPLOYMENT_TYPES = {
+    "FULL_TIME": "CDI", "PART_TIME": "Temps partiel", "CONTRACTOR": "Freelance",
+    "TEMPORARY": "CDD", "INTERN": "Stage", "VOLUNTEER": "Bénévolat", "PER_DIEM": "Intérim",
+}
+
+# Extracteurs par site : champ -> expression XPath
+SITE_EXTRACTORS = {
+    "indeed.": {
+        "nom_poste": "//h1[contains(@class,'jobsearch-JobInfoHeader-title')]//text()",
+        "entreprise": "//*[@data-company-name='true']//text()",
+        "localisation": "//*[@data-testid='inlineHeader-companyLocation']//text()",
+        "description": "//*[@id='jobDescriptionText']//text()",
+    },
+    "linkedin.com": {
+        "nom_poste": "//h1[contains(@class,'top-card-layout__title')]//text()",
+        "entreprise": "//a[contains(@class,'topcard__org-name-link')]//text()",
+        "localisation": "//span[contains(@class,'topcard__flavor--bullet')]//text()",
+        "description": "//div[contains(@class,'show-more-less-html__markup')]//text()",
+    },
+    "welcometothejungle.com": {
+        "nom_poste": "//h2[@data-testid='job-metadata-block']//text() | //h1//text()",
+        "description": "//div[@data-testid='job-section-description']//text()",
+    },
+}
+
+
+def _clean(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+def _xpath_text(tree, expression: str) -> str:
+    return _clean(" ".join(tree.xpath(expression)))
+
+
+def _html_to_text(fragment: str) -> str:
+    if not fragment:
+        return ""
+    if "<" not in fragment:
+        return _clean(fragment)
+    tree = lxml.html.fromstring(fragment)
+    # Les blocs successifs ("<p>a.</p><p>b</p>") restent séparés par un espace
+    for block in tree.iter(*_BLOCK_TAGS):
+        block.tail = " " + (block.tail or "")
+    return _clean(tree.text_content())
+
+
+def _first(value):
+    return value[0] if isinstance(value, list) and value else value
+
+
+def _iter_json_ld(tree):
+    for script in tree.xpath("//script[@type='application/ld+json']/text()"):
+        try:
+            data = json.loads(script)
+        except ValueError:
+            continue
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(item)
+            elif isinstance(item, dict):
+                if "@graph" in item:
+                    stack.extend(item["@graph"])
+                yield item
+
+
+def parse_job_posting(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Convertit un objet schema.org JobPosting en champs d'offre"""
+    organization = _first(item.get("hiringOrganization")) or {}
+    location = _first(item.get("jobLocation")) or {}
+    address = location.get("address", {}) if isinstance(location, dict) else {}
+    if isinstance(address, str):
+        locality = address
+    else:
+        locality = ", ".join(filter(None, [address.get("addressLocality"), address.get("addressRegion")]))
+
+    employment = item.get("employmentType") or []
+    if not isinstance(employment, list):
+        employment = [employment]
+
+    salary = ""
+    base_salary = item.get("baseSalary")
+    if isinstance(base_salary, dict):
+        value = base_salary.get("value", {})
+        currency = base_salary.get("currency", "")
+        if isinstance(value, dict):
+            low, high = value.get("minValue"), value.get("maxValue")
+            amount = f"{low} - {high}" if low and high else (low or high or value.get("value") or "")
+            unit = value.get("unitText", "")
+            salary = _clean(f"{amount} {currency} {('/ ' + unit.lower()) if unit else ''}")
+        elif value:
+            salary = _clean(f"{value} {currency}")
+
+    skills = item.get("skills") or []
+    if isinstance(skills, str):
+        skills = [s.strip() for s in re.split(r"[,;\n]", skills) if s.strip()]
+
+    return {
+        "nom_poste": _clean(item.get("title", "")),
+        "entreprise": _clean(organization.get("name", "") if isinstance(organization, dict) else str(organization)),
+        "localisation": _clean(locality),
+        "type_contrat": ", ".join(EMPLOYMENT_TYPES.get(str(e).upper(), str(e)) for e in employment),
+        "salaire": salary,
+        "date_publication": item.get("datePosted", ""),
+        "deadline": item.get("validThrough", ""),
+        "description": _html_to_text(item.get("description", ""))[:DESCRIPTION_MAX_CHARS],
+        "competences": skills,
+    }
+
+
+def extract_offer_fields(url: str, html: str) -> Dict[str, Any]:
+    """Champs structurés d'une page d'offre (valeurs vides si introuvables)"""
+    tree = lxml.html.fromstring(html)
+    fields: Dict[str, Any] = {}
+
+    for item in _iter_json_ld(tree):
+        types = item.get("@type")
+        if types == "JobPosting" or (isinstance(types, list) and "JobPosting" in types):
+            fields = parse_job_posting(item)
+            break
+
+    for site, expressions in SITE_EXTRACTORS.items():
+        if matches_domain(url, (site,)):
+            for field, expression in expressions.items():
+                if not fields.get(field):
+                    fields[field] = _xpath_text(tree, expression)[:DESCRIPTION_MAX_CHARS]
+            break
+
+    for bad in tree.xpath("//script|//style|//noscript"):
+        bad.drop_tree()
+    page_text = _clean(" ".join(tree.itertext()))
+
+    if not fields.get("nom_poste"):
+        fields["nom_poste"] = _clean(" ".join(tree.xpath("//meta[@property='og:title']/@content")) or
+                                     " ".join(tree.xpath("//h1//text()")))
+    if not fields.get("description"):
+        fields["description"] = _clean(" ".join(tree.xpath("//meta[@name='description']/@content")))[:DESCRIPTION_MAX_CHARS]
+    if not fields.get("type_contrat"):
+        contracts = []
+        for match in _CONTRACT_RE.findall(page_text):
+            label = match.capitalize() if match.lower() not in ("cdi", "cdd") else match.upper()
+            if label not in contracts:
+                contracts.append(label)
+        fields["type_contrat"] = ", ".join(contracts[:3])
+    if not fields.get("salaire"):
+        salary = _SALARY_RE.search(page_text)
+        fields["salaire"] = _clean(salary.group()) if salary else ""
+
+    fields["contact"] = {
+        "emails": sorted(set(_EMAIL_RE.findall(page_text)))[:3],
+        "phones": sorted(set(_PHONE_RE.findall(page_text)))[:3],
+    }
+    return fields
+
+
+class PageFetcher:
+    """
+    Téléchargement de pages avec pool de connexions et cache conditionnel
+
+    Args:
+        per_host_limit: Requêtes simultanées maximum vers un même hôte
+        timeout: Timeout (connexion, lecture) en secondes
+        cache: Cache des pages (corps + ETag/Last-Modified)
+    """
+
+    def __init__(self, per_host_limit: int = 2, timeout=(3.0, 8.0), pool_size: int = 32, cache: TieredCache = None):
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        # Les pages périmées restent STALE_TTL secondes de plus pour les GET conditionnels
+        self.cache = cache or TieredCache(ttl=float(os.getenv('PAGE_CACHE_TTL', '3600')),
+                                          stale_ttl=float(os.getenv('PAGE_CACHE_STALE_TTL', '86400')),
+                                          max_entries=1024, db_path=os.getenv('PAGE_CACHE_DB') or None)
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8"})
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _host_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            semaphore = self._host_limits.get(host)
+            if semaphore is None:
+                semaphore = self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return semaphore
+
+    def fetch(self, url: str) -> Optional[str]:
+        """Renvoie le HTML de la page (depuis le cache si le serveur répond 304), ou None"""
+        fresh = self.cache.get(url)
+        if fresh is not None:
+            return fresh["body"]
+        cached = self.cache.peek(url)
+
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        # Le corps est lu sous le sémaphore : avec stream=True, la connexion reste occupée jusque-là
+        with self._host_semaphore(url):
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+            except requests.exceptions.RequestException:
+                return cached["body"] if cached else None
+
+            with response:
+                if response.status_code == 304 and cached:
+                    self.cache.set(url, cached)
+                    return cached["body"]
+                if response.status_code != 200 or "html" not in response.headers.get("Content-Type", "html"):
+                    return None
+                try:
+                    body = response.raw.read(MAX_PAGE_BYTES, decode_content=True)
+                except Exception:
+                    return cached["body"] if cached else None
+                has_charset = "charset" in response.headers.get("Content-Type", "").lower()
+                encoding = response.encoding if has_charset and response.encoding else "utf-8"
+
+        html = body.decode(encoding, errors="replace")
+        self.cache.set(url, {
+            "body": html,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        })
+        return html
+
+
+class OfferExtractor:
+    """
+    Enrichit des résultats de recherche avec les champs structurés de leurs pages
+
+    Args:
+        fetcher: PageFetcher partagé
+        max_workers: Pages téléchargées en parallèle
+        timeout: Durée maximale de l'enrichissement d'une recherche (secondes)
+    """
+
+    def __init__(self, fetcher: PageFetcher = None, max_workers: int = 8, timeout: float = None):
+        self.fetcher = fetcher or PageFetcher()
+        self.max_workers = max_workers
+        self.timeout = timeout if timeout is not None else float(os.getenv('OFFER_ENRICHMENT_TIMEOUT', '4'))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="offer-extractor")
+
+    def enrich_one(self, offer: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            html = self.fetcher.fetch(offer["url"])
+            if not html:
+                return offer
+            fields = extract_offer_fields(offer["url"], html)
+        except Exception as e:
+            print(f"⚠️ Extraction impossible pour {offer.get('url')}: {str(e)}")
+            return offer
+        enriched = dict(offer)
+        for field, value in fields.items():
+            if value and not enriched.get(field):
+                enriched[field] = value
+        return enriched
+
+    def enrich(self, offers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Télécharge et analyse les pages en parallèle ; l'ordre des offres est conservé
+
+        Les offres non enrichies à l'échéance (`timeout`) sont renvoyées telles quelles :
+        les téléchargements déjà lancés se terminent en arrière-plan et alimentent le cache de pages.
+        """
+        if not offers:
+            return []
+        futures = [self._executor.submit(self.enrich_one, offer) for offer in offers]
+        done, pending = wait(futures, timeout=self.timeout)
+        for future in pending:
+            future.cancel()
+        if pending:
+            print(f"⚠️ Enrichissement interrompu après {self.timeout:g}s : {len(pending)} offres non enrichies")
+        return [future.result() if future in done else offer for future, offer in zip(futures, offers)]
@@ -0,0 +1,180 @@
+"""
+Assemblage des prompts sous budget de tokens, commun à tous les agents
+
+Chaque section a un budget et une priorité ; une section trop longue est réduite
+par résumé extractif (lignes/phrases les plus liées au `focus`), et si le total
+dépasse le budget global, les sections les moins prioritaires cèdent d'abord.
+"""
+
+import json
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from agents.metrics import PROMPT_TOKENS_SAVED, STAGE_SECONDS
+from agents.text_utils import estimate_tokens, strip_accents
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+")
+_TERM_RE = re.compile(r"[\w+#]{3,}")
+
+# Rapports des prompts construits pendant la requête en cours (voir begin_prompt_reports)
+_request_reports: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("prompt_reports", default=None)
+
+
+def begin_prompt_reports():
+    """Démarre la collecte des rapports de prompts pour la requête courante"""
+    _request_reports.set([])
+
+
+def prompt_reports() -> List[Dict[str, Any]]:
+    """Rapports (`PromptBuilder.last_report`) des prompts construits depuis `begin_prompt_reports()`"""
+    return list(_request_reports.get() or [])
+
+
+def compact_json(data: Any) -> str:
+    """JSON sans indentation ni espaces superflus"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _terms(text: str) -> set:
+    return set(_TERM_RE.findall(strip_accents(text.lower())))
+
+
+def _truncate_words(text: str, budget: int) -> str:
+    words = text.split()
+    kept, used = [], 0
+    for word in words:
+        cost = estimate_tokens(word)
+        if used + cost > budget:
+            break
+        kept.append(word)
+        used += cost
+    return " ".join(kept)
+
+
+def summarize_extractive(text: str, budget: int, focus: str = "") -> str:
+    """
+    Garde les lignes ou phrases les plus pertinentes dans l'ordre d'origine
+
+    Le score d'une unité est le nombre de termes partagés avec `focus`, plus un
+    bonus pour les premières lignes (en-tête, coordonnées).
+    """
+    if estimate_tokens(text) <= budget:
+        return text
+
+    units: List[str] = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        units.extend(s for s in _SENTENCE_RE.split(line) if s)
+
+    focus_terms = _terms(focus)
+    scored = []
+    for position, unit in enumerate(units):
+        score = len(_terms(unit) & focus_terms)
+        if position < 5:
+            score += 5 - position
+        scored.append((score, position, unit, estimate_tokens(unit)))
+
+    selected, used = [], 0
+    for score, position, unit, cost in sorted(scored, key=lambda item: (-item[0], item[1])):
+        if used + cost > budget:
+            continue
+        selected.append((position, unit))
+        used += cost
+
+    if not selected and units:
+        return _truncate_words(units[0], budget)
+    return "\n".join(unit for _, unit in sorted(selected))
+
+
+class PromptSection:
+    def __init__(self, name: str, content: Any, budget: int, priority: int, focus: str = ""):
+        self.name = name
+        self.content = content
+        self.budget = budget
+        self.priority = priority
+        self.focus = focus
+        self.is_json = not isinstance(content, str)
+        self.original_tokens = estimate_tokens(self._render(content))
+
+    def _render(self, content: Any) -> str:
+        return compact_json(content) if self.is_json else (content or "")
+
+    def fit(self, budget: int) -> str:
+        if not self.is_json:
+            return summarize_extractive(self.content or "", budget, self.focus)
+        data = self.content
+        if isinstance(data, list):
+            # Les listes sont déjà classées : on retire les derniers éléments
+            items = list(data)
+            while items and estimate_tokens(compact_json(items)) > budget:
+                items.pop()
+            return compact_json(items)
+        rendered = compact_json(data)
+        return rendered if estimate_tokens(rendered) <= budget else _truncate_words(rendered, budget)
+
+
+class PromptBuilder:
+    """
+    Construit les sections d'un prompt en respectant un budget global
+
+    Args:
+        name: Nom du prompt (pour le rapport)
+        max_tokens: Budget total de l'ensemble des sections
+    """
+
+    def __init__(self, name: str, max_tokens: int = 6000):
+        self.name = name
+        self.max_tokens = max_tokens
+        self.sections: List[PromptSection] = []
+        self.last_report: Optional[Dict[str, Any]] = None
+        # Chronométré de la création à build() : l'estimation des tokens se fait dans add()
+        self._started = time.perf_counter()
+
+    def add(self, name: str, content: Any, budget: int, priority: int = 1, focus: str = "") -> "PromptBuilder":
+        """Ajoute une section ; `priority` 1 = la plus importante ; un contenu non textuel est sérialisé en JSON compact"""
+        self.sections.append(PromptSection(name, content, budget, priority, focus))
+        return self
+
+    def _allocate(self) -> Dict[str, int]:
+        budgets = {s.name: min(s.budget, s.original_tokens) for s in self.sections}
+        overflow = sum(budgets.values()) - self.max_tokens
+        # Les sections les moins prioritaires sont réduites en premier
+        for section in sorted(self.sections, key=lambda s: -s.priority):
+            if overflow <= 0:
+                break
+            reduction = min(overflow, budgets[section.name])
+            budgets[section.name] -= reduction
+            overflow -= reduction
+        return budgets
+
+    def build(self) -> Dict[str, str]:
+        """Renvoie le texte de chaque section, ajusté à son budget"""
+        budgets = self._allocate()
+        rendered, report_sections = {}, {}
+        for section in self.sections:
+            text = section.fit(budgets[section.name]) if section.original_tokens > budgets[section.name] \
+                else section._render(section.content)
+            rendered[section.name] = text
+            report_sections[section.name] = {"original": section.original_tokens, "final": estimate_tokens(text)}
+
+        original = sum(s["original"] for s in report_sections.values())
+        final = sum(s["final"] for s in report_sections.values())
+        self.last_report = {
+            "prompt": self.name,
+            "original_tokens": original,
+            "final_tokens": final,
+            "tokens_saved": original - final,
+            "sections": report_sections,
+        }
+        PROMPT_TOKENS_SAVED.inc(original - final, prompt=self.name)
+        reports = _request_reports.get()
+        if reports is not None:
+            reports.append(self.last_report)
+        if original > final:
+            print(f"📏 Prompt {self.name}: {original} -> {final} tokens ({original - final} économisés)")
+        STAGE_SECONDS.observe(time.perf_counter() - self._started, stage="prompt_build")
+        return rendered
@@ -0,0 +1,74 @@
+"""
+Limiteur de débit (token bucket) partagé entre les threads, par backend
+"""
+
+import threading
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """Seau à jetons thread-safe : `rate` jetons/seconde, rafale de `capacity`"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Prend des jetons sans attendre ; renvoie False si le seau est vide"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, timeout: float = None) -> bool:
+        """
+        Attend que des jetons soient disponibles
+
+        Returns:
+            True si les jetons ont été obtenus, False si le timeout a expiré
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+# Réglages par défaut : une rafale couvre toutes les variantes d'une recherche
+DEFAULT_LIMITS = {
+    "duckduckgo": (2.0, 5),
+}
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(backend: str, rate: float = None, capacity: int = None) -> TokenBucket:
+    """Renvoie le seau partagé d'un backend (créé au premier appel)"""
+    with _buckets_lock:
+        bucket = _buckets.get(backend)
+        if bucket is None:
+            default_rate, default_capacity = DEFAULT_LIMITS.get(backend, (1.0, 1))
+            bucket = TokenBucket(rate or default_rate, capacity or default_capacity)
+            _buckets[backend] = bucket
+        return bucket
@@ -0,0 +1,70 @@
+"""
+Registre d'agents construits à la première utilisation
+
+Les modules des agents (numpy/scipy, lxml, ddgs...) ne sont importés que
+lorsqu'un endpoint en a besoin : un worker qui ne sert qu'une route ne paie ni
+le temps d'import ni la mémoire des autres.
+"""
+
+import importlib
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+def lazy_factory(module: str, attribute: str, *args, **kwargs) -> Callable[[], Any]:
+    """Fabrique qui importe `module.attribute` au premier appel puis l'instancie"""
+    def build():
+        return getattr(importlib.import_module(module), attribute)(*args, **kwargs)
+    return build
+
+
+class AgentRegistry:
+    """
+    Instances uniques construites à la demande, de façon thread-safe
+
+    Deux requêtes simultanées sur un agent pas encore construit n'en
+    construisent qu'un ; les autres agents restent accessibles pendant ce temps.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._build_seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            self._factories[name] = factory
+            self._locks[name] = threading.Lock()
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Instance de l'agent `name`, construite au premier appel"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(f"Agent inconnu: {name}")
+
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                started = time.perf_counter()
+                instance = self._factories[name]()
+                self._build_seconds[name] = round(time.perf_counter() - started, 3)
+                print(f"🧩 Agent '{name}' construit en {self._build_seconds[name]:.2f}s")
+                self._instances[name] = instance
+        return instance
+
+    def peek(self, name: str) -> Optional[Any]:
+        """Instance déjà construite, sans déclencher la construction"""
+        return self._instances.get(name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "registered": sorted(self._factories),
+            "built": sorted(self._instances),
+            "build_seconds": dict(self._build_seconds),
+        }
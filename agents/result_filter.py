@@ -0,0 +1,174 @@
+"""
+Filtrage des résultats de recherche avant l'appel LLM
+
+Pipeline : canonicalisation des URLs -> dédoublonnage (URL + SimHash des extraits)
+-> élimination des pages qui ne sont pas des offres -> top-K par score lexical.
+"""
+
+import hashlib
+import re
+from typing import Any, Dict, Iterable, List
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from agents.text_utils import strip_accents
+
+# Paramètres de suivi / de langue qui ne changent pas la page désignée
+NOISE_PARAMS = {
+    "hl", "gl", "lang", "locale", "ref", "refid", "trk", "trackingid", "tracking_id",
+    "fbclid", "gclid", "msclkid", "sessionid", "session_id", "src", "from", "co",
+}
+
+JOB_DOMAINS = (
+    "linkedin.com/jobs", "indeed.", "glassdoor.", "monster.", "stepstone.", "apec.fr",
+    "francetravail.fr", "pole-emploi.fr", "welcometothejungle.com", "hellowork.com",
+    "jobteaser.com", "cadremploi.fr", "regionsjob.com", "meteojob.com", "jobijoba.com",
+    "talent.com", "lesjeudis.com", "free-work.com", "keljob.com", "optioncarriere.com",
+)
+
+NON_JOB_DOMAINS = (
+    "support.google.com", "youtube.com", "youtu.be", "wikipedia.org", "facebook.com",
+    "instagram.com", "twitter.com", "x.com", "tiktok.com", "reddit.com", "pinterest.",
+    "amazon.", "play.google.com", "apps.apple.com", "microsoft.com/support", "quora.com",
+)
+
+JOB_KEYWORDS = (
+    "emploi", "offre", "offres", "job", "jobs", "recrute", "recrutement", "recrutons", "hiring",
+    "poste", "cdi", "cdd", "stage", "alternance", "freelance", "candidature", "postuler",
+    "carriere", "career", "careers", "salaire", "salary", "vacancy", "h/f", "f/h",
+)
+
+# Domaines de marque ("indeed.", "amazon.") : suffixes pays/commerciaux uniquement,
+# pour que amazon.jobs ou indeed.example.org ne soient pas pris pour le site de la marque
+BRAND_SUFFIXES = (
+    "com", "fr", "de", "be", "ch", "ca", "lu", "it", "es", "nl", "at", "ie", "pl", "pt", "se",
+    "co.uk", "co.in", "com.au", "com.br", "co.jp", "in", "jp", "us", "net", "org",
+)
+
+_WORD_RE = re.compile(r"[\w+#/]+")
+
+
+def canonicalize_url(url: str) -> str:
+    """Forme canonique d'une URL : hôte sans www, paramètres de bruit retirés et triés"""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=False)
+                   if k.lower() not in NOISE_PARAMS and not k.lower().startswith("utm_"))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower() or "https", host, path, urlencode(query), ""))
+
+
+def _tokens(text: str) -> List[str]:
+    return _WORD_RE.findall(strip_accents(text.lower()))
+
+
+def simhash(text: str, bits: int = 64) -> int:
+    """Empreinte SimHash sur les mots du texte"""
+    weights = [0] * bits
+    for token in set(_tokens(text)):
+        h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(bits):
+            weights[i] += 1 if (h >> i) & 1 else -1
+    return sum(1 << i for i in range(bits) if weights[i] > 0)
+
+
+def _hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _host_matches(hostname: str, domain: str) -> bool:
+    """Hôte égal au domaine ou sous-domaine de celui-ci ; "marque." couvre les BRAND_SUFFIXES"""
+    if domain.endswith("."):
+        return any(_host_matches(hostname, domain + suffix) for suffix in BRAND_SUFFIXES)
+    return hostname == domain or hostname.endswith("." + domain)
+
+
+def matches_domain(url: str, domains: Iterable[str]) -> bool:
+    """
+    L'URL appartient-elle à l'un des domaines ?
+
+    Seul l'hôte est comparé (jamais le chemin ni les paramètres), sauf pour les
+    entrées avec chemin ("linkedin.com/jobs") dont le chemin doit commencer pareil.
+    """
+    try:
+        parts = urlsplit(url.strip().lower())
+    except ValueError:
+        return False
+    hostname = parts.hostname or ""
+    if hostname.startswith("www."):
+        hostname = hostname[4:]
+    if not hostname:
+        return False
+    for domain in domains:
+        host, _, path = domain.partition("/")
+        if _host_matches(hostname, host) and (not path or parts.path.startswith("/" + path)):
+            return True
+    return False
+
+
+def is_job_page(result: Dict[str, Any]) -> bool:
+    """Classifieur rapide domaine + mots-clés"""
+    url = result.get("url", "").lower()
+    if matches_domain(url, NON_JOB_DOMAINS):
+        return False
+    if matches_domain(url, JOB_DOMAINS):
+        return True
+    words = set(_tokens(f"{result.get('title', '')} {result.get('snippet', '')} {url}"))
+    return any(keyword in words for keyword in JOB_KEYWORDS)
+
+
+def relevance_score(result: Dict[str, Any], query_terms: Iterable[str]) -> float:
+    """Score lexical : termes de la requête présents dans le titre (x2) et l'extrait"""
+    title = set(_tokens(result.get("title", "")))
+    body = set(_tokens(result.get("snippet", "")))
+    score = 0.0
+    for term in query_terms:
+        if term in title:
+            score += 2.0
+        elif term in body:
+            score += 1.0
+    if matches_domain(result.get("url", ""), JOB_DOMAINS):
+        score += 1.0
+    return score
+
+
+def filter_search_results(results: List[Dict[str, Any]], job_title: str, location: str = "",
+                          skills: str = "", top_k: int = 15, max_hamming: int = 3) -> List[Dict[str, Any]]:
+    """
+    Réduit les résultats bruts à `top_k` offres distinctes et pertinentes
+
+    Les entrées d'erreur ({"error": ...}) sont écartées ; `top_k=None` garde
+    toutes les offres distinctes, classées.
+    """
+    query_terms = [t for t in _tokens(f"{job_title} {location} {skills}") if len(t) > 1]
+    seen_urls = set()
+    fingerprints: List[int] = []
+    kept = []
+
+    for result in results:
+        if "error" in result or not result.get("url"):
+            continue
+        canonical = canonicalize_url(result["url"])
+        if canonical in seen_urls:
+            continue
+        seen_urls.add(canonical)
+
+        if not is_job_page(result):
+            continue
+
+        fingerprint = simhash(f"{result.get('title', '')} {result.get('snippet', '')}")
+        if any(_hamming(fingerprint, other) <= max_hamming for other in fingerprints):
+            continue
+        fingerprints.append(fingerprint)
+
+        kept.append(dict(result, url=canonical))
+
+    ranked = sorted(kept, key=lambda r: relevance_score(r, query_terms), reverse=True)
+    if top_k is not None:
+        ranked = ranked[:top_k]
+    print(f"🧹 Filtrage: {len(results)} résultats bruts -> {len(kept)} offres distinctes -> {len(ranked)} retenues")
+    return ranked
@@ -0,0 +1,453 @@
+"""
+Recherches sauvegardées et alertes sur nouvelles offres
+
+Les recherches de tous les utilisateurs sont regroupées par requête normalisée :
+une requête suivie par cent personnes n'est rafraîchie qu'une fois par période.
+À chaque rafraîchissement (intervalle avec gigue, pour lisser la charge), les
+offres sont comparées à celles déjà vues (URL canonique et empreinte SimHash du
+contenu) ; seules les nouvelles sont résumées par le LLM et notifiées.
+
+Les rafraîchissements passent par un budget global (seaux à jetons) et cèdent
+la place dès que les appels LLM interactifs sont nombreux.
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from agents.job_index import normalize_query_key
+from agents.metrics import span
+from agents.rate_limiter import TokenBucket, get_rate_limiter
+from agents.result_filter import canonicalize_url, simhash
+
+SEARCH_FIELDS = ("job_title", "location", "experience_level", "skills", "contract_type")
+ALERT_FIELDS = ("title", "nom_poste", "entreprise", "localisation", "type_contrat", "salaire", "snippet", "url")
+
+
+class SavedSearchNotFoundError(LookupError):
+    """Identifiant de recherche sauvegardée inconnu"""
+
+
+def offer_fingerprint(offer: Dict[str, Any]) -> int:
+    """Empreinte du contenu : une offre republiée sous une autre URL reste reconnue"""
+    return simhash(f"{offer.get('nom_poste') or offer.get('title', '')} {offer.get('entreprise', '')} "
+                   f"{offer.get('snippet', '')}")
+
+
+def diff_offers(offers: Iterable[Dict[str, Any]], seen_urls: Set[str], seen_fingerprints: List[int],
+                max_hamming: int = 3) -> List[Tuple[Dict[str, Any], str, int]]:
+    """
+    Offres jamais vues : URL canonique inconnue et contenu éloigné de toutes les empreintes connues
+
+    Returns:
+        [(offre, URL canonique, empreinte), ...]
+    """
+    fingerprints = list(seen_fingerprints)
+    urls = set(seen_urls)
+    new = []
+    for offer in offers:
+        if "error" in offer or not offer.get("url"):
+            continue
+        url = canonicalize_url(offer["url"])
+        if url in urls:
+            continue
+        urls.add(url)
+        fingerprint = offer_fingerprint(offer)
+        if any(bin(fingerprint ^ other).count("1") <= max_hamming for other in fingerprints):
+            continue
+        fingerprints.append(fingerprint)
+        new.append((offer, url, fingerprint))
+    return new
+
+
+class SavedSearchStore:
+    """
+    Recherches sauvegardées, requêtes mutualisées, offres vues et alertes (SQLite)
+
+    Args:
+        db_path: Fichier SQLite (":memory:" pour un stockage éphémère)
+        max_seen: Offres vues gardées par requête (les plus anciennes sont oubliées)
+    """
+
+    def __init__(self, db_path: str = ":memory:", max_seen: int = 2000):
+        self.db_path = db_path
+        self.max_seen = max_seen
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS saved_searches (
+                id TEXT PRIMARY KEY,
+                query_key TEXT NOT NULL,
+                params TEXT NOT NULL,
+                interval REAL NOT NULL,
+                callback_url TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS saved_searches_query ON saved_searches (query_key);
+            CREATE TABLE IF NOT EXISTS query_pool (
+                query_key TEXT PRIMARY KEY,
+                params TEXT NOT NULL,
+                interval REAL NOT NULL,
+                next_run_at REAL NOT NULL,
+                last_run_at REAL,
+                initialized INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS seen_offers (
+                query_key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                first_seen_at REAL NOT NULL,
+                PRIMARY KEY (query_key, url)
+            );
+            CREATE TABLE IF NOT EXISTS alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                query_key TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                offers TEXT NOT NULL,
+                summary TEXT
+            );
+            CREATE INDEX IF NOT EXISTS alerts_query ON alerts (query_key, id);
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def query_key(params: Dict[str, str]) -> str:
+        return normalize_query_key(*(params.get(field, "") for field in SEARCH_FIELDS))
+
+    def create(self, params: Dict[str, str], interval: float, callback_url: str = None) -> Dict[str, Any]:
+        """
+        Enregistre une recherche ; sa requête rejoint le pool existant s'il y en a un
+        (l'intervalle du pool devient le plus court demandé)
+        """
+        params = {field: (params.get(field) or "").strip() for field in SEARCH_FIELDS}
+        query_key = self.query_key(params)
+        search_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO saved_searches (id, query_key, params, interval, callback_url, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (search_id, query_key, json.dumps(params, ensure_ascii=False), interval, callback_url, now)
+            )
+            # Première inscription : état initial relevé tout de suite (sans alerte)
+            self._conn.execute(
+                "INSERT INTO query_pool (query_key, params, interval, next_run_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(query_key) DO UPDATE SET interval = MIN(interval, excluded.interval)",
+                (query_key, json.dumps(params, ensure_ascii=False), interval, now)
+            )
+            self._conn.commit()
+        return self.get(search_id)
+
+    def get(self, search_id: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT s.*, p.next_run_at, p.last_run_at, p.initialized, "
+                "(SELECT COUNT(*) FROM saved_searches o WHERE o.query_key = s.query_key) AS subscribers "
+                "FROM saved_searches s JOIN query_pool p ON p.query_key = s.query_key WHERE s.id = ?",
+                (search_id,)
+            ).fetchone()
+        if row is None:
+            raise SavedSearchNotFoundError(f"Recherche sauvegardée introuvable: {search_id}")
+        return {
+            "id": row["id"],
+            "params": json.loads(row["params"]),
+            "interval": row["interval"],
+            "callback_url": row["callback_url"],
+            "created_at": row["created_at"],
+            "next_run_at": row["next_run_at"],
+            "last_run_at": row["last_run_at"],
+            "initialized": bool(row["initialized"]),
+            "subscribers": row["subscribers"],
+            "query_key": row["query_key"],
+        }
+
+    def delete(self, search_id: str):
+        """Supprime la recherche ; le pool disparaît avec son dernier abonné"""
+        query_key = self.get(search_id)["query_key"]
+        with self._lock:
+            self._conn.execute("DELETE FROM saved_searches WHERE id = ?", (search_id,))
+            remaining = self._conn.execute(
+                "SELECT COUNT(*) FROM saved_searches WHERE query_key = ?", (query_key,)
+            ).fetchone()[0]
+            if not remaining:
+                for table in ("query_pool", "seen_offers", "alerts"):
+                    self._conn.execute(f"DELETE FROM {table} WHERE query_key = ?", (query_key,))
+            self._conn.commit()
+
+    def subscribers(self, query_key: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, callback_url FROM saved_searches WHERE query_key = ?", (query_key,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def due(self, now: float, limit: int) -> List[Dict[str, Any]]:
+        """Pools à rafraîchir, les plus en retard d'abord"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM query_pool WHERE next_run_at <= ? ORDER BY next_run_at LIMIT ?", (now, limit)
+            ).fetchall()
+        return [dict(row, params=json.loads(row["params"])) for row in rows]
+
+    def claim(self, pool: Dict[str, Any], next_run_at: float) -> bool:
+        """
+        Réserve le rafraîchissement d'un pool en repoussant sa prochaine échéance ;
+        False si un autre worker (ou processus) l'a déjà pris
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE query_pool SET next_run_at = ? WHERE query_key = ? AND next_run_at = ?",
+                (next_run_at, pool["query_key"], pool["next_run_at"])
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def seen(self, query_key: str) -> Tuple[Set[str], List[int]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, fingerprint FROM seen_offers WHERE query_key = ?", (query_key,)
+            ).fetchall()
+        return {row["url"] for row in rows}, [int(row["fingerprint"], 16) for row in rows]
+
+    def record_refresh(self, query_key: str, new_offers: List[Tuple[Dict[str, Any], str, int]],
+                       summary: Optional[str], alert: bool) -> Optional[Dict[str, Any]]:
+        """Mémorise les offres vues et, si `alert`, crée l'alerte des nouvelles offres"""
+        now = time.time()
+        alert_record = None
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen_offers (query_key, url, fingerprint, first_seen_at) VALUES (?, ?, ?, ?)",
+                [(query_key, url, format(fingerprint, "016x"), now) for _, url, fingerprint in new_offers]
+            )
+            self._conn.execute(
+                "DELETE FROM seen_offers WHERE query_key = ? AND url NOT IN ("
+                "SELECT url FROM seen_offers WHERE query_key = ? ORDER BY first_seen_at DESC LIMIT ?)",
+                (query_key, query_key, self.max_seen)
+            )
+            if alert and new_offers:
+                offers = [dict({field: offer.get(field) for field in ALERT_FIELDS if offer.get(field)}, url=url)
+                          for offer, url, _ in new_offers]
+                cursor = self._conn.execute(
+                    "INSERT INTO alerts (query_key, created_at, offers, summary) VALUES (?, ?, ?, ?)",
+                    (query_key, now, json.dumps(offers, ensure_ascii=False), summary)
+                )
+                alert_record = {"id": cursor.lastrowid, "created_at": now, "offers": offers, "summary": summary}
+            self._conn.execute(
+                "UPDATE query_pool SET last_run_at = ?, initialized = 1 WHERE query_key = ?", (now, query_key)
+            )
+            self._conn.commit()
+        return alert_record
+
+    def alerts(self, search_id: str, since: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+        """Alertes de la requête d'une recherche sauvegardée, postérieures à l'alerte `since`"""
+        query_key = self.get(search_id)["query_key"]
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM alerts WHERE query_key = ? AND id > ? ORDER BY id DESC LIMIT ?",
+                (query_key, since, limit)
+            ).fetchall()
+        return [{"id": row["id"], "created_at": row["created_at"], "offers": json.loads(row["offers"]),
+                 "summary": row["summary"]} for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "saved_searches": self._conn.execute("SELECT COUNT(*) FROM saved_searches").fetchone()[0],
+                "pooled_queries": self._conn.execute("SELECT COUNT(*) FROM query_pool").fetchone()[0],
+                "alerts": self._conn.execute("SELECT COUNT(*) FROM alerts").fetchone()[0],
+            }
+
+
+class AlertScheduler:
+    """
+    Rafraîchissement en arrière-plan des requêtes sauvegardées
+
+    Args:
+        store: SavedSearchStore
+        agent_factory: Renvoie le JobSearchAgent (construit seulement au premier rafraîchissement)
+        refresh_budget: Seau global limitant les rafraîchissements (recherches web)
+        summary_budget: Seau global limitant les résumés LLM (sans jeton, l'alerte part sans résumé)
+        busy: Fonction vraie quand le trafic interactif est élevé : les rafraîchissements attendent
+        jitter: Variation relative de l'intervalle (0.2 = ±20 %)
+        tick: Période de réveil du planificateur (secondes)
+        max_workers: Rafraîchissements simultanés
+        max_offers: Offres examinées par rafraîchissement
+    """
+
+    def __init__(self, store: SavedSearchStore, agent_factory: Callable[[], Any],
+                 refresh_budget: TokenBucket, summary_budget: TokenBucket,
+                 busy: Callable[[], bool] = None, jitter: float = 0.2, tick: float = 30.0,
+                 max_workers: int = 2, max_offers: int = 50):
+        self.store = store
+        self.agent_factory = agent_factory
+        self.refresh_budget = refresh_budget
+        self.summary_budget = summary_budget
+        self.busy = busy or (lambda: False)
+        self.jitter = jitter
+        self.tick = tick
+        self.max_workers = max_workers
+        self.max_offers = max_offers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="alerts")
+        self._running: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._random = random.Random()
+        self._stats = {"refreshes": 0, "failed": 0, "deferred_busy": 0, "deferred_budget": 0,
+                       "new_offers": 0, "alerts": 0, "summaries": 0, "summaries_skipped": 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def next_run(self, interval: float, now: float = None) -> float:
+        factor = 1 + self._random.uniform(-self.jitter, self.jitter)
+        return (now or time.time()) + interval * factor
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="alert-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _loop(self):
+        while not self._stop.wait(self.tick * self._random.uniform(0.5, 1.0)):
+            try:
+                self.run_pending()
+            except Exception as e:
+                print(f"⚠️ Planificateur d'alertes: {str(e)}")
+
+    def run_pending(self) -> int:
+        """Lance les rafraîchissements échus que le budget permet ; renvoie leur nombre"""
+        launched = 0
+        with self._lock:
+            free_slots = self.max_workers - len(self._running)
+        if free_slots <= 0:
+            return 0
+        for pool in self.store.due(time.time(), free_slots):
+            if self.busy():
+                self._count("deferred_busy")
+                break
+            # L'état initial d'une nouvelle requête ne consomme pas le budget des rafraîchissements
+            if pool["initialized"] and not self.refresh_budget.try_acquire():
+                self._count("deferred_budget")
+                break
+            if not self.store.claim(pool, self.next_run(pool["interval"])):
+                continue
+            with self._lock:
+                self._running.add(pool["query_key"])
+            self._executor.submit(self._refresh_safely, pool)
+            launched += 1
+        return launched
+
+    def _refresh_safely(self, pool: Dict[str, Any]):
+        try:
+            self.refresh(pool)
+        except Exception as e:
+            self._count("failed")
+            print(f"⚠️ Rafraîchissement de l'alerte '{pool['query_key']}' en échec: {str(e)}")
+        finally:
+            with self._lock:
+                self._running.discard(pool["query_key"])
+
+    def refresh(self, pool: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Recherche, comparaison avec les offres vues, résumé et notification des nouvelles offres"""
+        params = pool["params"]
+        agent = self.agent_factory()
+        with span("alert_refresh"):
+            # Index local d'abord : une recherche interactive plus récente que l'intervalle évite le web
+            offers = agent.collect_offers(
+                params["job_title"], params["location"], params["experience_level"], params["skills"],
+                params["contract_type"], limit=self.max_offers, max_age=pool["interval"]
+            )
+            seen_urls, seen_fingerprints = self.store.seen(pool["query_key"])
+            new_offers = diff_offers(offers, seen_urls, seen_fingerprints)
+        self._count("refreshes")
+
+        if not pool["initialized"]:
+            # Premier relevé : tout est déjà « vu », aucune alerte
+            self.store.record_refresh(pool["query_key"], new_offers, None, alert=False)
+            return None
+
+        summary = None
+        if new_offers:
+            self._count("new_offers", len(new_offers))
+            if not self.busy() and self.summary_budget.try_acquire():
+                summary = agent.summarize_new_offers(params, [offer for offer, _, _ in new_offers])
+                self._count("summaries")
+            else:
+                self._count("summaries_skipped")
+        alert = self.store.record_refresh(pool["query_key"], new_offers, summary, alert=True)
+        if alert is not None:
+            self._count("alerts")
+            self._notify(pool["query_key"], alert)
+        return alert
+
+    def _notify(self, query_key: str, alert: Dict[str, Any]):
+        """Webhook de chaque abonné ayant fourni une callback_url, au mieux"""
+        targets = [subscriber for subscriber in self.store.subscribers(query_key) if subscriber["callback_url"]]
+        if not targets:
+            return
+        import requests  # importé seulement si un webhook est utilisé
+
+        for subscriber in targets:
+            try:
+                requests.post(subscriber["callback_url"], json=dict(alert, saved_search_id=subscriber["id"]),
+                              timeout=10)
+            except requests.exceptions.RequestException as e:
+                print(f"⚠️ Webhook {subscriber['callback_url']} en échec: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["running"] = len(self._running)
+        stats.update(self.store.stats())
+        return stats
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_alert_scheduler(agent_factory: Callable[[], Any], busy: Callable[[], bool] = None) -> AlertScheduler:
+    """
+    Planificateur partagé, configuré par l'environnement
+
+    SAVED_SEARCHES_DB, ALERTS_REFRESH_PER_HOUR (budget de rafraîchissements),
+    ALERTS_SUMMARIES_PER_HOUR (budget de résumés LLM), ALERTS_JITTER, ALERTS_TICK,
+    ALERTS_WORKERS, ALERTS_MAX_OFFERS
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            refreshes = float(os.getenv('ALERTS_REFRESH_PER_HOUR', '60'))
+            summaries = float(os.getenv('ALERTS_SUMMARIES_PER_HOUR', '30'))
+            _default_scheduler = AlertScheduler(
+                SavedSearchStore(os.getenv('SAVED_SEARCHES_DB', 'saved_searches.db')),
+                agent_factory,
+                refresh_budget=get_rate_limiter("alerts_refresh", refreshes / 3600, max(1, int(refreshes // 12))),
+                summary_budget=get_rate_limiter("alerts_summary", summaries / 3600, max(1, int(summaries // 12))),
+                busy=busy,
+                jitter=float(os.getenv('ALERTS_JITTER', '0.2')),
+                tick=float(os.getenv('ALERTS_TICK', '30')),
+                max_workers=int(os.getenv('ALERTS_WORKERS', '2')),
+                max_offers=int(os.getenv('ALERTS_MAX_OFFERS', '50')),
+            )
+        return _default_scheduler
+
+
+def peek_alert_scheduler() -> Optional[AlertScheduler]:
+    """Planificateur partagé s'il existe déjà (sans créer la base ni le planificateur)"""
+    return _default_scheduler
@@ -0,0 +1,80 @@
+"""
+Fusion des appels identiques simultanés (single-flight)
+
+Quand plusieurs utilisateurs lancent la même recherche ou la même génération au
+même moment, seul le premier appel (le meneur) s'exécute ; les suivants attendent
+son résultat au lieu de relancer recherches web et appels LLM. Rien n'est gardé
+une fois l'appel terminé : la mise en cache reste le rôle des caches existants.
+"""
+
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+
+
+def flight_key(*parts: Any) -> str:
+    """Empreinte des arguments d'un appel, insensible aux espaces en trop"""
+    normalized = "\0".join(" ".join(("" if part is None else str(part)).split()) for part in parts)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Appels en cours par (type, clé), partagés entre les threads Flask et la file de tâches"""
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def do(self, kind: str, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Exécute `fn(*args, **kwargs)`, ou attend le résultat d'un appel identique déjà en cours
+
+        Une exception du meneur est propagée à tous les appelants en attente.
+        """
+        flight = f"{kind}:{key}"
+        with self._lock:
+            stats = self._stats.setdefault(kind, {"calls": 0, "coalesced": 0, "failed": 0})
+            stats["calls"] += 1
+            future = self._calls.get(flight)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[flight] = future
+            else:
+                stats["coalesced"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._calls.pop(flight, None)
+                stats["failed"] += 1
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._calls.pop(flight, None)
+        future.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Appels reçus et appels économisés (fusionnés avec un appel en cours), par type"""
+        with self._lock:
+            kinds = {kind: dict(values) for kind, values in self._stats.items()}
+            in_flight = len(self._calls)
+        return {
+            "in_flight": in_flight,
+            "saved_calls": sum(values["coalesced"] for values in kinds.values()),
+            "by_kind": kinds,
+        }
+
+
+_default_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    return _default_single_flight
@@ -0,0 +1,393 @@
+"""
+Extraction locale des mots-clés d'une offre d'emploi
+
+Une taxonomie de compétences (FR/EN, synonymes inclus) est compilée en une seule
+expression régulière en forme de trie (préfixes partagés, plus longue
+correspondance d'abord) appliquée au texte normalisé (minuscules, sans accents).
+Le résultat reprend la structure JSON demandée au LLM par
+`CVGeneratorAgent.analyze_job_keywords`, qui ne sert plus que de repli pour les
+offres mal couvertes par la taxonomie.
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Forme canonique -> synonymes (comparés sans accents ni casse)
+TECHNICAL_SKILLS = {
+    "Python": ["python", "python3"],
+    "Java": ["java", "j2ee", "jee"],
+    "JavaScript": ["javascript", "js", "ecmascript", "es6"],
+    "TypeScript": ["typescript"],
+    "C++": ["c++", "cpp"],
+    "C#": ["c#", "csharp"],
+    ".NET": [".net", "dotnet", "asp.net", ".net core"],
+    "Go": ["golang"],
+    "Rust": ["rust"],
+    "PHP": ["php"],
+    "Ruby": ["ruby", "ruby on rails", "rails"],
+    "Kotlin": ["kotlin"],
+    "Swift": ["swift"],
+    "Scala": ["scala"],
+    "R": ["langage r", "r studio", "rstudio"],
+    "MATLAB": ["matlab"],
+    "Bash": ["bash", "shell", "scripting shell"],
+    "SQL": ["sql", "t-sql", "pl/sql", "plsql"],
+    "PostgreSQL": ["postgresql", "postgres"],
+    "MySQL": ["mysql", "mariadb"],
+    "Oracle": ["oracle", "oracle db"],
+    "SQL Server": ["sql server", "mssql"],
+    "MongoDB": ["mongodb", "mongo"],
+    "Redis": ["redis"],
+    "Elasticsearch": ["elasticsearch", "elastic search", "elk", "opensearch"],
+    "Cassandra": ["cassandra"],
+    "Django": ["django", "django rest framework", "drf"],
+    "Flask": ["flask"],
+    "FastAPI": ["fastapi", "fast api"],
+    "Spring": ["spring", "spring boot", "springboot"],
+    "Node.js": ["node.js", "nodejs", "node"],
+    "Express": ["express.js", "expressjs"],
+    "React": ["react", "react.js", "reactjs"],
+    "React Native": ["react native"],
+    "Angular": ["angular", "angularjs"],
+    "Vue.js": ["vue", "vue.js", "vuejs", "nuxt"],
+    "Next.js": ["next.js", "nextjs"],
+    "HTML/CSS": ["html", "html5", "css", "css3", "sass", "scss"],
+    "Tailwind": ["tailwind", "tailwindcss"],
+    "Symfony": ["symfony"],
+    "Laravel": ["laravel"],
+    "Flutter": ["flutter", "dart"],
+    "Android": ["android"],
+    "iOS": ["ios"],
+    "REST": ["api rest", "rest api", "restful", "api restful"],
+    "GraphQL": ["graphql"],
+    "gRPC": ["grpc"],
+    "Microservices": ["microservices", "micro-services", "microservice", "architecture microservices"],
+    "Git": ["git", "github", "gitlab", "bitbucket"],
+    "CI/CD": ["ci/cd", "ci cd", "integration continue", "deploiement continu", "continuous integration",
+              "continuous delivery", "continuous deployment"],
+    "Jenkins": ["jenkins"],
+    "GitHub Actions": ["github actions"],
+    "GitLab CI": ["gitlab ci", "gitlab-ci"],
+    "Docker": ["docker", "conteneurisation", "containerization", "containers", "conteneurs"],
+    "Kubernetes": ["kubernetes", "k8s", "openshift", "helm"],
+    "Terraform": ["terraform"],
+    "Ansible": ["ansible"],
+    "AWS": ["aws", "amazon web services", "ec2", "s3", "lambda"],
+    "Azure": ["azure", "microsoft azure"],
+    "GCP": ["gcp", "google cloud", "google cloud platform", "bigquery"],
+    "Linux": ["linux", "unix", "debian", "ubuntu", "red hat", "redhat"],
+    "DevOps": ["devops"],
+    "Cloud": ["cloud", "cloud computing"],
+    "Machine Learning": ["machine learning", "apprentissage automatique", "ml"],
+    "Deep Learning": ["deep learning", "apprentissage profond", "reseaux de neurones", "neural networks"],
+    "Intelligence Artificielle": ["intelligence artificielle", "artificial intelligence", "ia"],
+    "LLM": ["llm", "llms", "large language models", "ia generative", "generative ai", "genai"],
+    "NLP": ["nlp", "traitement du langage naturel", "natural language processing"],
+    "Computer Vision": ["computer vision", "vision par ordinateur"],
+    "TensorFlow": ["tensorflow", "keras"],
+    "PyTorch": ["pytorch"],
+    "scikit-learn": ["scikit-learn", "sklearn", "scikit learn"],
+    "Pandas": ["pandas"],
+    "NumPy": ["numpy"],
+    "Spark": ["spark", "pyspark", "apache spark"],
+    "Hadoop": ["hadoop", "hdfs", "hive"],
+    "Kafka": ["kafka", "apache kafka"],
+    "Airflow": ["airflow", "apache airflow"],
+    "dbt": ["dbt"],
+    "Snowflake": ["snowflake"],
+    "Databricks": ["databricks"],
+    "ETL": ["etl", "elt", "pipelines de donnees", "data pipelines"],
+    "Data Science": ["data science", "science des donnees"],
+    "Big Data": ["big data"],
+    "Power BI": ["power bi", "powerbi"],
+    "Tableau": ["tableau software"],
+    "Excel": ["excel", "vba"],
+    "Statistiques": ["statistiques", "statistics", "statistical analysis", "analyse statistique"],
+    "Tests automatisés": ["tests unitaires", "unit testing", "unit tests", "tdd", "pytest", "junit", "jest",
+                          "selenium", "cypress", "tests automatises", "test automation"],
+    "Agile": ["agile", "agilite", "methodes agiles", "methodologie agile"],
+    "Scrum": ["scrum", "scrum master", "sprint", "sprints"],
+    "Kanban": ["kanban"],
+    "Jira": ["jira", "confluence"],
+    "UML": ["uml"],
+    "Sécurité": ["cybersecurite", "cybersecurity", "securite informatique", "owasp", "pentest", "siem"],
+    "Réseaux": ["reseaux informatiques", "administration reseau", "networking", "tcp/ip", "cisco"],
+    "SAP": ["sap"],
+    "Salesforce": ["salesforce"],
+    "Figma": ["figma"],
+    "UX/UI": ["ux", "ui", "ux/ui", "ui/ux", "ux design", "ui design"],
+    "SEO": ["seo", "referencement naturel"],
+    "Marketing digital": ["marketing digital", "digital marketing", "webmarketing", "google ads"],
+    "Comptabilité": ["comptabilite", "accounting", "ifrs", "consolidation"],
+    "Contrôle de gestion": ["controle de gestion", "management control", "reporting financier"],
+    "CRM": ["crm", "hubspot"],
+    "ERP": ["erp"],
+}
+
+SOFT_SKILLS = {
+    "Travail en équipe": ["travail en equipe", "esprit d'equipe", "teamwork", "team player", "collaboration",
+                          "collaboratif", "collaborative"],
+    "Communication": ["communication", "communicant", "communication skills", "relationnel",
+                      "aisance relationnelle", "interpersonal skills"],
+    "Autonomie": ["autonomie", "autonome", "autonomous", "self-starter", "independent"],
+    "Rigueur": ["rigueur", "rigoureux", "rigoureuse", "attention to detail", "detail-oriented", "minutieux"],
+    "Esprit d'analyse": ["esprit d'analyse", "esprit analytique", "analytical skills", "analytique", "analytical"],
+    "Résolution de problèmes": ["resolution de problemes", "problem solving", "problem-solving",
+                                "sens de la resolution"],
+    "Leadership": ["leadership", "management d'equipe", "team management", "encadrement"],
+    "Adaptabilité": ["adaptabilite", "adaptability", "flexibilite", "flexibility", "capacite d'adaptation"],
+    "Curiosité": ["curiosite", "curieux", "curieuse", "curiosity", "curious"],
+    "Organisation": ["sens de l'organisation", "organise", "organisee", "organized", "organizational skills",
+                     "gestion du temps", "time management"],
+    "Proactivité": ["proactivite", "proactif", "proactive", "force de proposition", "prise d'initiative",
+                    "initiative"],
+    "Créativité": ["creativite", "creatif", "creative", "creativity"],
+    "Sens du client": ["sens du client", "orientation client", "customer focus", "customer-oriented",
+                       "sens du service"],
+    "Gestion du stress": ["gestion du stress", "resistance au stress", "stress management", "sang-froid"],
+    "Esprit critique": ["esprit critique", "critical thinking"],
+    "Pédagogie": ["pedagogie", "pedagogue", "mentoring", "mentorat"],
+    "Anglais": ["anglais", "english", "anglais courant", "fluent english", "bilingue"],
+    "Gestion de projet": ["gestion de projet", "project management", "chef de projet", "pilotage de projet"],
+}
+
+EDUCATION = {
+    "Bac+2": ["bac+2", "bac +2", "bts", "dut"],
+    "Bac+3": ["bac+3", "bac +3", "licence", "bachelor"],
+    "Bac+5": ["bac+5", "bac +5", "master", "msc", "master's degree"],
+    "Diplôme d'ingénieur": ["ecole d'ingenieur", "diplome d'ingenieur", "ingenieur diplome", "engineering degree"],
+    "École de commerce": ["ecole de commerce", "business school"],
+    "Doctorat": ["doctorat", "phd", "ph.d"],
+    "MBA": ["mba"],
+    "Certification AWS": ["aws certified", "certification aws"],
+    "Certification Azure": ["azure certified", "certification azure", "az-900", "az-104"],
+    "Certification Scrum": ["psm", "csm", "scrum master certifie", "certified scrum master", "psm i"],
+    "PMP": ["pmp", "prince2"],
+    "ITIL": ["itil"],
+    "TOEIC/TOEFL": ["toeic", "toefl", "ielts"],
+    "CKA": ["cka", "certified kubernetes"],
+}
+
+CATEGORIES = {"technique": TECHNICAL_SKILLS, "soft_skill": SOFT_SKILLS, "formation": EDUCATION}
+
+# Verbes d'action qui ouvrent une ligne de responsabilité (FR/EN, sans accents)
+ACTION_VERBS = frozenset("""
+concevoir developper deployer maintenir participer assurer piloter gerer animer analyser rediger mettre
+optimiser accompagner encadrer contribuer realiser construire definir garantir superviser automatiser
+collaborer identifier proposer suivre integrer tester administrer coordonner former veiller implementer
+design develop build deploy maintain manage lead own drive analyze analyse write implement optimize
+collaborate support ensure create deliver mentor contribute define automate monitor improve test review
+""".split())
+
+# Radicaux des verbes français (participerez, developpement...) ; les verbes anglais restent entiers
+_ACTION_STEMS = {verb[:-2] for verb in ACTION_VERBS if verb.endswith(("er", "ir", "re"))}
+_VERB_ENDINGS = ("er", "ir", "re", "ez", "ons", "ent", "e", "es", "era", "erez", "erons", "eront", "irez",
+                 "issez", "ant", "ront", "rez")
+
+_NON_WORD = r"[a-z0-9+#]"
+_COMBINING_RE = re.compile(r"[\u0300-\u036f]+")
+_NON_ASCII_RE = re.compile(r"[^\x00-\x7f]")
+_BULLET_RE = re.compile(r"^\s*(?:[-*•·▪●◦–]|\d+[.)])\s*")
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+")
+_WORD_RE = re.compile(r"[a-z0-9+#']+")
+_YEARS_RE = re.compile(
+    r"(\d{1,2})\s*(?:(?:a|-|/|to)\s*(\d{1,2})\s*)?\+?\s*(?:ans?|annees?|years?|yrs?)\b"
+    r"(?:\s+(?:minimum|min\.?|au moins))?\s*(?:d'|de |of )?(?:experience|exp\b)"
+)
+SENIORITY_LEVELS = (
+    ("Senior", ("senior", "confirme", "confirmee", "expert", "experimente", "experimentee", "lead")),
+    ("Intermédiaire", ("intermediaire", "mid-level", "mid level")),
+    ("Junior", ("junior", "debutant", "debutante", "jeune diplome", "jeune diplomee", "entry level",
+                "entry-level", "graduate")),
+)
+_SENIORITY_RE = re.compile(
+    r"(?<![a-z0-9])(" + "|".join(re.escape(alias) for _, aliases in SENIORITY_LEVELS for alias in aliases)
+    + r")(?![a-z0-9])"
+)
+_SENIORITY_LOOKUP = {alias: label for label, aliases in SENIORITY_LEVELS for alias in aliases}
+
+
+def normalize(text: str) -> str:
+    """
+    Forme de comparaison : minuscules, sans accents, ASCII seulement
+
+    Les caractères sans équivalent ASCII deviennent des espaces et séparent donc les mots.
+    """
+    text = text.lower()
+    if text.isascii():
+        return text
+    text = text.replace("’", "'").replace("œ", "oe").replace("æ", "ae")
+    text = _COMBINING_RE.sub("", unicodedata.normalize("NFKD", text))
+    return _NON_ASCII_RE.sub(" ", text)
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """Alternance en forme de trie : préfixes factorisés, suffixes les plus longs essayés d'abord"""
+    trie: Dict[str, Any] = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node) -> str:
+        final = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if final:
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class SkillExtractor:
+    """
+    Moteur de mots-clés compilé à partir d'une taxonomie extensible
+
+    Args:
+        taxonomy: {catégorie: {forme canonique: [synonymes]}} (CATEGORIES par défaut) ;
+            la forme canonique n'est recherchée telle quelle que si la liste est vide
+        min_keywords: En dessous de ce nombre de compétences techniques trouvées,
+            la couverture est jugée insuffisante (repli LLM conseillé)
+    """
+
+    def __init__(self, taxonomy: Dict[str, Dict[str, List[str]]] = None, min_keywords: int = 3):
+        self.min_keywords = min_keywords
+        self.taxonomy = {category: {name: list(aliases) for name, aliases in entries.items()}
+                         for category, entries in (taxonomy or CATEGORIES).items()}
+        self._lock = threading.Lock()
+        self._compile()
+
+    def _compile(self):
+        lookup: Dict[str, Tuple[str, str]] = {}
+        for category, entries in self.taxonomy.items():
+            for name, aliases in entries.items():
+                # La forme canonique ne sert d'alias que sans synonymes ("Tableau", "Go" sont ambigus)
+                for alias in aliases or [name]:
+                    lookup.setdefault(normalize(alias).strip(), (category, name))
+        self._lookup = lookup
+        self._pattern = re.compile(f"(?<!{_NON_WORD})(?:{_trie_pattern(lookup)})(?!{_NON_WORD})")
+
+    def add_terms(self, category: str, entries: Dict[str, List[str]]):
+        """Ajoute des compétences (forme canonique -> synonymes) et recompile"""
+        with self._lock:
+            target = self.taxonomy.setdefault(category, {})
+            for name, aliases in entries.items():
+                target.setdefault(name, []).extend(aliases)
+            self._compile()
+
+    def match_terms(self, text: str, normalized: str = None) -> Dict[str, Counter]:
+        """Occurrences des formes canoniques par catégorie, dans l'ordre de première apparition"""
+        found: Dict[str, Counter] = {category: Counter() for category in self.taxonomy}
+        lookup = self._lookup
+        for match in self._pattern.finditer(normalized if normalized is not None else normalize(text)):
+            category, name = lookup[match.group()]
+            found[category][name] += 1
+        return found
+
+    def extract(self, job_description: str) -> Dict[str, Any]:
+        """
+        Analyse une offre avec la même structure que la réponse LLM
+
+        Returns:
+            {"mots_cles_techniques": [...], "soft_skills": [...],
+             "formation_certifications": [...], "niveau_experience": "...",
+             "responsabilites_cles": [...], "couverture": {...}}
+        """
+        text = job_description or ""
+        normalized = normalize(text)
+        found = self.match_terms(text, normalized)
+        technical = [name for name, _ in found.get("technique", Counter()).most_common(10)]
+        result = {
+            "mots_cles_techniques": technical,
+            "soft_skills": [name for name, _ in found.get("soft_skill", Counter()).most_common(5)],
+            "formation_certifications": list(found.get("formation", Counter())),
+            "niveau_experience": experience_level(text, normalized),
+            "responsabilites_cles": responsibilities(text),
+        }
+        result["couverture"] = {
+            "source": "local",
+            "competences_trouvees": sum(len(counter) for counter in found.values()),
+            "suffisante": len(technical) >= self.min_keywords,
+        }
+        return result
+
+    def extract_batch(self, descriptions: Iterable[str]) -> List[Dict[str, Any]]:
+        """Analyse un lot d'offres (même automate, aucun appel réseau)"""
+        return [self.extract(description) for description in descriptions]
+
+    def skill_counts(self, descriptions: Iterable[str], category: str = "technique") -> Counter:
+        """Nombre d'offres citant chaque compétence (équivalent de `skills_demand`)"""
+        counts: Counter = Counter()
+        for description in descriptions:
+            counts.update(self.match_terms(description).get(category, Counter()).keys())
+        return counts
+
+
+def experience_level(text: str, normalized: str = None) -> str:
+    """Années d'expérience demandées, sinon niveau de séniorité, sinon "Non spécifié" """
+    if normalized is None:
+        normalized = normalize(text)
+    years = _YEARS_RE.search(normalized)
+    if years:
+        low, high = years.group(1), years.group(2)
+        return f"{low}-{high} ans" if high else f"{low} ans minimum"
+    seniority = _SENIORITY_RE.search(normalized)
+    if seniority:
+        return _SENIORITY_LOOKUP[seniority.group(1)]
+    return "Non spécifié"
+
+
+def _is_action_verb(word: str) -> bool:
+    if word in ACTION_VERBS or word.rstrip("s") in ACTION_VERBS:
+        return True
+    return any(word[:-len(ending)] in _ACTION_STEMS for ending in _VERB_ENDINGS if word.endswith(ending))
+
+
+def responsibilities(text: str, limit: int = 5, max_chars: int = 160) -> List[str]:
+    """Lignes à puces ou phrases qui commencent par un verbe d'action"""
+    candidates = []
+    for line in text.split("\n"):
+        has_bullet = bool(_BULLET_RE.match(line))
+        line = _BULLET_RE.sub("", line).strip()
+        if not line:
+            continue
+        for sentence in (_SENTENCE_RE.split(line) if not has_bullet else [line]):
+            words = _WORD_RE.findall(normalize(sentence[:40]))
+            if words and words[0] in ("vous", "you", "we", "nous"):
+                words = words[1:]
+            if words and _is_action_verb(words[0]):
+                candidates.append(sentence.strip()[:max_chars])
+                if len(candidates) >= limit:
+                    return candidates
+    return candidates
+
+
+_default_extractor = None
+_default_extractor_lock = threading.Lock()
+
+
+def get_skill_extractor() -> SkillExtractor:
+    """
+    Extracteur partagé ; SKILLS_TAXONOMY_FILE peut pointer vers un JSON
+    {catégorie: {forme canonique: [synonymes]}} qui complète la taxonomie intégrée
+    """
+    global _default_extractor
+    with _default_extractor_lock:
+        if _default_extractor is None:
+            extractor = SkillExtractor(min_keywords=int(os.getenv('KEYWORD_MIN_MATCHES', '3')))
+            path = os.getenv('SKILLS_TAXONOMY_FILE')
+            if path:
+                with open(path, encoding="utf-8") as handle:
+                    for category, entries in json.load(handle).items():
+                        extractor.add_terms(category, entries)
+            _default_extractor = extractor
+        return _default_extractor
@@ -0,0 +1,166 @@
+"""
+File de tâches en arrière-plan pour les appels aux agents
+
+Les endpoints enregistrent une tâche et renvoient immédiatement son identifiant ;
+un pool borné de workers exécute les appels LLM (plafonnés par fournisseur dans
+le routeur LLM), avec la fusion des tâches identiques déjà en cours.
+"""
+
+import hashlib
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, Optional
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+
+class Task:
+    """Une exécution d'agent suivie par la file"""
+
+    def __init__(self, kind: str, key: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        # Fournisseurs qui ont réellement répondu (renseigné en fin de tâche)
+        self.providers: List[str] = []
+        self.status = PENDING
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.callback_urls: List[str] = []
+        self.done_event = threading.Event()
+
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "providers": self.providers,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        if include_result and self.status == DONE:
+            data["result"] = self.result
+        return data
+
+
+def make_task_key(kind: str, *args, **kwargs) -> str:
+    """Clé de coalescence : deux tâches de même clé produisent le même résultat"""
+    payload = json.dumps({"kind": kind, "args": args, "kwargs": kwargs}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TaskQueue:
+    """
+    Pool de workers en processus avec suivi des tâches
+
+    Args:
+        max_workers: Nombre de threads exécutant les tâches
+        retention: Durée de conservation des tâches terminées (secondes)
+        provider_tracker: Context manager ouvert autour de chaque tâche, dont la valeur
+            (fournisseurs utilisés, cf. llm_backend.record_providers) renseigne `Task.providers`
+    """
+
+    def __init__(self, max_workers: int = 8, retention: float = 3600,
+                 provider_tracker: Callable[[], ContextManager[Iterable[str]]] = None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task")
+        self.provider_tracker = provider_tracker
+        self.retention = retention
+        self._tasks: Dict[str, Task] = {}
+        self._in_flight: Dict[str, Task] = {}
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "coalesced": 0, "completed": 0, "failed": 0}
+
+    def submit(self, kind: str, fn: Callable, *args, callback_url: str = None, **kwargs) -> Task:
+        """
+        Enregistre une tâche, ou rattache l'appelant à une tâche identique en cours
+
+        `callback_url` reçoit un POST JSON de la tâche une fois terminée.
+        """
+        key = make_task_key(kind, *args, **kwargs)
+        with self._lock:
+            self._purge_finished()
+            task = self._in_flight.get(key)
+            if task is not None:
+                self._stats["coalesced"] += 1
+            else:
+                task = Task(kind, key)
+                self._tasks[task.id] = task
+                self._in_flight[key] = task
+                self._stats["submitted"] += 1
+                self._executor.submit(self._run, task, fn, args, kwargs)
+            if callback_url:
+                task.callback_urls.append(callback_url)
+        return task
+
+    def _run(self, task: Task, fn: Callable, args, kwargs):
+        tracker = self.provider_tracker() if self.provider_tracker is not None else nullcontext(())
+        try:
+            with tracker as providers:
+                task.status = RUNNING
+                task.started_at = time.time()
+                try:
+                    task.result = fn(*args, **kwargs)
+                    task.status = DONE
+                finally:
+                    task.providers = sorted(providers)
+        except Exception as e:
+            task.error = str(e)
+            task.status = ERROR
+        finally:
+            task.finished_at = time.time()
+            with self._lock:
+                self._in_flight.pop(task.key, None)
+                self._stats["completed" if task.status == DONE else "failed"] += 1
+                callback_urls = list(task.callback_urls)
+            task.done_event.set()
+
+        for url in callback_urls:
+            self._notify(url, task)
+
+    @staticmethod
+    def _notify(url: str, task: Task):
+        """Webhook de fin de tâche, au mieux (les erreurs sont ignorées)"""
+        import requests  # importé seulement si un webhook est utilisé
+        
+        try:
+            requests.post(url, json=task.to_dict(include_result=True), timeout=10)
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Webhook {url} en échec: {str(e)}")
+
+    def _purge_finished(self):
+        cutoff = time.time() - self.retention
+        expired = [task_id for task_id, task in self._tasks.items()
+                   if task.finished_at is not None and task.finished_at < cutoff]
+        for task_id in expired:
+            del self._tasks[task_id]
+
+    def get(self, task_id: str) -> Optional[Task]:
+        with self._lock:
+            return self._tasks.get(task_id)
+
+    def wait(self, task_id: str, timeout: float = None) -> Optional[Task]:
+        """Attend la fin d'une tâche (utile pour les tests et les appels synchrones)"""
+        task = self.get(task_id)
+        if task is not None:
+            task.done_event.wait(timeout)
+        return task
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._in_flight)
+            stats["tracked"] = len(self._tasks)
+        return stats
@@ -0,0 +1,71 @@
+"""
+Outils texte partagés : normalisation, estimation de tokens, détection des sections d'un CV
+"""
+
+import re
+import unicodedata
+from typing import Dict
+
+# Titres de sections courants des CV (FR/EN), comparés sans accents ni casse
+SECTION_HEADINGS = {
+    "profil": ["profil", "profile", "resume", "summary", "a propos", "about me", "objectif"],
+    "experience": ["experience", "experiences", "experience professionnelle", "experiences professionnelles",
+                   "parcours professionnel", "work experience", "professional experience", "employment"],
+    "formation": ["formation", "formations", "education", "etudes", "diplomes", "academic background"],
+    "competences": ["competences", "competences techniques", "skills", "technical skills", "savoir-faire"],
+    "projets": ["projets", "projects", "realisations"],
+    "certifications": ["certifications", "certificats", "certificates"],
+    "langues": ["langues", "languages"],
+    "interets": ["centres d'interet", "loisirs", "interests", "hobbies"],
+    "contact": ["contact", "coordonnees"],
+}
+
+_HEADING_LOOKUP = {alias: name for name, aliases in SECTION_HEADINGS.items() for alias in aliases}
+_WHITESPACE_RE = re.compile(r"[ \t\u00a0]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def strip_accents(text: str) -> str:
+    if text.isascii():
+        return text
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def normalize_text(text: str) -> str:
+    """Espaces et lignes vides compactés, sans toucher au contenu"""
+    lines = (_WHITESPACE_RE.sub(" ", line).strip() for line in text.replace("\r\n", "\n").split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation rapide du nombre de tokens (mots et ponctuation, ~1,3 token par mot long)"""
+    count = 0
+    for match in _TOKEN_RE.finditer(text):
+        count += 1 + len(match.group()) // 8
+    return count
+
+
+def _heading_name(line: str):
+    candidate = strip_accents(line.strip().strip(":").strip()).lower()
+    if not candidate or len(candidate) > 40:
+        return None
+    return _HEADING_LOOKUP.get(candidate)
+
+
+def detect_sections(text: str) -> Dict[str, str]:
+    """
+    Découpe un CV en sections à partir des titres reconnus
+
+    Le texte avant le premier titre est rangé sous "en-tete".
+    """
+    sections: Dict[str, list] = {}
+    current = "en-tete"
+    for line in text.split("\n"):
+        name = _heading_name(line)
+        if name is not None:
+            current = name
+            sections.setdefault(current, [])
+            continue
+        sections.setdefault(current, []).append(line)
+    return {name: "\n".join(lines).strip() for name, lines in sections.items() if "\n".join(lines).strip()}
@@ -1,13 +1,23 @@
-from flask import Flask, request, jsonify, render_template, send_file
+from flask import Flask, Response, g, request, jsonify, render_template, send_file, stream_with_context
 from flask_cors import CORS
 import os
+import io
 import json
-import tempfile
-from agents.job_search_agent import JobSearchAgent
-from agents.cv_generator_agent import CVGeneratorAgent
-from agents.cover_letter_agent import CoverLetterAgent
-import PyPDF2
-import docx
+import time
+from agents.registry import AgentRegistry, lazy_factory
+from agents.llm_backend import get_llm_router, record_providers
+from agents.llm_cache import get_default_llm_cache
+from agents.single_flight import get_single_flight
+from agents.task_queue import TaskQueue
+from agents.document_ingestion import extract_document_text, extraction_cache_stats
+from agents.company_research import company_name_from_text, get_company_researcher
+from agents.cv_store import CVNotFoundError, get_cv_store, summarize_record
+from agents.latex_compiler import LatexCompileError, get_latex_compiler
+from agents.job_index import get_job_index
+from agents.market_analytics import get_market_analytics
+from agents.saved_searches import SavedSearchNotFoundError, get_alert_scheduler, peek_alert_scheduler
+from agents.metrics import HTTP_BYTES, HTTP_ERRORS, HTTP_SECONDS, registry as metrics_registry
+from agents.prompt_builder import begin_prompt_reports, prompt_reports
 
 app = Flask(__name__)
 CORS(app)
@@ -15,10 +25,88 @@ CORS(app)
 # Configuration - Changement pour Groq Cloud API
 GROQ_API_KEY = os.getenv('GROQ_API_KEY', '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')
 
-# Initialize agents avec Groq API
-job_search_agent = JobSearchAgent(GROQ_API_KEY)
-cv_generator_agent = CVGeneratorAgent(GROQ_API_KEY)
-cover_letter_agent = CoverLetterAgent(GROQ_API_KEY)
+# Agents construits à la première requête qui en a besoin (imports lourds compris)
+agent_registry = AgentRegistry()
+agent_registry.register('job_search', lazy_factory('agents.job_search_agent', 'JobSearchAgent', GROQ_API_KEY))
+agent_registry.register('cv_generator', lazy_factory('agents.cv_generator_agent', 'CVGeneratorAgent', GROQ_API_KEY))
+agent_registry.register('cover_letter', lazy_factory('agents.cover_letter_agent', 'CoverLetterAgent', GROQ_API_KEY))
+
+def job_search_agent():
+    return agent_registry.get('job_search')
+
+def cv_generator_agent():
+    return agent_registry.get('cv_generator')
+
+def cover_letter_agent():
+    return agent_registry.get('cover_letter')
+
+# CV uploadés une fois puis référencés par cv_id
+cv_store = get_cv_store()
+
+# Compilation LaTeX -> PDF locale (pool borné, PDF en cache par empreinte du source)
+latex_compiler = get_latex_compiler()
+
+# File de tâches pour les appels asynchrones (?async=1) ; le plafond par fournisseur
+# est appliqué par le routeur LLM, qui seul sait quel fournisseur répond
+task_queue = TaskQueue(
+    max_workers=int(os.getenv('TASK_QUEUE_WORKERS', '8')),
+    provider_tracker=record_providers,
+)
+
+# Intervalle minimum entre deux rafraîchissements d'une recherche sauvegardée (secondes)
+ALERTS_MIN_INTERVAL = float(os.getenv('ALERTS_MIN_INTERVAL', '900'))
+
+# Alertes : les rafraîchissements attendent tant que les appels LLM interactifs sont nombreux
+ALERTS_MAX_LLM_IN_FLIGHT = int(os.getenv('ALERTS_MAX_LLM_IN_FLIGHT', '4'))
+
+def alert_scheduler():
+    return get_alert_scheduler(
+        job_search_agent,
+        busy=lambda: get_llm_router(groq_api_key=GROQ_API_KEY).in_flight() >= ALERTS_MAX_LLM_IN_FLIGHT
+    )
+
+# Sans planificateur, les recherches sauvegardées sont conservées mais jamais rafraîchies
+ALERTS_ENABLED = os.getenv('ALERTS_ENABLED', '0') == '1'
+
+if ALERTS_ENABLED:
+    alert_scheduler().start()
+
+# Recherche automatique sur l'entreprise (actualités, valeurs) pour les lettres de motivation
+COMPANY_RESEARCH = os.getenv('COMPANY_RESEARCH', '1') == '1'
+
+# Nombre maximum d'offres traitées par /api/generate-cv-batch
+CV_BATCH_MAX_JOBS = int(os.getenv('CV_BATCH_MAX_JOBS', '20'))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    begin_prompt_reports()
+
+@app.after_request
+def record_request_metrics(response):
+    """Durée, statut et tailles de chaque requête, par route (jamais par URL brute)"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method,
+                             status=response.status_code)
+        if response.status_code >= 500:
+            HTTP_ERRORS.inc(endpoint=endpoint, status=response.status_code)
+        if request.content_length:
+            HTTP_BYTES.observe(request.content_length, endpoint=endpoint, direction='request')
+        if not response.is_streamed and response.content_length is not None:
+            HTTP_BYTES.observe(response.content_length, endpoint=endpoint, direction='response')
+    # Tokens économisés par l'ajustement des prompts de cette requête (hors streaming et tâches de fond,
+    # construits après l'envoi des en-têtes : ceux-là ne sont visibles que dans /metrics)
+    reports = prompt_reports()
+    if reports:
+        response.headers['X-Prompt-Tokens-Saved'] = str(sum(report['tokens_saved'] for report in reports))
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Métriques au format texte Prometheus"""
+    return Response(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/')
 def index():
@@ -32,38 +120,145 @@ def search_jobs():
         location = data.get('location', '')
         experience_level = data.get('experience_level', '')
         skills = data.get('skills', '')
+        contract_type = data.get('contract_type', '')
+        # CV optionnel pour classer les offres par score de compatibilité
+        cv_text = cv_store.require(data['cv_id'])['normalized_text'] if data.get('cv_id') else data.get('cv_content', '')
+        
+        if wants_async(data):
+            task = task_queue.submit(
+                'search-jobs', job_search_agent().search_jobs,
+                job_title, location, experience_level, skills, contract_type, cv_text,
+                callback_url=callback_url(data)
+            )
+            return task_accepted(task)
         
-        result = job_search_agent.search_jobs(job_title, location, experience_level, skills)
+        result = job_search_agent().search_jobs(job_title, location, experience_level, skills, contract_type, cv_text)
         
         return jsonify({
             'success': True,
             'data': result
         })
+    except CVNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    # Les statistiques n'obligent pas à construire un agent encore inutilisé
+    search_agent = agent_registry.peek('job_search')
+    return jsonify({
+        'success': True,
+        'data': {
+            'search': search_agent.search_tools.cache_stats() if search_agent else None,
+            'llm': get_default_llm_cache().stats(),
+            'llm_routing': get_llm_router(groq_api_key=GROQ_API_KEY).stats(),
+            'tasks': task_queue.stats(),
+            'single_flight': get_single_flight().stats(),
+            'extraction': extraction_cache_stats(),
+            'cv_store': cv_store.stats(),
+            'latex': latex_compiler.stats(),
+            'alerts': peek_alert_scheduler().stats() if peek_alert_scheduler() else None,
+            'market': get_market_analytics().stats(),
+            'company_research': get_company_researcher().stats() if COMPANY_RESEARCH else None,
+            'agents': agent_registry.stats()
+        }
+    })
+
 @app.route('/api/generate-cv', methods=['POST'])
 def generate_cv():
     try:
-        # Handle file upload
-        if 'cv_file' in request.files:
-            cv_file = request.files['cv_file']
-            cv_content = extract_text_from_file(cv_file)
-        else:
-            cv_content = request.form.get('cv_content', '')
+        cv_content = resolve_cv_content()
         
         job_description = request.form.get('job_description', '')
         personal_info = request.form.get('personal_info', '')
+        # LaTeX déjà généré : seules les sections touchées par la nouvelle offre sont régénérées
+        base_latex = request.form.get('base_latex', '')
+        
+        if base_latex:
+            result = cv_generator_agent().regenerate_cv_sections(base_latex, job_description)
+            return jsonify({
+                'success': True,
+                'data': result.pop('latex'),
+                'incremental': result
+            })
         
-        result = cv_generator_agent.generate_cv(cv_content, job_description, personal_info)
+        if wants_stream():
+            return sse_response(cv_generator_agent().generate_cv_stream(cv_content, job_description, personal_info))
+        
+        if wants_async():
+            task = task_queue.submit(
+                'generate-cv', cv_generator_agent().generate_cv,
+                cv_content, job_description, personal_info,
+                callback_url=callback_url()
+            )
+            return task_accepted(task)
+        
+        result = cv_generator_agent().generate_cv(cv_content, job_description, personal_info)
         
         return jsonify({
             'success': True,
             'data': result
         })
+    except CVNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/generate-cv-batch', methods=['POST'])
+def generate_cv_batch():
+    try:
+        cv_content = resolve_cv_content()
+        
+        job_descriptions = batch_job_descriptions()
+        personal_info = request.form.get('personal_info', '')
+        
+        if not job_descriptions:
+            return jsonify({
+                'success': False,
+                'error': 'Aucune offre d\'emploi fournie'
+            }), 400
+        
+        if len(job_descriptions) > CV_BATCH_MAX_JOBS:
+            return jsonify({
+                'success': False,
+                'error': f'Maximum {CV_BATCH_MAX_JOBS} offres par lot'
+            }), 400
+        
+        if wants_stream():
+            return sse_results_response(cv_generator_agent().generate_cv_batch(
+                cv_content, job_descriptions, personal_info
+            ))
+        
+        if wants_async():
+            task = task_queue.submit(
+                'generate-cv-batch', collect_batch_results,
+                cv_content, job_descriptions, personal_info,
+                callback_url=callback_url()
+            )
+            return task_accepted(task)
+        
+        return jsonify({
+            'success': True,
+            'data': collect_batch_results(cv_content, job_descriptions, personal_info)
+        })
+    except CVNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
     except Exception as e:
         return jsonify({
             'success': False,
@@ -73,28 +268,222 @@ def generate_cv():
 @app.route('/api/generate-cover-letter', methods=['POST'])
 def generate_cover_letter():
     try:
-        # Handle file upload
-        if 'cv_file' in request.files:
-            cv_file = request.files['cv_file']
-            cv_content = extract_text_from_file(cv_file)
-        else:
-            cv_content = request.form.get('cv_content', '')
-        
         job_description = request.form.get('job_description', '')
         company_info = request.form.get('company_info', '')
+        company_name = request.form.get('company_name') or company_name_from_text(job_description, company_info)
+        # Recherche entreprise lancée avant la lecture du CV : les deux se recouvrent
+        company_research = get_company_researcher().start(company_name) if COMPANY_RESEARCH else None
+        
+        cv_content = resolve_cv_content()
         
-        result = cover_letter_agent.generate_cover_letter(cv_content, job_description, company_info)
+        if wants_stream():
+            return sse_response(cover_letter_agent().generate_cover_letter_stream(
+                cv_content, job_description, company_info, company_research
+            ))
+        
+        if wants_async():
+            task = task_queue.submit(
+                'generate-cover-letter', cover_letter_agent().generate_cover_letter,
+                cv_content, job_description, company_info,
+                # Le nom (et non la recherche en cours) garde une clé de tâche stable ;
+                # la tâche retrouve la recherche lancée plus haut dans le cache partagé
+                company_name=company_name if COMPANY_RESEARCH else '',
+                callback_url=callback_url()
+            )
+            return task_accepted(task)
+        
+        result = cover_letter_agent().generate_cover_letter(cv_content, job_description, company_info, company_research)
         
         return jsonify({
             'success': True,
             'data': result
         })
+    except CVNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/market-analysis', methods=['GET'])
+def market_analysis():
+    """Agrégats de marché d'une recherche (?job_title=&location=&days=30&top=10), tous deux facultatifs"""
+    try:
+        analytics = get_market_analytics()
+        # Sans recherche depuis le démarrage, les agrégats sont d'abord relus depuis l'index
+        # (en arrière-plan : `warming_up` signale des agrégats encore partiels)
+        analytics.attach(get_job_index())
+        analysis = analytics.query(
+            request.args.get('job_title', ''),
+            request.args.get('location', ''),
+            days=request.args.get('days', 30, type=int),
+            top_n=request.args.get('top', 10, type=int)
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': analysis
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/saved-searches', methods=['POST'])
+def create_saved_search():
+    try:
+        data = request.json or {}
+        if not data.get('job_title'):
+            return jsonify({
+                'success': False,
+                'error': 'Titre du poste requis'
+            }), 400
+        
+        interval = max(ALERTS_MIN_INTERVAL, float(data.get('interval', 3600)))
+        saved_search = alert_scheduler().store.create(data, interval, callback_url=callback_url(data))
+        
+        response = {
+            'success': True,
+            'data': saved_search,
+            'scheduler': 'enabled' if ALERTS_ENABLED else 'disabled'
+        }
+        if not ALERTS_ENABLED:
+            response['warning'] = "Planificateur d'alertes désactivé (ALERTS_ENABLED=0) : aucune alerte ne sera produite"
+        return jsonify(response), 201
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/saved-searches/<search_id>', methods=['GET', 'DELETE'])
+def saved_search(search_id):
+    try:
+        store = alert_scheduler().store
+        if request.method == 'DELETE':
+            store.delete(search_id)
+            return jsonify({
+                'success': True
+            })
+        
+        return jsonify({
+            'success': True,
+            'data': store.get(search_id)
+        })
+    except SavedSearchNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/saved-searches/<search_id>/alerts', methods=['GET'])
+def saved_search_alerts(search_id):
+    """Alertes les plus récentes ; ?since=<id> ne renvoie que celles postérieures à une alerte déjà lue"""
+    try:
+        alerts = alert_scheduler().store.alerts(search_id, since=int(request.args.get('since', 0)))
+        
+        return jsonify({
+            'success': True,
+            'data': alerts
+        })
+    except SavedSearchNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/api/cv', methods=['POST'])
+def upload_cv():
+    try:
+        if 'cv_file' not in request.files:
+            return jsonify({
+                'success': False,
+                'error': 'Aucun fichier CV fourni'
+            }), 400
+        
+        record = cv_store.put(request.files['cv_file'])
+        
+        return jsonify({
+            'success': True,
+            'data': summarize_record(record)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/cv/<cv_id>', methods=['GET'])
+def get_cv(cv_id):
+    record = cv_store.get(cv_id)
+    if record is None:
+        return jsonify({
+            'success': False,
+            'error': 'CV introuvable ou expiré'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'data': summarize_record(record)
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    task = task_queue.get(job_id)
+    if task is None:
+        return jsonify({
+            'success': False,
+            'error': 'Tâche introuvable'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'data': task.to_dict()
+    })
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    task = task_queue.get(job_id)
+    if task is None:
+        return jsonify({
+            'success': False,
+            'error': 'Tâche introuvable'
+        }), 404
+    
+    if task.status == 'error':
+        return jsonify({
+            'success': False,
+            'error': task.error
+        }), 500
+    
+    if task.status != 'done':
+        # Pas encore terminée : le client doit relancer plus tard
+        return jsonify({
+            'success': False,
+            'status': task.status,
+            'error': 'Tâche en cours'
+        }), 202
+    
+    return jsonify({
+        'success': True,
+        'data': task.result
+    })
+
 @app.route('/api/download-latex', methods=['POST'])
 def download_latex():
     try:
@@ -102,41 +491,148 @@ def download_latex():
         latex_content = data.get('latex_content', '')
         filename = data.get('filename', 'cv.tex')
         
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.tex', delete=False) as f:
-            f.write(latex_content)
-            temp_path = f.name
+        # Envoyé depuis la mémoire : aucun fichier temporaire laissé sur le disque
+        return send_file(
+            io.BytesIO(latex_content.encode('utf-8')),
+            mimetype='application/x-tex',
+            as_attachment=True,
+            download_name=filename
+        )
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/compile-latex', methods=['POST'])
+def compile_latex():
+    try:
+        data = request.json
+        latex_content = data.get('latex_content', '')
+        filename = data.get('filename', 'cv.pdf')
+        
+        pdf = latex_compiler.compile(latex_content)
         
-        return send_file(temp_path, as_attachment=True, download_name=filename)
+        return send_file(io.BytesIO(pdf), mimetype='application/pdf', as_attachment=True, download_name=filename)
+    except LatexCompileError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'log': e.log
+        }), 422
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
-def extract_text_from_file(file):
-    """Extract text from uploaded PDF or DOCX file"""
-    filename = file.filename.lower()
-    
-    if filename.endswith('.pdf'):
-        reader = PyPDF2.PdfReader(file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
-        return text
-    
-    elif filename.endswith('.docx'):
-        doc = docx.Document(file)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
+@app.route('/api/preview-latex', methods=['POST'])
+def preview_latex():
+    try:
+        data = request.json
+        latex_content = data.get('latex_content', '')
+        try:
+            resolution = max(36, min(int(data.get('resolution', 80)), 200))
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'Résolution invalide (nombre de points par pouce attendu)'
+            }), 400
+        
+        png = latex_compiler.preview_png(latex_content, resolution)
+        
+        return send_file(io.BytesIO(png), mimetype='image/png')
+    except LatexCompileError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'log': e.log
+        }), 422
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def resolve_cv_content():
+    """Texte du CV : cv_id déjà stocké, fichier uploadé (stocké au passage) ou texte saisi"""
+    cv_id = request.form.get('cv_id')
+    if cv_id:
+        return cv_store.require(cv_id)['normalized_text']
+    if 'cv_file' in request.files:
+        return cv_store.put(request.files['cv_file'])['normalized_text']
+    return request.form.get('cv_content', '')
+
+def batch_job_descriptions():
+    """Offres d'un lot : champs job_descriptions répétés, ou un seul champ contenant une liste JSON"""
+    values = request.form.getlist('job_descriptions')
+    if len(values) == 1 and values[0].lstrip().startswith('['):
+        values = json.loads(values[0])
+    return [value for value in values if value and value.strip()]
+
+def collect_batch_results(cv_content, job_descriptions, personal_info):
+    """Exécution complète d'un lot (mode asynchrone), résultats dans l'ordre des offres"""
+    results = cv_generator_agent().generate_cv_batch(cv_content, job_descriptions, personal_info)
+    return sorted(results, key=lambda item: item['index'])
+
+def wants_stream():
+    """Le client demande une réponse en streaming (?stream=1 ou champ de formulaire stream=1)"""
+    return request.args.get('stream') == '1' or request.form.get('stream') == '1'
+
+def wants_async(data=None):
+    """Le client demande une exécution en arrière-plan (?async=1, champ de formulaire ou clé JSON)"""
+    if request.args.get('async') == '1' or request.form.get('async') == '1':
+        return True
+    return bool(data) and str(data.get('async', '')).lower() in ('1', 'true')
+
+def callback_url(data=None):
+    """URL de webhook optionnelle appelée à la fin de la tâche"""
+    if data:
+        return data.get('callback_url')
+    return request.form.get('callback_url') or request.args.get('callback_url')
+
+def task_accepted(task):
+    return jsonify({
+        'success': True,
+        'job_id': task.id,
+        'status': task.status
+    }), 202
+
+def sse_response(chunks):
+    """Relaie les fragments d'un générateur sous forme de server-sent events"""
+    def events():
+        try:
+            for chunk in chunks:
+                yield f"data: {json.dumps({'delta': chunk}, ensure_ascii=False)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
     
-    elif filename.endswith('.txt'):
-        return file.read().decode('utf-8')
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def sse_results_response(results):
+    """Relaie des résultats complets (un événement `result` par élément, dans l'ordre de fin)"""
+    def events():
+        try:
+            for result in results:
+                yield f"event: result\ndata: {json.dumps(result, ensure_ascii=False)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
     
-    else:
-        raise ValueError("Format de fichier non supporté. Utilisez PDF, DOCX ou TXT.")
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def extract_text_from_file(file):
+    """Extract text from uploaded PDF, DOCX or TXT file (voir agents/document_ingestion.py)"""
+    return extract_document_text(file)
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
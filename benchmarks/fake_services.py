@@ -0,0 +1,250 @@
+"""
+Doublures locales des services externes pour les benchmarks hors ligne
+
+- `FakeLLMServer` : serveur HTTP qui répond comme l'API Groq (chat/completions
+  compatible OpenAI) et l'API REST Gemini (generateContent, streaming SSE compris) ;
+- `make_fake_ddgs()` : remplaçant de la classe DDGS (text/news) ;
+
+tous deux rejouent une recherche enregistrée (agents/recherche_emploi_*.json)
+avec latence, gigue et taux d'erreur configurables.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+_GEMINI_PATH_RE = re.compile(r"^/v1beta/models/(?P<model>[^:]+):(?P<method>generateContent|streamGenerateContent)")
+
+_CV_TEMPLATE = r"""\documentclass[11pt]{article}
+\usepackage[utf8]{inputenc}
+\begin{document}
+\section*{Profil}
+%(profile)s
+\section*{Expérience}
+\begin{itemize}
+\item Développement d'API Python (Django, Flask), +30%% de performance
+\end{itemize}
+\section*{Compétences}
+Python, SQL, Docker, Git
+\end{document}
+
+Score ATS estimé : 82/100
+"""
+
+_LETTER_TEMPLATE = """Madame, Monsieur,
+
+%(profile)s
+
+Je vous prie d'agréer mes salutations distinguées.
+"""
+
+
+class Behavior:
+    """Latence (secondes), gigue et taux d'erreur d'une doublure"""
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """(délai, échec ?) pour un appel"""
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter), self._random.random() < self.error_rate
+
+
+def load_fixture(path: str) -> Dict[str, Any]:
+    """Recherche enregistrée : offres (jobs_found) et rapport rédigé (formatted_report)"""
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def _fixture_text(fixture: Dict[str, Any], messages: List[Dict[str, str]]) -> str:
+    """Réponse rejouée selon le type de prompt (analyse de recherche, lettre ou CV)"""
+    prompt = " ".join(message.get("content", "") for message in messages)
+    lowered = prompt.lower()
+    if "résultats de recherche" in lowered:
+        return fixture.get("formatted_report") or json.dumps(fixture.get("market_analysis", {}), ensure_ascii=False)
+    profile = " ".join(prompt.split()[-60:])
+    if "lettre de motivation" in lowered:
+        return _LETTER_TEMPLATE % {"profile": profile}
+    return _CV_TEMPLATE % {"profile": profile}
+
+
+class FakeLLMServer:
+    """
+    Serveur Groq/Gemini factice sur 127.0.0.1 (port libre choisi par le système)
+
+    Routes :
+        POST /openai/v1/chat/completions
+        POST /v1beta/models/{modèle}:generateContent
+        POST /v1beta/models/{modèle}:streamGenerateContent?alt=sse
+    """
+
+    def __init__(self, fixture: Dict[str, Any], behavior: Behavior = None, chunk_words: int = 8):
+        self.fixture = fixture
+        self.behavior = behavior or Behavior()
+        self.chunk_words = chunk_words
+        self.stats = {"requests": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def groq_url(self) -> str:
+        return f"{self.base_url}/openai/v1/chat/completions"
+
+    @property
+    def gemini_url(self) -> str:
+        return f"{self.base_url}/v1beta/models"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _handler_class(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                service._count("requests")
+                delay, failed = service.behavior.draw()
+                time.sleep(delay)
+                if failed:
+                    service._count("errors")
+                    return self._send_json(503, {"error": {"message": "Erreur simulée"}})
+
+                path = self.path.split("?", 1)[0]
+                if path == "/openai/v1/chat/completions":
+                    text = _fixture_text(service.fixture, payload.get("messages", []))
+                    if payload.get("stream"):
+                        return self._send_sse({"choices": [{"delta": {"content": chunk}}]} for chunk in self._chunks(text))
+                    return self._send_json(200, {
+                        "model": payload.get("model"),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}}],
+                    })
+
+                match = _GEMINI_PATH_RE.match(path)
+                if match:
+                    messages = [{"content": part.get("text", "")}
+                                for content in payload.get("contents", []) for part in content.get("parts", [])]
+                    text = _fixture_text(service.fixture, messages)
+                    if match.group("method") == "streamGenerateContent":
+                        return self._send_sse(
+                            {"candidates": [{"content": {"role": "model", "parts": [{"text": chunk}]}}]}
+                            for chunk in self._chunks(text)
+                        )
+                    return self._send_json(200, {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]})
+
+                self._send_json(404, {"error": {"message": f"Route inconnue: {path}"}})
+
+            def _chunks(self, text: str):
+                words = text.split(" ")
+                for start in range(0, len(words), service.chunk_words):
+                    chunk = " ".join(words[start:start + service.chunk_words])
+                    yield chunk if start + service.chunk_words >= len(words) else chunk + " "
+
+            def _send_json(self, status: int, body: Dict[str, Any]):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_sse(self, events):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for event in events:
+                    self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        return Handler
+
+
+def synthetic_offers(fixture: Dict[str, Any], keywords: str, count: int) -> List[Dict[str, str]]:
+    """
+    Offres au format d'un job board, construites à partir des compétences de la
+    recherche enregistrée : exercent filtrage, classement et indexation, que les
+    résultats rejoués (souvent des pages hors offres) court-circuitent
+    """
+    skills = list((fixture.get("market_analysis") or {}).get("skills_demand", {})) or ["Python", "SQL"]
+    contracts = ["CDI", "CDD", "Stage", "Alternance", "Freelance"]
+    tag = abs(hash(keywords)) % 10 ** 8
+    offers = []
+    for i in range(count):
+        picked = ", ".join(skills[(i + k) % len(skills)] for k in range(3))
+        offers.append({
+            "title": f"{keywords.split(' jobs')[0][:60]} H/F - {contracts[i % len(contracts)]}",
+            "url": f"https://fr.indeed.com/viewjob?jk={tag:08d}{i:03d}",
+            "snippet": f"Nous recrutons un profil {picked}. Poste en {contracts[i % len(contracts)]}, "
+                       f"{2 + i % 5} ans d'expérience, salaire {38 + i % 20}k€. Postuler en ligne.",
+        })
+    return offers
+
+
+def make_fake_ddgs(fixture: Dict[str, Any], behavior: Behavior = None, mode: str = "replay"):
+    """
+    Classe au contrat de DDGS (context manager, text(), news())
+
+    `mode` "replay" renvoie les offres enregistrées telles quelles, "synthetic"
+    des offres de job board propres à chaque requête (voir synthetic_offers).
+    """
+    behavior = behavior or Behavior(latency=0.3)
+    recorded = [{"title": offer.get("title", ""), "url": offer.get("url", ""), "snippet": offer.get("snippet", "")}
+                for offer in fixture.get("jobs_found", [])]
+
+    class FakeDDGS:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def _results(self, keywords: str, max_results: int) -> List[Dict[str, str]]:
+            delay, failed = behavior.draw()
+            time.sleep(delay)
+            if failed:
+                raise RuntimeError("Erreur DuckDuckGo simulée")
+            if mode == "synthetic":
+                return synthetic_offers(fixture, keywords, max_results)
+            return recorded[:max_results]
+
+        def text(self, keywords: str, region: str = "wt-wt", max_results: int = 10, safesearch: str = "moderate"):
+            return [{"title": offer["title"], "href": offer["url"], "body": offer["snippet"]}
+                    for offer in self._results(keywords, max_results)]
+
+        def news(self, keywords: str, region: str = "wt-wt", max_results: int = 10, safesearch: str = "moderate"):
+            return [{"title": offer["title"], "url": offer["url"], "body": offer["snippet"], "date": "",
+                     "source": "FakeDDGS"} for offer in self._results(keywords, max_results)]
+
+    return FakeDDGS
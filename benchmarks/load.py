@@ -0,0 +1,346 @@
+"""
+Banc de charge hors ligne de app.py : Groq, Gemini et DuckDuckGo sont remplacés
+par des doublures locales (benchmarks/fake_services.py) rejouant une recherche
+enregistrée, avec latence et taux d'erreur configurables
+
+Les trois endpoints (recherche, CV, lettre) sont appelés via HTTP à concurrence
+fixée ; le rapport donne p50/p95/p99, débit, mémoire et temps par étape (métriques
+de agents/metrics.py), est enregistré dans benchmarks/results/ et comparé au
+précédent pour repérer les régressions. Exemples :
+
+    python benchmarks/load.py
+    python benchmarks/load.py --scenarios search --concurrency 16 --requests 200 --offers synthetic
+    python benchmarks/load.py --groq-latency 1.5 --llm-error-rate 0.05 --baseline benchmarks/results/load-ref.json
+"""
+
+import argparse
+import io
+import json
+import logging
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_services import Behavior, FakeLLMServer, load_fixture, make_fake_ddgs  # noqa: E402
+from benchmarks.memory import rss_mb  # noqa: E402
+
+DEFAULT_FIXTURE = os.path.join(ROOT, "agents", "recherche_emploi_20250804_024717.json")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SCENARIOS = ("search", "cv", "cover_letter")
+
+CV_TEXT = """Jean Dupont
+Développeur Python - Paris - jean.dupont@example.com
+
+EXPÉRIENCE
+Développeur backend, DataCorp (2020-2024)
+- Conception d'API REST avec Django et Flask, 2 millions de requêtes par jour
+- Migration PostgreSQL et mise en place de Docker et GitLab CI
+Développeur junior, WebAgency (2018-2020)
+- Sites e-commerce en Python et JavaScript
+
+FORMATION
+Master Informatique, Université Paris-Saclay (2018)
+
+COMPÉTENCES
+Python, Django, Flask, SQL, PostgreSQL, Docker, Git, Linux, anglais courant
+"""
+
+JOB_DESCRIPTION = """Développeur Python confirmé (H/F) - CDI - Paris
+Vous concevez et maintenez nos API Django/Flask et nos pipelines de données.
+Profil : 3 à 5 ans d'expérience, Python, SQL, Docker, Kubernetes apprécié, esprit d'équipe.
+Salaire : 45-55k€, télétravail partiel."""
+
+
+class MemorySampler:
+    """RSS du processus (application et doublures comprises) relevé toutes les `interval` secondes"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))]
+
+
+def cv_upload(file_format: str, marker: str):
+    """(nom, octets, type MIME) du CV envoyé ; le marqueur rend chaque fichier unique"""
+    if file_format == "docx":
+        from docx import Document
+        document = Document()
+        for line in (CV_TEXT + marker).splitlines():
+            document.add_paragraph(line)
+        buffer = io.BytesIO()
+        document.save(buffer)
+        return "cv.docx", buffer.getvalue(), "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    return "cv.txt", (CV_TEXT + marker).encode("utf-8"), "text/plain"
+
+
+def send_request(scenario: str, session, base_url: str, marker: str, args):
+    """Une requête du scénario ; renvoie la réponse HTTP"""
+    if scenario == "search":
+        return session.post(f"{base_url}/api/search-jobs", json={
+            "job_title": f"Développeur Python{marker}", "location": "Paris",
+            "experience_level": "Confirmé", "skills": "Python, Django, SQL",
+            "cv_content": CV_TEXT if args.rank_with_cv else "",
+        })
+    if scenario == "cv":
+        name, data, mime = cv_upload(args.cv_format, marker)
+        return session.post(f"{base_url}/api/generate-cv", data={"job_description": JOB_DESCRIPTION},
+                            files={"cv_file": (name, data, mime)})
+    return session.post(f"{base_url}/api/generate-cover-letter", data={
+        "cv_content": CV_TEXT + marker, "job_description": JOB_DESCRIPTION, "company_name": "Acme Analytics",
+    })
+
+
+def stage_snapshot():
+    from agents.metrics import STAGE_ERRORS, STAGE_SECONDS
+    return STAGE_SECONDS.snapshot(), STAGE_ERRORS.snapshot()
+
+
+def stage_deltas(before, after):
+    """Appels, durée moyenne et erreurs par étape (agents/metrics.py) pendant le scénario"""
+    (durations_before, errors_before), (durations_after, errors_after) = before, after
+    stages = {}
+    for key, (count, total) in durations_after.items():
+        previous_count, previous_total = durations_before.get(key, (0, 0.0))
+        calls = count - previous_count
+        if calls:
+            name = "/".join(part for part in key if part)
+            stages[name] = {
+                "calls": calls,
+                "mean_ms": round((total - previous_total) / calls * 1000, 2),
+                "errors": int(errors_after.get(key, 0) - errors_before.get(key, 0)),
+            }
+    return dict(sorted(stages.items()))
+
+
+def run_scenario(scenario: str, base_url: str, args, run_id: str) -> dict:
+    import requests
+
+    local = threading.local()
+
+    def one(index: int):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        marker = "" if args.cache_hits else f" {run_id}-{scenario}-{index}"
+        started = time.perf_counter()
+        try:
+            response = send_request(scenario, local.session, base_url, marker, args)
+            ok = response.status_code == 200 and response.json().get("success", False)
+            size = len(response.content)
+        except Exception:
+            ok, size = False, 0
+        return time.perf_counter() - started, ok, size
+
+    # Préchauffage : construction des agents, imports paresseux
+    for index in range(args.warmup):
+        one(-1 - index)
+
+    before = stage_snapshot()
+    rss_before = rss_mb()
+    with MemorySampler() as memory, ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        started = time.perf_counter()
+        results = list(pool.map(one, range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies = [latency * 1000 for latency, _, _ in results]
+    errors = sum(1 for _, ok, _ in results if not ok)
+    return {
+        "requests": len(results),
+        "errors": errors,
+        "error_rate": round(errors / len(results), 4),
+        "rps": round(len(results) / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+            "p99": round(percentile(latencies, 0.99), 1),
+            "mean": round(sum(latencies) / len(latencies), 1),
+            "max": round(max(latencies), 1),
+        },
+        "response_bytes_mean": round(sum(size for _, _, size in results) / len(results)),
+        "memory_mb": {"before": round(rss_before, 1), "peak": round(memory.peak, 1), "after": round(rss_mb(), 1)},
+        "stages": stage_deltas(before, stage_snapshot()),
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """Lignes de comparaison avec un rapport précédent ; ⚠️ au-delà de `threshold` (%)"""
+    lines = []
+    for scenario, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(scenario)
+        if not previous:
+            continue
+        for label, now, before, higher_is_worse in (
+            ("p95", current["latency_ms"]["p95"], previous["latency_ms"]["p95"], True),
+            ("p99", current["latency_ms"]["p99"], previous["latency_ms"]["p99"], True),
+            ("rps", current["rps"], previous["rps"], False),
+            ("mémoire", current["memory_mb"]["peak"], previous["memory_mb"]["peak"], True),
+        ):
+            if not before:
+                continue
+            change = (now - before) / before * 100
+            worse = change > threshold if higher_is_worse else change < -threshold
+            lines.append(f"{'⚠️ ' if worse else '  '} {scenario:<13} {label:<8} {before:>10} -> {now:<10} ({change:+.1f}%)")
+    return lines
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def latest_result(directory: str):
+    if not os.path.isdir(directory):
+        return None
+    files = sorted(name for name in os.listdir(directory) if name.startswith("load-") and name.endswith(".json"))
+    return os.path.join(directory, files[-1]) if files else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="scénarios parmi search, cv, cover_letter")
+    parser.add_argument("--concurrency", type=int, default=8, help="requêtes simultanées")
+    parser.add_argument("--requests", type=int, default=40, help="requêtes mesurées par scénario")
+    parser.add_argument("--warmup", type=int, default=2, help="requêtes de préchauffage (non mesurées)")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="recherche enregistrée rejouée par les doublures")
+    parser.add_argument("--offers", choices=("replay", "synthetic"), default="replay",
+                        help="offres DuckDuckGo rejouées telles quelles ou synthétiques (job boards)")
+    parser.add_argument("--groq-latency", type=float, default=0.4, help="latence simulée de Groq (s)")
+    parser.add_argument("--gemini-latency", type=float, default=0.6, help="latence simulée de Gemini (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="gigue ajoutée aux latences LLM (s)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="part de réponses 503 des LLM")
+    parser.add_argument("--ddgs-latency", type=float, default=0.3, help="latence simulée de DuckDuckGo (s)")
+    parser.add_argument("--ddgs-error-rate", type=float, default=0.0, help="part d'erreurs DuckDuckGo")
+    parser.add_argument("--ddgs-rate", type=float, default=1000.0,
+                        help="jetons/s du limiteur DuckDuckGo (0 = réglage de production)")
+    parser.add_argument("--cv-format", choices=("docx", "txt"), default="docx", help="format du CV envoyé")
+    parser.add_argument("--rank-with-cv", action="store_true", help="recherche avec CV (classement local des offres)")
+    parser.add_argument("--cache-hits", action="store_true",
+                        help="requêtes identiques (mesure des caches) au lieu de requêtes toutes différentes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="rapport JSON (défaut : benchmarks/results/load-<date>.json)")
+    parser.add_argument("--baseline", help="rapport de référence (défaut : le plus récent de benchmarks/results/)")
+    parser.add_argument("--threshold", type=float, default=10.0, help="écart signalé comme régression (%%)")
+    parser.add_argument("--no-save", action="store_true", help="ne pas enregistrer le rapport")
+    parser.add_argument("--verbose", action="store_true", help="garder les logs de l'application")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"scénarios inconnus : {', '.join(sorted(unknown))}")
+
+    fixture = load_fixture(args.fixture)
+    groq = FakeLLMServer(fixture, Behavior(args.groq_latency, args.llm_jitter, args.llm_error_rate, args.seed)).start()
+    gemini = FakeLLMServer(fixture, Behavior(args.gemini_latency, args.llm_jitter, args.llm_error_rate,
+                                             args.seed + 1)).start()
+    workdir = tempfile.mkdtemp(prefix="cv_bench_")
+
+    # Configuration lue à l'import de app.py : tout reste local et en mémoire
+    for name in ("LLM_PROVIDER", "LLM_ROUTES", "LLM_CACHE_DB", "SEARCH_CACHE_DB", "CV_STORE_DB", "PAGE_CACHE_DB",
+                 "SECTION_CACHE_DB"):
+        os.environ.pop(name, None)
+    os.environ.update({
+        "GROQ_API_KEY": "bench", "GROQ_API_URL": groq.groq_url,
+        "GEMINI_API_KEY": "bench", "GEMINI_API_URL": gemini.gemini_url,
+        "OFFER_ENRICHMENT": "0", "JOB_INDEX_DB": os.path.join(workdir, "job_index.db"),
+    })
+
+    out = sys.stdout
+    if not args.verbose:
+        sys.stdout = open(os.devnull, "w")
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    rss_start = rss_mb()
+    import agents.job_search_agent as job_search_module
+    from agents.rate_limiter import get_rate_limiter
+    import app as application
+    from werkzeug.serving import make_server
+
+    job_search_module._DDGS = make_fake_ddgs(
+        fixture, Behavior(args.ddgs_latency, 0.0, args.ddgs_error_rate, args.seed + 2), mode=args.offers)
+    if args.ddgs_rate > 0:
+        get_rate_limiter("duckduckgo", rate=args.ddgs_rate, capacity=int(args.ddgs_rate))
+
+    server = make_server("127.0.0.1", 0, application.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+    report = {
+        "run_id": run_id,
+        "git": git_revision(),
+        "python": sys.version.split()[0],
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("output", "baseline", "no_save", "verbose")},
+        "memory_mb": {"start": round(rss_start, 1), "after_import": round(rss_mb(), 1)},
+        "scenarios": {},
+    }
+    try:
+        for scenario in scenarios:
+            print(f"⏱️  {scenario} : {args.requests} requêtes, concurrence {args.concurrency}...", file=out, flush=True)
+            result = run_scenario(scenario, base_url, args, run_id)
+            report["scenarios"][scenario] = result
+            latency = result["latency_ms"]
+            print(f"   p50 {latency['p50']} ms | p95 {latency['p95']} ms | p99 {latency['p99']} ms | "
+                  f"{result['rps']} req/s | erreurs {result['errors']}/{result['requests']} | "
+                  f"RSS max {result['memory_mb']['peak']} Mo", file=out)
+            for stage, values in result["stages"].items():
+                errors = f"  ({values['errors']} erreurs)" if values["errors"] else ""
+                print(f"     {stage:<48} {values['calls']:>6} × {values['mean_ms']:>9} ms{errors}", file=out)
+    finally:
+        server.shutdown()
+        groq.stop()
+        gemini.stop()
+        if not args.verbose:
+            sys.stdout.close()
+            sys.stdout = out
+    report["fake_services"] = {"groq": dict(groq.stats), "gemini": dict(gemini.stats)}
+
+    baseline_path = args.baseline or latest_result(RESULTS_DIR)
+    if baseline_path and os.path.exists(baseline_path):
+        with open(baseline_path, encoding="utf-8") as handle:
+            lines = compare(report, json.load(handle), args.threshold)
+        if lines:
+            print(f"\n📊 Comparaison avec {baseline_path} :")
+            print("\n".join(lines))
+
+    if not args.no_save:
+        path = args.output or os.path.join(RESULTS_DIR, f"load-{run_id}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, ensure_ascii=False, indent=2)
+        print(f"\n💾 Rapport enregistré dans {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""
+Mesure mémoire commune aux benchmarks (startup.py, load.py)
+"""
+
+import sys
+
+
+def rss_mb() -> float:
+    """RSS courant du processus en Mo (VmRSS sous Linux, sinon pic ru_maxrss)"""
+    try:
+        with open("/proc/self/status") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
@@ -0,0 +1,132 @@
+"""
+Mesure du démarrage à froid d'un worker : temps d'import de `app`, RSS, et
+coût de construction de chaque agent à sa première utilisation
+
+Chaque mesure tourne dans un interpréteur neuf (comme un worker gunicorn ou un
+conteneur qui démarre). Exemples :
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --repeat 5 --agents cv_generator,job_search --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Exécuté dans le processus enfant : importe app, construit éventuellement un agent, mesure
+_PROBE = """
+import json, sys, time
+from benchmarks.memory import rss_mb
+baseline = rss_mb()
+started = time.perf_counter()
+import app
+result = {"import_seconds": time.perf_counter() - started, "rss_mb": rss_mb(), "baseline_rss_mb": baseline}
+agent = sys.argv[1] if len(sys.argv) > 1 else ""
+if agent:
+    started = time.perf_counter()
+    try:
+        app.agent_registry.get(agent)
+        result["build_seconds"] = time.perf_counter() - started
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["rss_after_build_mb"] = rss_mb()
+result["modules"] = len(sys.modules)
+print("__STARTUP__" + json.dumps(result))
+"""
+
+
+def run_probe(agent: str = "") -> dict:
+    process = subprocess.run(
+        [sys.executable, "-c", _PROBE, agent], cwd=ROOT, capture_output=True, text=True,
+        env=dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1"),
+    )
+    for line in process.stdout.splitlines():
+        if line.startswith("__STARTUP__"):
+            return json.loads(line[len("__STARTUP__"):])
+    raise RuntimeError(f"Mesure impossible :\n{process.stderr[-2000:]}")
+
+
+def import_profile(top: int = 15) -> list:
+    """Modules les plus coûteux selon `python -X importtime -c 'import app'` (temps cumulé)"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"], cwd=ROOT, capture_output=True, text=True,
+        env=dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1"),
+    )
+    rows = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        # Le nom est précédé d'un espace puis de deux espaces par niveau d'imbrication
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append({
+            "module": name.strip(),
+            "depth": depth,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    # Seuls les imports de premier niveau (directs ou depuis app) sont additifs
+    top_level = [row for row in rows if row["depth"] <= 1]
+    return sorted(top_level, key=lambda row: -row["cumulative_ms"])[:top]
+
+
+def summarize(samples: list, key: str) -> dict:
+    values = [sample[key] for sample in samples if key in sample]
+    if not values:
+        return {}
+    return {"median": round(statistics.median(values), 3), "min": round(min(values), 3),
+            "max": round(max(values), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=3, help="mesures par scénario (médiane rapportée)")
+    parser.add_argument("--agents", default="", help="agents à construire après l'import, séparés par des virgules")
+    parser.add_argument("--top", type=int, default=15, help="nombre de modules listés dans le profil d'import")
+    parser.add_argument("--json", dest="json_path", help="fichier où enregistrer le rapport")
+    args = parser.parse_args()
+
+    report = {"python": sys.version.split()[0], "repeat": args.repeat}
+    cold = [run_probe() for _ in range(args.repeat)]
+    report["cold_start"] = {
+        "import_seconds": summarize(cold, "import_seconds"),
+        "rss_mb": summarize(cold, "rss_mb"),
+        "modules": cold[-1]["modules"],
+    }
+    print(f"🚀 import app : {report['cold_start']['import_seconds']['median']:.3f}s "
+          f"(médiane sur {args.repeat}), RSS {report['cold_start']['rss_mb']['median']:.1f} Mo, "
+          f"{report['cold_start']['modules']} modules")
+
+    report["agents"] = {}
+    for agent in [name.strip() for name in args.agents.split(",") if name.strip()]:
+        samples = [run_probe(agent) for _ in range(args.repeat)]
+        errors = [sample["error"] for sample in samples if "error" in sample]
+        report["agents"][agent] = {
+            "build_seconds": summarize(samples, "build_seconds"),
+            "rss_after_build_mb": summarize(samples, "rss_after_build_mb"),
+        }
+        if errors:
+            report["agents"][agent]["error"] = errors[0]
+            print(f"❌ {agent} : {errors[0]}")
+        else:
+            print(f"🧩 {agent} : construit en {report['agents'][agent]['build_seconds']['median']:.3f}s, "
+                  f"RSS {report['agents'][agent]['rss_after_build_mb']['median']:.1f} Mo")
+
+    report["import_profile"] = import_profile(args.top)
+    print("\n📦 Imports les plus coûteux (cumulé, ms) :")
+    for row in report["import_profile"]:
+        print(f"  {row['cumulative_ms']:9.1f}  {row['module']}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, ensure_ascii=False, indent=2)
+        print(f"\n💾 Rapport enregistré dans {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
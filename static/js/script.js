@@ -2,6 +2,7 @@ class JobSearchApp {
   constructor() {
     this.currentLatexContent = ""
     this.currentLetterContent = ""
+    this.cvIds = new Map()
     this.init()
   }
 
@@ -57,6 +58,14 @@ class JobSearchApp {
       this.downloadLatex()
     })
 
+    document.getElementById("download-pdf")?.addEventListener("click", () => {
+      this.downloadPdf()
+    })
+
+    document.getElementById("preview-pdf")?.addEventListener("click", () => {
+      this.previewPdf()
+    })
+
     document.getElementById("copy-latex")?.addEventListener("click", () => {
       this.copyToClipboard(this.currentLatexContent)
     })
@@ -145,14 +154,21 @@ class JobSearchApp {
 
   async handleCVGeneration() {
     const formData = new FormData(document.getElementById("cv-generator-form"))
+    formData.append("stream", "1")
 
     this.showLoading()
 
     try {
-      const response = await fetch("/api/generate-cv", {
-        method: "POST",
-        body: formData,
-      })
+      const response = await this.postWithStoredCV("/api/generate-cv", formData)
+
+      if (this.isEventStream(response)) {
+        const fullText = await this.readEventStream(response, (text) => {
+          this.hideLoading()
+          this.displayStreamingResults("cv-results", "cv-results-content", `<pre>${this.escapeHtml(text)}</pre>`, "code-block")
+        })
+        this.displayCVResults(fullText)
+        return
+      }
 
       const result = await response.json()
 
@@ -162,7 +178,7 @@ class JobSearchApp {
         this.showError("Erreur lors de la génération: " + result.error)
       }
     } catch (error) {
-      this.showError("Erreur de connexion: " + error.message)
+      this.showError("Erreur lors de la génération: " + error.message)
     } finally {
       this.hideLoading()
     }
@@ -170,14 +186,21 @@ class JobSearchApp {
 
   async handleCoverLetterGeneration() {
     const formData = new FormData(document.getElementById("cover-letter-form"))
+    formData.append("stream", "1")
 
     this.showLoading()
 
     try {
-      const response = await fetch("/api/generate-cover-letter", {
-        method: "POST",
-        body: formData,
-      })
+      const response = await this.postWithStoredCV("/api/generate-cover-letter", formData)
+
+      if (this.isEventStream(response)) {
+        const fullText = await this.readEventStream(response, (text) => {
+          this.hideLoading()
+          this.displayStreamingResults("letter-results", "letter-results-content", this.formatLetterContent(this.escapeHtml(text)), "letter-content")
+        })
+        this.displayCoverLetterResults(fullText)
+        return
+      }
 
       const result = await response.json()
 
@@ -187,12 +210,108 @@ class JobSearchApp {
         this.showError("Erreur lors de la génération: " + result.error)
       }
     } catch (error) {
-      this.showError("Erreur de connexion: " + error.message)
+      this.showError("Erreur lors de la génération: " + error.message)
     } finally {
       this.hideLoading()
     }
   }
 
+  async attachStoredCV(formData) {
+    // Le CV est uploadé une fois par session, puis référencé par son cv_id
+    const file = formData.get("cv_file")
+    if (!(file instanceof File) || !file.size) return null
+
+    const key = `${file.name}:${file.size}:${file.lastModified}`
+    if (!this.cvIds.has(key)) {
+      const uploadData = new FormData()
+      uploadData.append("cv_file", file)
+
+      const response = await fetch("/api/cv", {
+        method: "POST",
+        body: uploadData,
+      })
+      const result = await response.json()
+      if (!result.success) {
+        throw new Error(result.error)
+      }
+      this.cvIds.set(key, result.data.cv_id)
+    }
+
+    formData.delete("cv_file")
+    formData.append("cv_id", this.cvIds.get(key))
+    return { key, file }
+  }
+
+  async postWithStoredCV(url, formData) {
+    const stored = await this.attachStoredCV(formData)
+    const response = await fetch(url, { method: "POST", body: formData })
+    if (response.status !== 404 || !stored) return response
+
+    // cv_id expiré, évincé ou perdu au redémarrage du serveur : on réuploade une fois
+    this.cvIds.delete(stored.key)
+    formData.delete("cv_id")
+    formData.append("cv_file", stored.file)
+    await this.attachStoredCV(formData)
+    return fetch(url, { method: "POST", body: formData })
+  }
+
+  isEventStream(response) {
+    return (response.headers.get("Content-Type") || "").startsWith("text/event-stream")
+  }
+
+  async readEventStream(response, onProgress) {
+    // Lit les événements SSE et appelle onProgress avec le texte accumulé
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ""
+    let fullText = ""
+
+    while (true) {
+      const { value, done } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+
+      const events = buffer.split("\n\n")
+      buffer = events.pop()
+
+      for (const rawEvent of events) {
+        let eventType = "message"
+        let data = ""
+        rawEvent.split("\n").forEach((line) => {
+          if (line.startsWith("event:")) eventType = line.slice(6).trim()
+          else if (line.startsWith("data:")) data += line.slice(5).trim()
+        })
+
+        if (eventType === "error") {
+          throw new Error(JSON.parse(data).error)
+        }
+        if (eventType === "done") {
+          return fullText
+        }
+
+        const payload = JSON.parse(data)
+        fullText += payload.delta
+        onProgress(fullText)
+      }
+    }
+
+    return fullText
+  }
+
+  displayStreamingResults(sectionId, contentId, innerHTML, className) {
+    const resultsSection = document.getElementById(sectionId)
+    const resultsContent = document.getElementById(contentId)
+
+    let container = resultsContent.querySelector(".streaming-output")
+    if (!container) {
+      resultsContent.innerHTML = `<div class="${className} streaming-output"></div>`
+      container = resultsContent.querySelector(".streaming-output")
+      resultsSection.style.display = "block"
+      resultsSection.scrollIntoView({ behavior: "smooth" })
+    }
+    container.innerHTML = innerHTML
+  }
+
   displayJobResults(data) {
     const resultsSection = document.getElementById("job-results")
     const resultsContent = document.getElementById("job-results-content")
@@ -329,6 +448,71 @@ class JobSearchApp {
     }
   }
 
+  async compileLatex(endpoint, extra = {}) {
+    // Compilation côté serveur : renvoie le binaire, ou lève l'erreur LaTeX reçue en JSON
+    const response = await fetch(endpoint, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ latex_content: this.currentLatexContent, ...extra }),
+    })
+
+    if (!response.ok) {
+      const result = await response.json().catch(() => ({}))
+      throw new Error(result.error || "Erreur de compilation")
+    }
+    return response.blob()
+  }
+
+  async downloadPdf() {
+    if (!this.currentLatexContent) {
+      this.showError("Aucun contenu LaTeX à compiler")
+      return
+    }
+
+    this.showLoading()
+    try {
+      const blob = await this.compileLatex("/api/compile-latex", { filename: "cv_optimise.pdf" })
+      const url = window.URL.createObjectURL(blob)
+      const a = document.createElement("a")
+      a.href = url
+      a.download = "cv_optimise.pdf"
+      document.body.appendChild(a)
+      a.click()
+      window.URL.revokeObjectURL(url)
+      document.body.removeChild(a)
+
+      this.showSuccess("CV PDF téléchargé avec succès !")
+    } catch (error) {
+      this.showError("Erreur lors de la compilation: " + error.message)
+    } finally {
+      this.hideLoading()
+    }
+  }
+
+  async previewPdf() {
+    if (!this.currentLatexContent) {
+      this.showError("Aucun contenu LaTeX à prévisualiser")
+      return
+    }
+
+    this.showLoading()
+    try {
+      const blob = await this.compileLatex("/api/preview-latex")
+      const preview = document.getElementById("cv-preview")
+      if (preview.src) {
+        window.URL.revokeObjectURL(preview.src)
+      }
+      preview.src = window.URL.createObjectURL(blob)
+      preview.style.display = "block"
+    } catch (error) {
+      this.showError("Erreur lors de l'aperçu: " + error.message)
+    } finally {
+      this.hideLoading()
+    }
+  }
+
   async copyToClipboard(text) {
     try {
       await navigator.clipboard.writeText(text)
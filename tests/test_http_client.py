@@ -0,0 +1,98 @@
+"""LLMHttpClient contre un serveur HTTP local : retries, erreurs définitives, flux SSE"""
+
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from agents.http_client import LLMHttpClient, LLMHttpError
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Répond avec les réponses `(statut, en-têtes, corps)` de `server.script`, dans l'ordre"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.requests += 1
+            status, headers, body = self.server.script.pop(0) if self.server.script else self.server.default
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+    httpd.lock = threading.Lock()
+    httpd.requests = 0
+    httpd.script = []
+    httpd.default = (200, {"Content-Type": "application/json"}, b'{"ok": true}')
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/v1/chat/completions"
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def client():
+    client = LLMHttpClient(max_retries=2, backoff_base=0.001, backoff_max=0.01, http2=False)
+    yield client
+    client.close()
+
+
+def json_response(status, data, **headers):
+    return status, dict({"Content-Type": "application/json"}, **headers), json.dumps(data).encode()
+
+
+def test_retries_transient_errors_then_succeeds(server, client):
+    server.script = [json_response(503, {"error": "busy"}), json_response(429, {}, **{"Retry-After": "0"})]
+
+    assert client.post_json(server.url, {}, {"model": "m"}) == {"ok": True}
+    assert server.requests == 3
+
+
+def test_client_errors_are_not_retried(server, client):
+    server.script = [json_response(400, {"error": "bad request"})]
+
+    with pytest.raises(LLMHttpError) as error:
+        client.post_json(server.url, {}, {})
+    assert error.value.status_code == 400
+    assert server.requests == 1
+
+
+def test_gives_up_after_max_retries(server, client):
+    server.default = json_response(502, {"error": "bad gateway"})
+
+    with pytest.raises(LLMHttpError) as error:
+        client.post_json(server.url, {}, {})
+    assert error.value.status_code == 502
+    assert server.requests == 3
+
+
+def test_network_errors_are_retried_then_reported(client):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    with pytest.raises(LLMHttpError, match="Erreur réseau"):
+        client.post_json(f"http://127.0.0.1:{port}/", {}, {})
+
+
+def test_sse_stream_stops_at_done(server, client):
+    events = "".join(f"data: {json.dumps({'delta': word})}\n\n" for word in ("Bon", "jour"))
+    server.script = [(200, {"Content-Type": "text/event-stream"}, (events + "data: [DONE]\n\ndata: ignoré\n\n").encode())]
+
+    data = [json.loads(item)["delta"] for item in client.iter_sse_data(server.url, {}, {"stream": True})]
+
+    assert data == ["Bon", "jour"]
@@ -0,0 +1,116 @@
+"""Routage LLM : requêtes couvertes, repli et disjoncteur, avec FakeProvider"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agents.llm_backend import FakeProvider, LLMBackendError, LLMProvider, LLMRouter, record_providers
+
+MESSAGES = [{"role": "user", "content": "Bonjour"}]
+
+
+def make_router(primary, fallback=(), **options):
+    options.setdefault("latency_aware", False)
+    return LLMRouter({"test": {"primary": list(primary), "fallback": list(fallback)}}, **options)
+
+
+def test_provider_without_complete_cannot_be_built():
+    class Incomplete(LLMProvider):
+        provider = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete("model")
+
+
+def test_slow_provider_is_hedged_by_the_next_one():
+    slow = FakeProvider("slow", latency=1.0)
+    fast = FakeProvider("fast", latency=0.01)
+    router = make_router([slow, fast], hedge_default_delay=0.1)
+
+    result = router.complete_result("test", MESSAGES)
+
+    assert result.provider == fast.name
+    assert result.hedged and not result.fallback
+    assert result.latency < 0.8
+    assert router.provider_stats[slow.name].counters["hedges"] == 1
+    assert router.provider_stats[fast.name].counters["hedge_wins"] == 1
+
+
+def test_failing_primary_falls_back_to_the_smaller_model():
+    broken = FakeProvider("broken", latency=0.0, error_rate=1.0)
+    small = FakeProvider("small", latency=0.0)
+    router = make_router([broken], [small], hedge=False)
+
+    result = router.complete_result("test", MESSAGES)
+
+    assert result.provider == small.name
+    assert result.fallback
+    assert "Bonjour" in result.text
+
+
+def test_breaker_opens_and_skips_the_provider():
+    broken = FakeProvider("broken", latency=0.0, error_rate=1.0)
+    small = FakeProvider("small", latency=0.0)
+    router = make_router([broken], [small], hedge=False, failure_threshold=2, reset_timeout=60)
+
+    for _ in range(2):
+        router.complete("test", MESSAGES)
+    calls = broken.calls
+    router.complete("test", MESSAGES)
+
+    assert router.breakers[broken.name].state == "open"
+    assert broken.calls == calls
+
+
+def test_all_providers_failing_raises():
+    router = make_router([FakeProvider("a", latency=0.0, error_rate=1.0)], hedge=False)
+
+    with pytest.raises(LLMBackendError):
+        router.complete("test", MESSAGES)
+
+
+def test_stream_switches_provider_before_the_first_chunk():
+    broken = FakeProvider("broken", latency=0.0, error_rate=1.0)
+    working = FakeProvider("working", latency=0.0)
+    router = make_router([broken, working])
+
+    text = "".join(router.stream("test", MESSAGES))
+
+    assert text.startswith("[working]")
+    assert router.provider_stats[broken.name].counters["failures"] == 1
+
+
+def test_record_providers_reports_who_answered():
+    broken = FakeProvider("broken", latency=0.0, error_rate=1.0)
+    small = FakeProvider("small", latency=0.0)
+    router = make_router([broken], [small], hedge=False)
+
+    with record_providers() as used:
+        router.complete("test", MESSAGES)
+        "".join(router.stream("test", MESSAGES))
+
+    assert used == {small.name}
+
+
+def test_provider_limit_caps_concurrent_calls():
+    active, peak, lock = 0, 0, threading.Lock()
+
+    def responder(messages):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return "ok"
+
+    provider = FakeProvider("capped", latency=0.0, responder=responder)
+    router = make_router([provider], hedge=False, provider_limits={"fake": 2})
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(lambda _: router.complete("test", MESSAGES), range(6)))
+
+    assert peak == 2
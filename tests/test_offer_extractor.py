@@ -0,0 +1,102 @@
+"""Extraction des offres à partir de pages HTML locales (servies par http.server)"""
+
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from agents.cache import TieredCache
+from agents.offer_extractor import OfferExtractor, PageFetcher, extract_offer_fields
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "offers")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Sert FIXTURES et note le statut de chaque réponse"""
+
+    def send_response(self, code, message=None):
+        self.server.statuses.append(code)
+        super().send_response(code, message)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fixture_server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(FixtureHandler, directory=FIXTURES))
+    httpd.statuses = []
+    httpd.base_url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_json_ld_job_posting():
+    fields = extract_offer_fields("https://careers.acme.example/offre/1", read_fixture("jsonld_offer.html"))
+
+    assert fields["nom_poste"] == "Développeur Python H/F"
+    assert fields["entreprise"] == "Acme"
+    assert fields["localisation"] == "Lyon, Auvergne-Rhône-Alpes"
+    assert fields["type_contrat"] == "CDI"
+    assert fields["salaire"] == "45000 - 55000 EUR / year"
+    assert fields["date_publication"] == "2024-05-02"
+    assert fields["description"] == "Vous développerez nos API Django. Équipe de 8 personnes."
+    assert fields["competences"] == ["Python", "Django", "PostgreSQL"]
+    assert fields["contact"]["emails"] == ["recrutement@acme.example"]
+
+
+def test_site_extractor_applies_to_its_domain_only():
+    html = read_fixture("indeed_offer.html")
+
+    fields = extract_offer_fields("https://fr.indeed.com/viewjob?jk=1", html)
+    assert fields["nom_poste"] == "Data Engineer"
+    assert fields["entreprise"] == "Globex"
+    assert fields["localisation"] == "Paris (75)"
+    assert fields["type_contrat"] == "CDI"
+
+    lookalike = extract_offer_fields("https://notindeed.com.evil/viewjob", html)
+    assert not lookalike.get("entreprise")
+
+
+def test_generic_heuristics_ignore_scripts():
+    fields = extract_offer_fields("https://initech.example/jobs/42", read_fixture("generic_offer.html"))
+
+    assert fields["nom_poste"] == "Stage Développeur Front-end"
+    assert fields["description"] == "Stage de 6 mois sur notre application React."
+    assert fields["type_contrat"] == "Stage, Alternance"
+    assert fields["salaire"] == "1 200 € / mois"
+    assert fields["contact"]["emails"] == ["jobs@initech.example"]
+
+
+def test_enrich_fills_only_missing_fields(fixture_server):
+    extractor = OfferExtractor(PageFetcher(cache=TieredCache(ttl=60)), max_workers=2, timeout=5)
+    offers = [
+        {"url": f"{fixture_server.base_url}/jsonld_offer.html", "entreprise": "Acme (saisie)"},
+        {"url": f"{fixture_server.base_url}/absente.html", "titre": "Inconnue"},
+    ]
+
+    enriched = extractor.enrich(offers)
+
+    assert enriched[0]["entreprise"] == "Acme (saisie)"
+    assert enriched[0]["localisation"] == "Lyon, Auvergne-Rhône-Alpes"
+    assert enriched[1] == offers[1]
+
+
+def test_expired_page_is_revalidated_with_a_conditional_get(fixture_server):
+    fetcher = PageFetcher(cache=TieredCache(ttl=0, stale_ttl=60))
+    url = f"{fixture_server.base_url}/generic_offer.html"
+
+    first = fetcher.fetch(url)
+    second = fetcher.fetch(url)
+
+    assert first == second == read_fixture("generic_offer.html")
+    assert fixture_server.statuses == [200, 304]